@@ -0,0 +1,64 @@
+"""
+Helpers shared by the benchmarks, run them from the repository root i.e.
+
+    BENCH_DB_URL=postgresql+psycopg2://postgres@127.0.0.1/bench_db python -m benchmarks.policy_check
+
+Benchmarks that need a database drop and create the one BENCH_DB_URL points to,
+never point it at a database that matters.
+"""
+import os
+import statistics
+import time
+import types
+
+# Benchmarks use the test settings unless told otherwise
+os.environ.setdefault('settings', 'deli_counter.test.settings.all')
+
+
+def measure(fn, iterations, warmup=10) -> list:
+    """
+    Call fn iterations times and return how long every call took in seconds
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def percentile(samples, percent) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def report(name, samples):
+    print("%-40s p50 %8.3fms  p99 %8.3fms  mean %8.3fms  %10.1f/s" % (
+        name, percentile(samples, 50) * 1000, percentile(samples, 99) * 1000, statistics.mean(samples) * 1000,
+        len(samples) / sum(samples)))
+
+
+def setup_app():
+    """
+    Create the benchmark database like the tests do and return an object with a
+    connected database, which the DeliTestCase create_* helpers take as their app.
+    """
+    from sqlalchemy.engine.url import make_url
+    from sqlalchemy_utils import create_database, database_exists, drop_database
+
+    from deli_counter.test.base import DeliTestCase
+    from ingredients_db.database import Database
+
+    uri = os.environ['BENCH_DB_URL']
+    if database_exists(uri):
+        drop_database(uri)
+    create_database(uri)
+    DeliTestCase().setup_database(uri)
+
+    url = make_url(uri)
+    database = Database(url.host, url.port, url.username, url.password, url.database, -1)
+    database.connect()
+    return types.SimpleNamespace(database=database)
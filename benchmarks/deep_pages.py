@@ -0,0 +1,57 @@
+"""
+Latency of fetching a page of instances further and further into a project
+with 100k instances, with the keyset the list routes page by and with the
+OFFSET the page would need without one.
+
+    BENCH_DB_URL=... python -m benchmarks.deep_pages
+"""
+from sqlalchemy import literal, tuple_
+
+from benchmarks.common import measure, report, setup_app
+from benchmarks.tag_filter import seed
+
+from ingredients_db.models.instance import Instance
+
+PAGE_SIZE = 100
+DEPTHS = [0, 1000, 10000, 50000, 99000]
+ITERATIONS = 50
+
+
+def ordered(session, project_id):
+    return session.query(Instance.id, Instance.created_at).filter(Instance.project_id == project_id).order_by(
+        Instance.created_at.desc(), Instance.id.desc())
+
+
+def offset_page(db_session, project_id, depth):
+    with db_session() as session:
+        return ordered(session, project_id).offset(depth).limit(PAGE_SIZE + 1).all()
+
+
+def keyset_page(db_session, project_id, marker):
+    # The query paginate runs for a cursor, the marker is the last row of the page before
+    with db_session() as session:
+        query = ordered(session, project_id)
+        if marker is not None:
+            marker_id, marker_created_at = marker
+            query = query.filter(tuple_(Instance.created_at, Instance.id) < tuple_(
+                literal(marker_created_at, Instance.created_at.type), literal(marker_id, Instance.id.type)))
+        return query.limit(PAGE_SIZE + 1).all()
+
+
+def main():
+    app = setup_app()
+    db_session = app.database.session
+    project_id = seed(app)
+
+    for depth in DEPTHS:
+        marker = None
+        if depth > 0:
+            marker = offset_page(db_session, project_id, depth - 1)[0]
+        assert offset_page(db_session, project_id, depth) == keyset_page(db_session, project_id, marker)
+
+        report("row %6d: offset" % depth, measure(lambda: offset_page(db_session, project_id, depth), ITERATIONS))
+        report("row %6d: keyset" % depth, measure(lambda: keyset_page(db_session, project_id, marker), ITERATIONS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Time it takes the GitHub auth driver to find a user's roles in an org with
+many teams, against a local stub of the GitHub API that adds LATENCY to
+every request.
+
+Compares checking every team one after the other, like the driver used to,
+with find_roles resolving through the org's teams and the user's teams, with
+and without the per user team cache.
+
+    python -m benchmarks.github_teams
+"""
+import json
+import re
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from simple_settings import settings
+from simple_settings.utils import settings_stub
+
+from benchmarks.common import measure, report
+
+from deli_counter.auth.drivers.github.driver import GithubAuthDriver
+from deli_counter.cache.backends.memory import MemoryCacheBackend
+from github.NamedUser import NamedUser
+
+ORG = 'sandwich'
+LOGIN = 'bench'
+TEAMS = 300
+ROLE_TEAMS = 10
+# Seconds every stub response is delayed by, about a round trip to api.github.com
+LATENCY = 0.05
+PAGE_SIZE = 30
+ITERATIONS = 5
+
+
+def team(team_id):
+    name = "sandwich-role%s" % team_id if team_id < ROLE_TEAMS else "team-%s" % team_id
+    return {"id": team_id, "name": name, "slug": name, "url": "/teams/%s" % team_id,
+            "organization": {"login": ORG}}
+
+
+def is_member(team_id):
+    # The user is in every other team
+    return team_id % 2 == 0
+
+
+class StubGithubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, body, status=200, link=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if link is not None:
+            self.send_header('Link', link)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_page(self, path, items):
+        page = int(re.search(r'[?&]page=(\d+)', self.path).group(1)) if 'page=' in self.path else 1
+        start = (page - 1) * PAGE_SIZE
+        link = None
+        if start + PAGE_SIZE < len(items):
+            link = '<http://%s:%s%s?page=%s>; rel="next"' % (*self.server.server_address, path, page + 1)
+        self.send_json(items[start:start + PAGE_SIZE], link=link)
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        path = self.path.split('?')[0]
+
+        if path == '/user':
+            return self.send_json({"login": LOGIN})
+        if path == '/user/orgs':
+            return self.send_json([{"login": ORG}])
+        if path == '/orgs/%s' % ORG:
+            return self.send_json({"login": ORG})
+        if path == '/orgs/%s/teams' % ORG:
+            return self.send_page(path, [team(team_id) for team_id in range(TEAMS)])
+        if path == '/user/teams':
+            return self.send_page(path, [team(team_id) for team_id in range(TEAMS) if is_member(team_id)])
+
+        match = re.match(r'^/teams/(\d+)/members/(\w+)$', path)
+        if match:
+            self.send_response(204 if is_member(int(match.group(1))) else 404)
+            self.send_header('Content-Length', '0')
+            return self.end_headers()
+
+        match = re.match(r'^/teams/(\d+)$', path)
+        if match:
+            return self.send_json(team(int(match.group(1))))
+
+        self.send_json({"message": "Not Found"}, status=404)
+
+
+def find_roles_serially(github_user, org):
+    # What the driver did before, every team's membership is checked one after the other
+    member = NamedUser(None, [], {"login": github_user.login}, completed=True)
+    roles = []
+    for org_team in org.get_teams():
+        if org_team.has_in_members(member) and org_team.name.startswith(settings.GITHUB_TEAM_ROLES_PREFIX):
+            roles.append(org_team.name.replace(settings.GITHUB_TEAM_ROLES_PREFIX, ""))
+    return roles
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubGithubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with settings_stub(GITHUB_URL='http://%s:%s' % server.server_address, GITHUB_ORG=ORG, GITHUB_TEAM_ROLES={},
+                       GITHUB_TEAM_ROLES_PREFIX='sandwich-', GITHUB_TEAM_WORKERS=8, GITHUB_HTTP_POOL_SIZE=8):
+        driver = GithubAuthDriver()
+        driver.auth_manager = types.SimpleNamespace(cache_backend=MemoryCacheBackend())
+
+        client = driver.github_client('token')
+        github_user = client.get_user()
+        org = driver.find_org(github_user)
+        expected = sorted(find_roles_serially(github_user, org))
+
+        print("%s teams, %s map to roles, %sms per request" % (TEAMS, ROLE_TEAMS, LATENCY * 1000))
+        report("every team serially (before)",
+               measure(lambda: find_roles_serially(github_user, org), ITERATIONS, warmup=1))
+
+        for resolution in ['org', 'user']:
+            for ttl in [0, 300]:
+                with settings_stub(GITHUB_TEAM_RESOLUTION=resolution, GITHUB_TEAM_CACHE_TTL=ttl):
+                    assert sorted(driver.find_roles(github_user, org)) == expected
+                    report("%s teams, %s" % (resolution, "cached" if ttl > 0 else "not cached"),
+                           measure(lambda: driver.find_roles(github_user, org), ITERATIONS, warmup=1))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Latency of POST /v1/instances and the number of statements each request runs, with no
+keypairs and with KEYPAIRS keypairs.
+
+It goes through the whole application so it runs as a test with the test
+database, run it explicitly, it is not collected with the tests:
+
+    TEST_DB_URL=... python -m pytest benchmarks/instance_create.py -s -o addopts=""
+"""
+import time
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+from benchmarks.common import report
+
+from deli_counter.test.base import DeliTestCase, fake
+from ingredients_db.models.keypair import Keypair
+
+ITERATIONS = 200
+KEYPAIRS = 5
+
+
+class TestInstanceCreate(DeliTestCase):
+    def create_keypairs(self, app, project, count):
+        with app.database.session() as session:
+            keypairs = []
+            for _ in range(count):
+                keypair = Keypair()
+                keypair.name = fake.pystr(min_chars=3)
+                keypair.public_key = 'ssh-rsa ' + fake.pystr(min_chars=32)
+                keypair.project_id = project.id
+                session.add(keypair)
+                keypairs.append(keypair)
+            session.commit()
+            return [str(keypair.id) for keypair in keypairs]
+
+    def test_create_latency(self, wsgi, app):
+        project = self.create_project(app)
+        region = self.create_region(app)
+        zone = self.create_zone(app, region=region)
+        token = self.create_token(app, project=project)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project=project, region=region)
+        keypair_ids = self.create_keypairs(app, project, KEYPAIRS)
+
+        statements = []
+
+        def count_statements(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(app.database.engine, 'before_cursor_execute', count_statements)
+        try:
+            for keypairs in [[], keypair_ids]:
+                samples = []
+                statements.clear()
+                for _ in range(ITERATIONS):
+                    instance_data = {
+                        "name": fake.pystr(min_chars=10),
+                        "image_id": str(image.id),
+                        "network_id": str(network.id),
+                        "region_id": str(region.id),
+                        "zone_id": str(zone.id),
+                        "keypair_ids": keypairs
+                    }
+                    with patch('ingredients_tasks.tasks.instance.create_instance.apply_async'):
+                        started = time.perf_counter()
+                        self.post(wsgi, "/v1/instances", instance_data, token=token)
+                        samples.append(time.perf_counter() - started)
+
+                report("create with %d keypairs" % len(keypairs), samples)
+                # Everything the request runs, authentication and policy checks included
+                print("%.1f statements per request" % (len(statements) / ITERATIONS))
+        finally:
+            event.remove(app.database.engine, 'before_cursor_execute', count_statements)
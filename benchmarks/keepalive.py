@@ -0,0 +1,67 @@
+"""
+Requests per second against a running deli counter, opening a new connection
+for every request like clients did while responses carried Connection: Close,
+and reusing one kept alive connection.
+
+    BENCH_URL=https://deli.example.com/v1/regions BENCH_TOKEN=... python -m benchmarks.keepalive
+
+BENCH_TOKEN is sent as a bearer token when set.
+"""
+import http.client
+import os
+import urllib.parse
+
+from benchmarks.common import measure, report
+
+ITERATIONS = 500
+
+
+class Client(object):
+    def __init__(self, url, token=None):
+        self.url = urllib.parse.urlsplit(url)
+        self.path = self.url.path + ('?' + self.url.query if self.url.query else '')
+        self.headers = {}
+        if token is not None:
+            self.headers['Authorization'] = 'Bearer ' + token
+        self.connection = None
+
+    def connect(self) -> http.client.HTTPConnection:
+        if self.url.scheme == 'https':
+            return http.client.HTTPSConnection(self.url.netloc)
+        return http.client.HTTPConnection(self.url.netloc)
+
+    def request(self, connection):
+        connection.request('GET', self.path, headers=self.headers)
+        response = connection.getresponse()
+        response.read()
+        assert response.status < 500, response.status
+        return response
+
+    def new_connection(self):
+        connection = self.connect()
+        try:
+            self.request(connection)
+        finally:
+            connection.close()
+
+    def kept_alive(self):
+        if self.connection is None:
+            self.connection = self.connect()
+        response = self.request(self.connection)
+        # Keep-alive is off when the server closes the connection, count the reconnect in the time
+        if response.will_close:
+            self.connection.close()
+            self.connection = None
+
+
+def main():
+    client = Client(os.environ['BENCH_URL'], os.environ.get('BENCH_TOKEN'))
+
+    report("new connection per request (before)", measure(client.new_connection, ITERATIONS))
+    report("kept alive connection", measure(client.kept_alive, ITERATIONS))
+    if client.connection is None:
+        print("The server closed every connection, keep-alive is not on")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Logins per second and login latency when CLIENTS logins come in at once, for
+a few scrypt costs.
+
+Compares verifying on the request threads, like the builtin driver used to,
+with the PasswordHasher process pool where logins past
+BUILTIN_PASSWORD_QUEUE_SIZE are rejected with a 503.
+
+    python -m benchmarks.password_logins
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cherrypy
+from simple_settings.utils import settings_stub
+
+from benchmarks.common import percentile
+
+from deli_counter.auth.drivers.builtin.passwords import PasswordHasher, hash_password, verify_password
+
+SCRYPT_NS = [2 ** 14, 2 ** 15, 2 ** 16]
+SCRYPT_R = 8
+SCRYPT_P = 1
+WORKERS = 2
+QUEUE_SIZE = 16
+# Request threads of one uwsgi worker all logging in at once
+CLIENTS = 32
+LOGINS_PER_CLIENT = 4
+PASSWORD = 'correct horse battery staple'
+
+
+def run_logins(verify):
+    latencies = []
+    rejected = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(LOGINS_PER_CLIENT):
+            started = time.perf_counter()
+            try:
+                assert verify()
+            except cherrypy.HTTPError as e:
+                assert e.status == 503
+                with lock:
+                    rejected.append(e)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CLIENTS) as executor:
+        for future in [executor.submit(client) for _ in range(CLIENTS)]:
+            future.result()
+    return latencies, len(rejected), time.perf_counter() - started
+
+
+def report_logins(name, latencies, rejected, elapsed):
+    print("%-32s %6.1f logins/s  p50 %8.1fms  p99 %8.1fms  %4d rejected" % (
+        name, len(latencies) / elapsed, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+        rejected))
+
+
+def main():
+    print("%s clients, %s logins each, %s workers, queue of %s" % (CLIENTS, LOGINS_PER_CLIENT, WORKERS, QUEUE_SIZE))
+    for n in SCRYPT_NS:
+        with settings_stub(BUILTIN_PASSWORD_SCRYPT_N=n, BUILTIN_PASSWORD_SCRYPT_R=SCRYPT_R,
+                           BUILTIN_PASSWORD_SCRYPT_P=SCRYPT_P, BUILTIN_PASSWORD_WORKERS=WORKERS,
+                           BUILTIN_PASSWORD_QUEUE_SIZE=QUEUE_SIZE):
+            encoded = hash_password(PASSWORD, n, SCRYPT_R, SCRYPT_P)
+            report_logins("n=%d: request threads (before)" % n, *run_logins(lambda: verify_password(PASSWORD, encoded)))
+
+            hasher = PasswordHasher()
+            # Start the pool's processes before timing
+            hasher.verify(PASSWORD, encoded)
+            report_logins("n=%d: password hasher" % n, *run_logins(lambda: hasher.verify(PASSWORD, encoded)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Latency of one policy check for tokens with 1, 5 and 20 roles.
+
+Compares the query per role the checks used to run with the enforcers in
+deli_counter.auth.enforcers and policies embedded in the token. Only the last
+role of the token has the policy so the query per role runs every query.
+
+    BENCH_DB_URL=... python -m benchmarks.policy_check
+"""
+import random
+import time
+
+from benchmarks.common import measure, report, setup_app
+
+from deli_counter.auth.enforcers.database import DatabasePolicyEnforcer
+from deli_counter.auth.enforcers.memory import MemoryPolicyEnforcer
+from deli_counter.auth.manager import AuthManager
+from deli_counter.test.base import DeliTestCase, SharedMemoryCacheBackend
+from ingredients_db.models.authz import AuthZPolicy, AuthZRolePolicy
+
+ROLE_COUNTS = [1, 5, 20]
+POLICIES_PER_ROLE = 10
+ITERATIONS = 2000
+POLICY_NAME = 'regions:list'
+
+
+def query_per_role(db_session, policy_name, role_ids):
+    # What AuthManager.enforce_policy did before the enforcers
+    with db_session() as session:
+        policy_query = session.query(AuthZPolicy).join(
+            AuthZRolePolicy, AuthZPolicy.id == AuthZRolePolicy.policy_id).filter(AuthZPolicy.name == policy_name)
+        for role_id in role_ids:
+            if policy_query.filter(AuthZRolePolicy.role_id == role_id).first() is not None:
+                return True
+    return False
+
+
+def create_roles(app, count):
+    fixtures = DeliTestCase()
+    with app.database.session() as session:
+        policies = session.query(AuthZPolicy.id, AuthZPolicy.name).all()
+    other_policy_ids = [policy_id for policy_id, name in policies if name != POLICY_NAME]
+    policy_id = [policy_id for policy_id, name in policies if name == POLICY_NAME][0]
+
+    role_ids = [fixtures.create_role(app).id for _ in range(count)]
+    with app.database.session() as session:
+        for role_id in role_ids:
+            granted = random.sample(other_policy_ids, POLICIES_PER_ROLE)
+            if role_id == role_ids[-1]:
+                granted.append(policy_id)
+            for granted_id in granted:
+                role_policy = AuthZRolePolicy()
+                role_policy.role_id = role_id
+                role_policy.policy_id = granted_id
+                session.add(role_policy)
+        session.commit()
+    return role_ids
+
+
+def main():
+    app = setup_app()
+    db_session = app.database.session
+
+    database_enforcer = DatabasePolicyEnforcer(None)
+    memory_enforcer = MemoryPolicyEnforcer(SharedMemoryCacheBackend())
+    auth_manager = AuthManager(SharedMemoryCacheBackend())
+
+    for count in ROLE_COUNTS:
+        role_ids = create_roles(app, count)
+        token = {
+            'roles': {'global': role_ids, 'project': []},
+            'policies': {'global': frozenset([POLICY_NAME]), 'project': frozenset()},
+            'policy_generation': auth_manager.policy_generation.current(),
+            'policies_issued_at': time.time(),
+            # Trusted for the length of the benchmark
+            'policies_max_age': 3600
+        }
+
+        assert query_per_role(db_session, POLICY_NAME, role_ids)
+        report("%2d roles: query per role (before)" % count,
+               measure(lambda: query_per_role(db_session, POLICY_NAME, role_ids), ITERATIONS))
+        report("%2d roles: database enforcer" % count,
+               measure(lambda: database_enforcer.allowed(db_session, POLICY_NAME, role_ids), ITERATIONS))
+        report("%2d roles: memory enforcer" % count,
+               measure(lambda: memory_enforcer.allowed(db_session, POLICY_NAME, role_ids), ITERATIONS))
+        report("%2d roles: embedded policies" % count,
+               measure(lambda: auth_manager.enforce_policy(POLICY_NAME, db_session, token, None), ITERATIONS))
+
+
+if __name__ == '__main__':
+    main()
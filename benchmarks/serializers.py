@@ -0,0 +1,65 @@
+"""
+Throughput of serializing a list page of 100 objects to json, with the
+schematics response models the pages used to go through and with the
+compiled serializers in deli_counter.http.serializers.
+
+    BENCH_DB_URL=... python -m benchmarks.serializers
+"""
+import json
+
+from sqlalchemy.orm import selectinload
+
+from benchmarks.common import measure, report, setup_app
+
+from deli_counter.http.mounts.root.routes.v1.validation_models.instances import ResponseInstance
+from deli_counter.http.mounts.root.routes.v1.validation_models.projects import ResponseProject
+from deli_counter.http.serializers import SERIALIZERS
+from deli_counter.test.base import DeliTestCase
+from ingredients_db.models.instance import Instance
+from ingredients_db.models.project import Project
+
+PAGE_SIZE = 100
+ITERATIONS = 500
+
+
+def schematics_page(response_cls, db_objects):
+    return json.dumps([response_cls.from_database(db_object).to_native() for db_object in db_objects])
+
+
+def serializer_page(response_cls, db_objects, request_fields=None):
+    serializer = SERIALIZERS[response_cls]
+    return json.dumps([serializer.dump(db_object, request_fields) for db_object in db_objects])
+
+
+def main():
+    app = setup_app()
+    fixtures = DeliTestCase()
+
+    project = fixtures.create_project(app)
+    region = fixtures.create_region(app)
+    zone = fixtures.create_zone(app, region=region)
+    network = fixtures.create_network(app, region=region)
+    image = fixtures.create_image(app, project, region=region)
+    for _ in range(PAGE_SIZE):
+        fixtures.create_instance(app, project, region=region, zone=zone, image=image, network=network)
+    for _ in range(PAGE_SIZE - 1):
+        fixtures.create_project(app)
+
+    with app.database.session() as session:
+        pages = [
+            (ResponseInstance, session.query(Instance).options(selectinload(Instance.keypairs)).all()),
+            (ResponseProject, session.query(Project).limit(PAGE_SIZE).all()),
+        ]
+
+        for response_cls, db_objects in pages:
+            name = response_cls.__name__
+            assert schematics_page(response_cls, db_objects) == serializer_page(response_cls, db_objects)
+            report("%s: schematics (before)" % name,
+                   measure(lambda: schematics_page(response_cls, db_objects), ITERATIONS))
+            report("%s: serializer" % name, measure(lambda: serializer_page(response_cls, db_objects), ITERATIONS))
+            report("%s: serializer, fields=id,name" % name,
+                   measure(lambda: serializer_page(response_cls, db_objects, ['id', 'name']), ITERATIONS))
+
+
+if __name__ == '__main__':
+    main()
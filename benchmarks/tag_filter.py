@@ -0,0 +1,119 @@
+"""
+Latency of the first page of GET /v1/instances?tags=... for a project with
+100k instances.
+
+Compares the list route's query with and without the GIN index on tags and
+with loading every instance of the project and filtering it in Python, which
+is what clients had to do before tags could be filtered on.
+
+    BENCH_DB_URL=... python -m benchmarks.tag_filter
+"""
+import ipaddress
+import uuid
+
+from sqlalchemy import text
+
+from benchmarks.common import measure, report, setup_app
+
+from deli_counter.test.base import DeliTestCase
+from ingredients_db.models.instance import Instance, InstanceState
+from ingredients_db.models.network_port import NetworkPort
+
+INSTANCES = 100000
+BATCH_SIZE = 5000
+PAGE_SIZE = 100
+ITERATIONS = 50
+ENVS = ['prod', 'staging', 'dev']
+TEAMS = 50
+
+# (name, tags parameter)
+FILTERS = [
+    ("one in three", "env:prod"),
+    ("one in 150", "env:prod,team:team-7"),
+    ("one in 1000, key only", "pager"),
+]
+
+
+def instance_tags(i):
+    tags = {'env': ENVS[i % len(ENVS)], 'team': "team-%s" % (i % TEAMS)}
+    if i % 1000 == 0:
+        tags['pager'] = 'on'
+    return tags
+
+
+def seed(app):
+    fixtures = DeliTestCase()
+    region = fixtures.create_region(app)
+    network = fixtures.create_network(app, region=region)
+    instance = fixtures.create_instance(app, region=region, network=network)
+    first_address = ipaddress.ip_address('10.0.0.0')
+
+    with app.database.session() as session:
+        for start in range(0, INSTANCES, BATCH_SIZE):
+            ports = []
+            instances = []
+            for i in range(start, min(start + BATCH_SIZE, INSTANCES)):
+                port_id = uuid.uuid4()
+                ports.append({'id': port_id, 'network_id': network.id,
+                              'project_id': instance.project_id, 'ip_address': first_address + i})
+                instances.append({'id': uuid.uuid4(), 'name': "bench-%s" % i, 'region_id': instance.region_id,
+                                  'zone_id': instance.zone_id, 'project_id': instance.project_id,
+                                  'image_id': instance.image_id, 'tags': instance_tags(i),
+                                  'network_port_id': port_id, 'state': InstanceState.ACTIVE,
+                                  'service_account_id': instance.service_account_id})
+            session.bulk_insert_mappings(NetworkPort, ports)
+            session.bulk_insert_mappings(Instance, instances)
+        session.commit()
+        session.execute(text("ANALYZE %s" % Instance.__tablename__))
+        session.commit()
+
+    return instance.project_id
+
+
+def parse_tags(tags):
+    return [tag.partition(":")[::2] for tag in tags.split(",")]
+
+
+def list_page(db_session, project_id, tags):
+    # The query the list route builds for the first page
+    with db_session() as session:
+        query = session.query(Instance).filter(Instance.project_id == project_id)
+        for key, value in parse_tags(tags):
+            if value != '':
+                query = query.filter(Instance.tags.contains({key: value}))
+            else:
+                query = query.filter(Instance.tags.has_key(key))  # noqa: W601
+        return query.order_by(Instance.created_at.desc(), Instance.id.desc()).limit(PAGE_SIZE + 1).all()
+
+
+def filter_in_python(db_session, project_id, tags):
+    with db_session() as session:
+        instances = session.query(Instance).filter(Instance.project_id == project_id).all()
+    wanted = parse_tags(tags)
+    matched = [instance for instance in instances
+               if all(key in instance.tags and value in ('', instance.tags[key]) for key, value in wanted)]
+    matched.sort(key=lambda instance: (instance.created_at, instance.id), reverse=True)
+    return matched[:PAGE_SIZE + 1]
+
+
+def main():
+    app = setup_app()
+    db_session = app.database.session
+    project_id = seed(app)
+
+    for name, tags in FILTERS:
+        assert [i.id for i in list_page(db_session, project_id, tags)] == [
+            i.id for i in filter_in_python(db_session, project_id, tags)]
+        report("%s: gin index" % name, measure(lambda: list_page(db_session, project_id, tags), ITERATIONS))
+        report("%s: in python (before)" % name,
+               measure(lambda: filter_in_python(db_session, project_id, tags), 5, warmup=1))
+
+    with db_session() as session:
+        session.execute(text("DROP INDEX ix_deli_instances_tags"))
+        session.commit()
+    for name, tags in FILTERS:
+        report("%s: no index" % name, measure(lambda: list_page(db_session, project_id, tags), ITERATIONS))
+
+
+if __name__ == '__main__':
+    main()
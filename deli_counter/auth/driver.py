@@ -3,11 +3,12 @@ import logging
 from abc import ABCMeta, abstractmethod
 from typing import Dict
 
+import arrow
 from cryptography.fernet import Fernet
 from simple_settings import settings
 
 from ingredients_db.models.authn import AuthNUser
-from ingredients_db.models.authz import AuthZRole
+from ingredients_db.models.authz import AuthZPolicy, AuthZRolePolicy
 from ingredients_http.router import Router
 
 
@@ -16,6 +17,7 @@ class AuthDriver(object):
 
     def __init__(self, name):
         self.name = name
+        self.auth_manager = None
         self.logger = logging.getLogger("%s.%s" % (self.__module__, self.__class__.__name__))
 
     @abstractmethod
@@ -38,13 +40,10 @@ class AuthDriver(object):
             session.flush()
             session.refresh(user)
 
-        global_role_ids = []
+        global_role_ids = self.auth_manager.role_directory.global_role_ids(session, global_role_names)
 
-        for role_name in global_role_names:
-            role = session.query(AuthZRole).filter(AuthZRole.name == role_name).filter(
-                AuthZRole.project_id == None).first()  # noqa: E711
-            if role is not None:
-                global_role_ids.append(role.id)
+        if project_id is not None and project_role_ids is None:
+            project_role_ids = []
 
         fernet = Fernet(settings.AUTH_FERNET_KEYS[0])
 
@@ -59,8 +58,43 @@ class AuthDriver(object):
 
         if project_id is not None:
             token_data['project_id'] = project_id
-            if project_role_ids is None:
-                project_role_ids = []
             token_data['roles']['project'] = project_role_ids
 
+        if settings.AUTH_TOKEN_EMBED_POLICIES:
+            self.embed_policies(session, token_data)
+
         return fernet.encrypt(json.dumps(token_data).encode())
+
+    def embed_policies(self, session, token_data):
+        """
+        Add the names of the policies the token's roles grant so requests can be
+        authorized without looking up the roles.
+        """
+        # Read the generation before the policies so a change that happens in between
+        # makes the token stale instead of embedding policies that are out of date
+        policy_generation = self.auth_manager.policy_generation.current()
+
+        role_ids = token_data['roles']['global'] + token_data['roles'].get('project', [])
+        global_role_ids = set(str(role_id) for role_id in token_data['roles']['global'])
+
+        global_policies = set()
+        project_policies = set()
+        if len(role_ids) > 0:
+            role_policies = session.query(AuthZRolePolicy.role_id, AuthZPolicy.name).join(
+                AuthZPolicy, AuthZPolicy.id == AuthZRolePolicy.policy_id).filter(
+                AuthZRolePolicy.role_id.in_(role_ids))
+            for role_id, policy_name in role_policies:
+                if str(role_id) in global_role_ids:
+                    global_policies.add(policy_name)
+                else:
+                    project_policies.add(policy_name)
+
+        token_data['version'] = 2
+        token_data['policy_generation'] = policy_generation
+        # The policies are only trusted for max age seconds, even when no change bumped the generation
+        token_data['policies_issued_at'] = arrow.now().float_timestamp
+        token_data['policies_max_age'] = settings.AUTH_TOKEN_POLICIES_MAX_AGE
+        token_data['policies'] = {
+            'global': sorted(global_policies),
+            'project': sorted(project_policies)
+        }
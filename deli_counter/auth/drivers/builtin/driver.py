@@ -1,6 +1,7 @@
 from typing import Dict
 
 from deli_counter.auth.driver import AuthDriver
+from deli_counter.auth.drivers.builtin.passwords import PasswordHasher
 from deli_counter.auth.drivers.builtin.router import DatabaseAuthRouter
 from ingredients_http.router import Router
 
@@ -8,6 +9,7 @@ from ingredients_http.router import Router
 class BuiltInAuthDriver(AuthDriver):
     def __init__(self):
         super().__init__('builtin')
+        self.password_hasher = PasswordHasher()
 
     def discover_options(self) -> Dict:
         return {}
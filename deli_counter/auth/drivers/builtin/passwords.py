@@ -0,0 +1,98 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import cherrypy
+from simple_settings import settings
+
+SCHEME = 'scrypt'
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
+
+
+def hash_password(password: str, n: int, r: int, p: int) -> str:
+    """
+    Hash a password into the format of 'scrypt$n$r$p$salt$hash'
+    """
+    salt = secrets.token_bytes(16)
+    password_hash = _scrypt(password, salt, n, r, p)
+    return "$".join([SCHEME, str(n), str(r), str(p), _b64encode(salt), _b64encode(password_hash)])
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    if not encoded.startswith(SCHEME + '$'):
+        # Passwords created before hashing was added are stored as is
+        return hmac.compare_digest(password.encode(), encoded.encode())
+
+    _, n, r, p, salt, password_hash = encoded.split("$")
+    return hmac.compare_digest(_scrypt(password, _b64decode(salt), int(n), int(r), int(p)), _b64decode(password_hash))
+
+
+class PasswordHasher(object):
+    """
+    Hashes and verifies builtin passwords on a process pool so request threads
+    are not blocked while scrypt runs.
+
+    At most BUILTIN_PASSWORD_QUEUE_SIZE hashes can be queued or running at once,
+    anything past that is rejected with a 503.
+    """
+
+    def __init__(self):
+        self.n = settings.BUILTIN_PASSWORD_SCRYPT_N
+        self.r = settings.BUILTIN_PASSWORD_SCRYPT_R
+        self.p = settings.BUILTIN_PASSWORD_SCRYPT_P
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._queue_slots = threading.BoundedSemaphore(settings.BUILTIN_PASSWORD_QUEUE_SIZE)
+        # Verified against when a user does not exist so that takes as long as a wrong password
+        self._dummy_hash = None
+
+    def __executor(self) -> ProcessPoolExecutor:
+        # Created on first use so the pool belongs to the worker process and not the uwsgi master
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=settings.BUILTIN_PASSWORD_WORKERS)
+        return self._executor
+
+    def __run(self, fn, *args):
+        if not self._queue_slots.acquire(blocking=False):
+            raise cherrypy.HTTPError(503, "Too many logins in progress, please try again later.")
+        try:
+            return self.__executor().submit(fn, *args).result()
+        finally:
+            self._queue_slots.release()
+
+    def hash(self, password: str) -> str:
+        return self.__run(hash_password, password, self.n, self.r, self.p)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return self.__run(verify_password, password, encoded)
+
+    def verify_missing_user(self, password: str):
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash(secrets.token_urlsafe())
+        self.verify(password, self._dummy_hash)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """
+        Check if a password was stored in plain text or hashed with different cost parameters
+        """
+        if not encoded.startswith(SCHEME + '$'):
+            return True
+
+        _, n, r, p, *_ = encoded.split("$")
+        return (int(n), int(r), int(p)) != (self.n, self.r, self.p)
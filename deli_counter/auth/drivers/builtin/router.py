@@ -1,18 +1,18 @@
-import uuid
-
 import arrow
 import cherrypy
 
 from deli_counter.auth.validation_models.builtin import RequestBuiltInLogin, RequestBuiltInCreateUser, \
     ResponseBuiltInUser, RequestBuiltInChangePassword, RequestBuiltInUserRole, ParamsBuiltInUser, ParamsListBuiltInUser
 from deli_counter.http.mounts.root.routes.v1.auth.validation_models.tokens import ResponseOAuthToken
+from deli_counter.http.pagination import PaginationMixin
+from ingredients_db.models.authn import AuthNUser
 from ingredients_db.models.builtin import BuiltInUser
 from ingredients_http.request_methods import RequestMethods
 from ingredients_http.route import Route
 from ingredients_http.router import Router
 
 
-class DatabaseAuthRouter(Router):
+class DatabaseAuthRouter(PaginationMixin, Router):
     def __init__(self, driver):
         super().__init__(uri_base='builtin')
         self.driver = driver
@@ -25,8 +25,27 @@ class DatabaseAuthRouter(Router):
         request: RequestBuiltInLogin = cherrypy.request.model
         with cherrypy.request.db_session() as session:
             user: BuiltInUser = session.query(BuiltInUser).filter(BuiltInUser.username == request.username).first()
-            if user is None or user.password != request.password:
-                raise cherrypy.HTTPError(403, "Invalid username or password")
+            if user is not None:
+                session.expunge(user)
+
+        # Passwords are checked outside of the session so a database connection isn't held while hashing
+        password_hasher = self.driver.password_hasher
+        if user is None:
+            password_hasher.verify_missing_user(request.password)
+            raise cherrypy.HTTPError(403, "Invalid username or password")
+        if password_hasher.verify(request.password, user.password) is False:
+            raise cherrypy.HTTPError(403, "Invalid username or password")
+
+        new_password = None
+        if password_hasher.needs_rehash(user.password):
+            new_password = password_hasher.hash(request.password)
+
+        with cherrypy.request.db_session() as session:
+            if new_password is not None:
+                # Only replace the password if it wasn't changed while we were hashing
+                session.query(BuiltInUser).filter(BuiltInUser.id == user.id).filter(
+                    BuiltInUser.password == user.password).update({BuiltInUser.password: new_password},
+                                                                  synchronize_session=False)
 
             expiry = arrow.now().shift(days=+1)
             token = self.driver.generate_user_token(session, expiry, user.username, user.roles)
@@ -43,13 +62,14 @@ class DatabaseAuthRouter(Router):
     @cherrypy.tools.model_out(cls=ResponseBuiltInUser)
     def create_user(self):
         request: RequestBuiltInCreateUser = cherrypy.request.model
+        password = self.driver.password_hasher.hash(request.password)
         with cherrypy.request.db_session() as session:
             user = BuiltInUser()
             user.username = request.username
-            user.password = request.password
+            user.password = password
 
             session.add(user)
-            session.commit(user)
+            session.commit()
             session.refresh(user)
 
         return ResponseBuiltInUser.from_database(user)
@@ -58,6 +78,7 @@ class DatabaseAuthRouter(Router):
     @cherrypy.tools.model_params(cls=ParamsBuiltInUser)
     @cherrypy.tools.enforce_policy(policy_name="builtin:users:get")
     @cherrypy.tools.model_out(cls=ResponseBuiltInUser)
+    @cherrypy.tools.fields(cls=ResponseBuiltInUser)
     @cherrypy.tools.resource_object(id_param="user_id", cls=BuiltInUser)
     def get_user(self, user_id):
         return ResponseBuiltInUser.from_database(cherrypy.request.resource_object)
@@ -66,8 +87,9 @@ class DatabaseAuthRouter(Router):
     @cherrypy.tools.model_params(cls=ParamsListBuiltInUser)
     @cherrypy.tools.enforce_policy(policy_name="builtin:users:list")
     @cherrypy.tools.model_out_pagination(cls=ResponseBuiltInUser)
-    def list_users(self, limit: int, marker: uuid.UUID):
-        return self.paginate(BuiltInUser, ResponseBuiltInUser, limit, marker)
+    @cherrypy.tools.fields(cls=ResponseBuiltInUser)
+    def list_users(self, limit: int, marker: str, sort: str, total: bool):
+        return self.paginate(BuiltInUser, ResponseBuiltInUser, limit, marker, sort=sort, total=total)
 
     @Route(route='users/{user_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.model_params(cls=ParamsBuiltInUser)
@@ -83,20 +105,27 @@ class DatabaseAuthRouter(Router):
             if user.username == "admin":
                 raise cherrypy.HTTPError(400, "Cannot delete admin user.")
 
+            authn_user_id = session.query(AuthNUser.id).filter(AuthNUser.username == user.username).filter(
+                AuthNUser.driver == self.driver.name).scalar()
+
             session.delete(user)
             session.commit()
 
+        if authn_user_id is not None:
+            self.mount.identity_cache.invalidate_user(authn_user_id)
+
     @Route(route='users', methods=[RequestMethods.PATCH])
     @cherrypy.tools.model_in(cls=RequestBuiltInChangePassword)
     def change_password_self(self):
         request: RequestBuiltInChangePassword = cherrypy.request.model
-        with cherrypy.request.db_session() as session:
-            if cherrypy.request.user.driver != self.driver.name:
-                raise cherrypy.HTTPError(400, "Token is not using 'builtin' authentication.")
+        if cherrypy.request.user.driver != self.driver.name:
+            raise cherrypy.HTTPError(400, "Token is not using 'builtin' authentication.")
 
+        password = self.driver.password_hasher.hash(request.password)
+        with cherrypy.request.db_session() as session:
             user: BuiltInUser = session.query(BuiltInUser).filter(
                 BuiltInUser.username == cherrypy.request.user.username).first()
-            user.password = request.password
+            user.password = password
             session.commit()
 
         cherrypy.response.status = 204
@@ -113,13 +142,13 @@ class DatabaseAuthRouter(Router):
         # Fix for https://github.com/cherrypy/cherrypy/issues/1657
         del cherrypy.response.headers['Content-Type']
         request: RequestBuiltInChangePassword = cherrypy.request.model
+        if cherrypy.request.resource_object.username == "admin":
+            raise cherrypy.HTTPError(400, "Only the admin user can change it's password.")
+
+        password = self.driver.password_hasher.hash(request.password)
         with cherrypy.request.db_session() as session:
             user: BuiltInUser = session.merge(cherrypy.request.resource_object, load=False)
-
-            if user.username == "admin":
-                raise cherrypy.HTTPError(400, "Only the admin user can change it's password.")
-
-            user.password = request.password
+            user.password = password
             session.commit()
 
     @Route(route='users/{user_id}/role/add', methods=[RequestMethods.PUT])
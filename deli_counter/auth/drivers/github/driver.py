@@ -1,15 +1,26 @@
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
+from github import Github
+from github.GithubException import GithubException
 from github.NamedUser import NamedUser
+from github.Organization import Organization
+from github.Requester import Requester
+from github.Team import Team
 from simple_settings import settings
 
 from deli_counter.auth.driver import AuthDriver
+from deli_counter.auth.drivers.github.http import PooledGithubHTTPConnection, PooledGithubHTTPSConnection
 from deli_counter.auth.drivers.github.router import GithubAuthRouter
 
 
 class GithubAuthDriver(AuthDriver):
     def __init__(self):
         super().__init__('github')
+        # Shared by all logins so the number of concurrent requests to GitHub stays bounded
+        self.team_executor = ThreadPoolExecutor(max_workers=settings.GITHUB_TEAM_WORKERS)
+        # Make every GitHub client send its requests through the pooled session
+        Requester.injectConnectionClasses(PooledGithubHTTPConnection, PooledGithubHTTPSConnection)
 
     def auth_router(self) -> GithubAuthRouter:
         return GithubAuthRouter(self)
@@ -17,32 +28,99 @@ class GithubAuthDriver(AuthDriver):
     def discover_options(self) -> Dict:  # pragma: no cover
         return {}
 
-    def check_in_org(self, github_user) -> bool:
+    def github_client(self, login_or_token, password=None) -> Github:
+        return Github(login_or_token, password, base_url=settings.GITHUB_URL, timeout=settings.GITHUB_HTTP_TIMEOUT)
+
+    def find_org(self, github_user) -> Optional[Organization]:
         for org in github_user.get_orgs():
             if org.login == settings.GITHUB_ORG:
-                return True
+                return org
 
-        return False
+        return None
 
-    def find_roles(self, github_user):
-        roles = []
+    def team_role(self, team_name) -> Optional[str]:
+        if team_name in settings.GITHUB_TEAM_ROLES:
+            return settings.GITHUB_TEAM_ROLES[team_name]
 
-        org = None
-        for org in github_user.get_orgs():
-            if org.login == settings.GITHUB_ORG:
-                break
+        if team_name.startswith(settings.GITHUB_TEAM_ROLES_PREFIX):
+            return team_name.replace(settings.GITHUB_TEAM_ROLES_PREFIX, "")
+
+        return None
+
+    @staticmethod
+    def __team_cache_key(github_user, org: Organization):
+        return "github:teams:%s:%s" % (org.login, github_user.login)
+
+    def __cached_role_team_ids(self, github_user, org: Organization) -> Optional[List[int]]:
+        if settings.GITHUB_TEAM_CACHE_TTL <= 0:
+            return None
+        return self.auth_manager.cache_backend.get(self.__team_cache_key(github_user, org))
+
+    def __list_role_teams(self, github_user, org: Organization) -> List[Team]:
+        teams = [team for team in org.get_teams() if self.team_role(team.name) is not None]
+        if settings.GITHUB_TEAM_CACHE_TTL > 0:
+            self.auth_manager.cache_backend.set(self.__team_cache_key(github_user, org),
+                                                [team.id for team in teams], settings.GITHUB_TEAM_CACHE_TTL)
+        return teams
+
+    def role_team_ids(self, github_user, org: Organization) -> List[int]:
+        """
+        Get the ids of the teams in the org that map to a role.
+
+        The org's teams are listed with the user's credentials so the user only gets the teams
+        they can see. Which teams those are is cached per user for GITHUB_TEAM_CACHE_TTL seconds.
+        """
+        team_ids = self.__cached_role_team_ids(github_user, org)
+        if team_ids is None:
+            team_ids = [team.id for team in self.__list_role_teams(github_user, org)]
+        return team_ids
 
-        for team in org.get_teams():
+    def role_teams(self, github_user, org: Organization) -> List[Team]:
+        """
+        Get the teams in the org that map to a role, like role_team_ids.
+        """
+        team_ids = self.__cached_role_team_ids(github_user, org)
+        if team_ids is None:
+            return self.__list_role_teams(github_user, org)
 
-            if team.has_in_members(NamedUser(None, [], {"login": github_user.login}, completed=True)) is False:
-                continue
+        # Loaded by id through the user's client so their credentials are used for the membership checks
+        return list(self.team_executor.map(org.get_team, team_ids))
 
-            if team.name in settings.GITHUB_TEAM_ROLES:
-                roles.append(settings.GITHUB_TEAM_ROLES[team.name])
-                continue
+    def find_roles(self, github_user, org: Organization):
+        if settings.GITHUB_TEAM_RESOLUTION == 'user':
+            try:
+                return self.find_roles_by_user(github_user, org)
+            except GithubException:
+                self.logger.exception("Error while listing the user's GitHub teams, checking org teams instead")
 
-            if team.name.startswith(settings.GITHUB_TEAM_ROLES_PREFIX):
-                roles.append(team.name.replace(settings.GITHUB_TEAM_ROLES_PREFIX, ""))
-                continue
+        return self.find_roles_by_org(github_user, org)
+
+    def find_roles_by_user(self, github_user, org: Organization):
+        """
+        Find roles from the teams the user is in.
+
+        This lists the user's teams once instead of checking each org team. The user's token
+        needs the read:org scope. Teams are matched by id against the org's teams so a team
+        with the same name in another org does not give a role.
+        """
+        role_team_ids = set(self.role_team_ids(github_user, org))
+
+        roles = []
+        for team in github_user.get_teams():
+            if team.id in role_team_ids:
+                roles.append(self.team_role(team.name))
+
+        return roles
+
+    def find_roles_by_org(self, github_user, org: Organization):
+        member = NamedUser(None, [], {"login": github_user.login}, completed=True)
+        teams = self.role_teams(github_user, org)
+
+        is_member = self.team_executor.map(lambda team: team.has_in_members(member), teams)
+
+        roles = []
+        for team, in_team in zip(teams, is_member):
+            if in_team:
+                roles.append(self.team_role(team.name))
 
         return roles
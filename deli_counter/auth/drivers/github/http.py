@@ -0,0 +1,86 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from simple_settings import settings
+from urllib3.util.retry import Retry
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class GithubRetry(Retry):
+    # GitHub's secondary rate limits respond with a 403 and a Retry-After header
+    RETRY_AFTER_STATUS_CODES = frozenset([403, 413, 429, 503])
+
+
+def github_session() -> requests.Session:
+    """
+    The HTTP session used for every request to GitHub.
+
+    Connections are kept alive and pooled between logins. Idempotent requests are
+    retried with backoff on 5xx responses and when GitHub asks us to back off.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = GithubRetry(total=settings.GITHUB_HTTP_RETRIES,
+                                    backoff_factor=settings.GITHUB_HTTP_BACKOFF,
+                                    status_forcelist=[500, 502, 503, 504],
+                                    raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=settings.GITHUB_HTTP_POOL_SIZE,
+                                      pool_maxsize=settings.GITHUB_HTTP_POOL_SIZE,
+                                      max_retries=retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+
+    return _session
+
+
+class PooledGithubResponse(object):
+    """
+    Mimics the httplib response that PyGithub reads
+    """
+
+    def __init__(self, response: requests.Response):
+        self.response = response
+        self.status = response.status_code
+
+    def getheaders(self):
+        return self.response.headers.items()
+
+    def read(self):
+        return self.response.content
+
+
+class PooledGithubHTTPSConnection(object):
+    """
+    Mimics the httplib connection that PyGithub creates for every request
+    but sends the request through the pooled github_session.
+    """
+    protocol = 'https'
+    default_port = 443
+
+    def __init__(self, host, port=None, strict=False, timeout=None, **kwargs):
+        self.base_url = "%s://%s:%s" % (self.protocol, host, self.default_port if port is None else port)
+        self.timeout = settings.GITHUB_HTTP_TIMEOUT if timeout is None else timeout
+        self.response = None
+
+    def request(self, verb, url, input, headers):
+        self.response = github_session().request(verb, self.base_url + url, data=input, headers=headers,
+                                                 timeout=self.timeout, allow_redirects=False)
+
+    def getresponse(self) -> PooledGithubResponse:
+        return PooledGithubResponse(self.response)
+
+    def close(self):
+        # The connection goes back to the session's pool
+        self.response = None
+
+
+class PooledGithubHTTPConnection(PooledGithubHTTPSConnection):
+    protocol = 'http'
+    default_port = 80
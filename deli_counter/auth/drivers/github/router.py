@@ -2,12 +2,12 @@ import arrow
 import cherrypy
 import github
 import github.AuthenticatedUser
-import requests
 import requests.exceptions
 from github.GithubException import TwoFactorException, GithubException, BadCredentialsException
 from simple_settings import settings
 from sqlalchemy_utils.types.json import json
 
+from deli_counter.auth.drivers.github.http import github_session
 from deli_counter.auth.validation_models.github import RequestGithubAuthorization, RequestGithubToken
 from deli_counter.http.mounts.root.routes.v1.auth.validation_models.tokens import ResponseOAuthToken
 from ingredients_http.request_methods import RequestMethods
@@ -22,13 +22,14 @@ class GithubAuthRouter(Router):
 
     def generate_token(self, token_github_client):
         github_user = token_github_client.get_user()
-        if self.driver.check_in_org(github_user) is False:
+        org = self.driver.find_org(github_user)
+        if org is None:
             raise cherrypy.HTTPError(403, "User not a member of GitHub organization: '" + settings.GITHUB_ORG + "'")
 
         with cherrypy.request.db_session() as session:
             expiry = arrow.now().shift(days=+1)
             token = self.driver.generate_user_token(session, expiry, github_user.login,
-                                                    self.driver.find_roles(github_user))
+                                                    self.driver.find_roles(github_user, org))
             session.commit()
 
         response = ResponseOAuthToken()
@@ -43,7 +44,7 @@ class GithubAuthRouter(Router):
     def authorization(self):  # Used to get token via API (username and password Auth Flow)
         request: RequestGithubAuthorization = cherrypy.request.model
 
-        user_github_client = github.Github(request.username, request.password, base_url=settings.GITHUB_URL)
+        user_github_client = self.driver.github_client(request.username, request.password)
         github_user: github.AuthenticatedUser.AuthenticatedUser = user_github_client.get_user()
 
         try:
@@ -63,7 +64,7 @@ class GithubAuthRouter(Router):
             self.logger.exception("Error while validating GitHub authorization")
             raise cherrypy.HTTPError(424, "Backend error while talking with GitHub: " + json.dumps(e.data))
 
-        return self.generate_token(github.Github(authorization.token, base_url=settings.GITHUB_URL))
+        return self.generate_token(self.driver.github_client(authorization.token))
 
     @Route(route='token', methods=[RequestMethods.OPTIONS])
     @cherrypy.config(**{'tools.authentication.on': False})
@@ -80,20 +81,20 @@ class GithubAuthRouter(Router):
         request: RequestGithubToken = cherrypy.request.model
 
         # TODO: how to get this url since the settings only has the api url?
-        r = requests.post('https://github.com/login/oauth/access_token', json={
+        r = github_session().post('https://github.com/login/oauth/access_token', json={
             'client_id': settings.GITHUB_CLIENT_ID,
             'client_secret': settings.GITHUB_CLIENT_SECRET,
             'code': request.authorizationCode
-        }, headers={'Accept': 'application/json'})
+        }, headers={'Accept': 'application/json'}, timeout=settings.GITHUB_HTTP_TIMEOUT)
 
         if r.status_code == 404:
             raise cherrypy.HTTPError(404, "Unknown Authorization Code")
         elif r.status_code != 200:
             try:
                 r.raise_for_status()
-            except request.exceptions.RequestException as e:
+            except requests.exceptions.RequestException as e:
                 self.logger.exception("Error while validating GitHub access token")
                 raise cherrypy.HTTPError(424, "Backend error while talking with GitHub: " + e.response.text)
 
         access_token_data = r.json()
-        return self.generate_token(github.Github(access_token_data['access_token'], base_url=settings.GITHUB_URL))
+        return self.generate_token(self.driver.github_client(access_token_data['access_token']))
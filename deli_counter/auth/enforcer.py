@@ -0,0 +1,27 @@
+import logging
+from abc import ABCMeta, abstractmethod
+
+from deli_counter.cache.backend import CacheBackend
+
+
+class PolicyEnforcer(object):
+    __metaclass__ = ABCMeta
+
+    def __init__(self, name, cache_backend: CacheBackend):
+        self.name = name
+        self.cache_backend = cache_backend
+        self.logger = logging.getLogger("%s.%s" % (self.__module__, self.__class__.__name__))
+
+    @abstractmethod
+    def allowed(self, db_session, policy_name, role_ids) -> bool:
+        """
+        Check if any of the roles has the policy
+        """
+        raise NotImplementedError
+
+    def invalidate_roles(self, role_ids):
+        """
+        Called after roles are changed or deleted, the policy generation has
+        already been bumped when this is called
+        """
+        pass
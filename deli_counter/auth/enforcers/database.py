@@ -0,0 +1,35 @@
+from sqlalchemy import select, exists, and_, any_, bindparam, cast
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from deli_counter.auth.enforcer import PolicyEnforcer
+from ingredients_db.models.authz import AuthZPolicy, AuthZRolePolicy
+
+# Built once so the compiled statement can be reused between requests.
+# Role ids are sent as a single array parameter so the statement text does not
+# change with the number of roles in the token.
+_policy_exists = select([
+    exists().where(and_(
+        AuthZRolePolicy.policy_id == AuthZPolicy.id,
+        AuthZPolicy.name == bindparam('policy_name'),
+        AuthZRolePolicy.role_id == any_(cast(bindparam('role_ids'), ARRAY(UUID)))
+    ))
+])
+
+
+class DatabasePolicyEnforcer(PolicyEnforcer):
+    """
+    Checks policies with one EXISTS query covering every role in the token.
+    """
+
+    def __init__(self, cache_backend):
+        super().__init__('database', cache_backend)
+        self.compiled_cache = {}
+
+    def allowed(self, db_session, policy_name, role_ids) -> bool:
+        if len(role_ids) == 0:
+            return False
+
+        with db_session() as session:
+            connection = session.connection(execution_options={'compiled_cache': self.compiled_cache})
+            return connection.execute(_policy_exists, policy_name=policy_name,
+                                      role_ids=[str(role_id) for role_id in role_ids]).scalar()
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from simple_settings import settings
+
+from deli_counter.auth.enforcer import PolicyEnforcer
+from deli_counter.auth.generation import PolicyGeneration
+from deli_counter.cache.backend import CacheBackend
+from ingredients_db.models.authz import AuthZPolicy, AuthZRolePolicy
+
+
+class MemoryPolicyEnforcer(PolicyEnforcer):
+    """
+    Answers policy checks from an in-memory copy of the role to policy mappings.
+
+    Policy names are interned to bit positions and every role is stored as an
+    integer bitmask of the policies it has so a check is a few dict lookups and
+    a bitwise and.
+
+    Roles that have not been seen yet are loaded on demand. Everything is
+    reloaded on the next check after the policy generation changes, which is
+    why the cache backend has to be shared between processes.
+    A full reload also happens every AUTH_POLICY_REFRESH_INTERVAL seconds to
+    pick up changes made outside of the api.
+    """
+
+    def __init__(self, cache_backend: CacheBackend):
+        super().__init__('memory', cache_backend)
+        if not cache_backend.shared:
+            # Other processes would never see the policy generation change and keep their revoked policies
+            raise ValueError("The memory policy enforcer needs a CACHE_BACKEND that is shared between processes, "
+                             "the '%s' cache backend is not." % cache_backend.name)
+        self.refresh_interval = settings.AUTH_POLICY_REFRESH_INTERVAL
+        self.policy_generation = PolicyGeneration(cache_backend)
+
+        self._policy_bits = {}
+        self._role_masks = {}
+        self._generation = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def __policy_bit(policy_bits, policy_name):
+        bit = policy_bits.get(policy_name)
+        if bit is None:
+            bit = 1 << len(policy_bits)
+            policy_bits[policy_name] = bit
+        return bit
+
+    @staticmethod
+    def __query(session):
+        return session.query(AuthZRolePolicy.role_id, AuthZPolicy.name).join(
+            AuthZPolicy, AuthZPolicy.id == AuthZRolePolicy.policy_id)
+
+    def __load(self, db_session):
+        with db_session() as session:
+            policy_names = [name for name, in session.query(AuthZPolicy.name)]
+            role_policies = self.__query(session).all()
+
+        # Build new structures and swap them in so readers never see a partial load
+        policy_bits = {}
+        role_masks = {}
+        for policy_name in policy_names:
+            self.__policy_bit(policy_bits, policy_name)
+        for role_id, policy_name in role_policies:
+            role_id = str(role_id)
+            role_masks[role_id] = role_masks.get(role_id, 0) | self.__policy_bit(policy_bits, policy_name)
+
+        self._policy_bits = policy_bits
+        self._role_masks = role_masks
+        self._loaded_at = time.monotonic()
+        self.logger.debug("Loaded %s policies for %s roles" % (len(policy_bits), len(role_masks)))
+
+    def __load_roles(self, db_session, role_ids):
+        with db_session() as session:
+            role_policies = self.__query(session).filter(AuthZRolePolicy.role_id.in_(role_ids)).all()
+
+        role_masks = dict.fromkeys(role_ids, 0)
+        for role_id, policy_name in role_policies:
+            role_id = str(role_id)
+            role_masks[role_id] |= self.__policy_bit(self._policy_bits, policy_name)
+
+        self._role_masks.update(role_masks)
+
+    def __ensure_loaded(self, db_session):
+        generation = self.policy_generation.current()
+        if self._loaded_at is not None and generation == self._generation and \
+                time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            if self._loaded_at is not None and generation == self._generation and \
+                    time.monotonic() - self._loaded_at < self.refresh_interval:
+                return
+            self.__load(db_session)
+            self._generation = generation
+
+    def allowed(self, db_session, policy_name, role_ids) -> bool:
+        self.__ensure_loaded(db_session)
+
+        role_ids = [str(role_id) for role_id in role_ids]
+        missing_role_ids = [role_id for role_id in role_ids if role_id not in self._role_masks]
+        if len(missing_role_ids) > 0:
+            with self._lock:
+                missing_role_ids = [role_id for role_id in missing_role_ids if role_id not in self._role_masks]
+                if len(missing_role_ids) > 0:
+                    self.__load_roles(db_session, missing_role_ids)
+
+        policy_bit = self._policy_bits.get(policy_name)
+        if policy_bit is None:
+            return False
+
+        role_masks = self._role_masks
+        for role_id in role_ids:
+            if role_masks.get(role_id, 0) & policy_bit:
+                return True
+
+        return False
+
+    def invalidate_roles(self, role_ids):
+        """
+        Forget the given roles so they are loaded again on their next check
+        """
+        with self._lock:
+            for role_id in role_ids:
+                self._role_masks.pop(str(role_id), None)
@@ -0,0 +1,36 @@
+import uuid
+
+from deli_counter.cache.backend import CacheBackend
+
+
+class PolicyGeneration(object):
+    """
+    A value shared through the cache backend that changes every time roles or
+    their policies change.
+
+    Anything derived from role policies (in-memory copies, policies embedded in
+    tokens) records the generation it was built from and is stale once the
+    current generation is different.
+
+    It is only bumped when roles or their policies change through the api.
+    """
+
+    KEY = 'authz:generation'
+
+    def __init__(self, cache_backend: CacheBackend):
+        self.cache_backend = cache_backend
+
+    def current(self) -> str:
+        generation = self.cache_backend.get(self.KEY)
+        if generation is None:
+            # Nothing has set a generation yet (or it was evicted) so start one, unless another
+            # process just did in which case that one is used so both agree
+            generation = uuid.uuid4().hex
+            if not self.cache_backend.add(self.KEY, generation, 0):
+                generation = self.cache_backend.get(self.KEY) or generation
+        return generation
+
+    def bump(self) -> str:
+        generation = uuid.uuid4().hex
+        self.cache_backend.set(self.KEY, generation, 0)
+        return generation
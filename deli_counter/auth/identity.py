@@ -0,0 +1,60 @@
+import logging
+
+from deli_counter.cache.backend import CacheBackend
+from ingredients_db.models.authn import AuthNUser, AuthNServiceAccount
+from ingredients_db.models.project import Project
+
+
+class IdentityCache(object):
+    """
+    Caches the principals and projects that tokens resolve to so that
+    authenticating a request does not need a database round trip.
+
+    Deletes are only seen by every process when the cache backend is shared.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.logger = logging.getLogger("%s.%s" % (self.__module__, self.__class__.__name__))
+        self.backend = backend
+        self.ttl = ttl
+        if not backend.shared and ttl > 0:
+            self.logger.warning("The '%s' cache backend is not shared between processes, deleted users, service "
+                                "accounts and projects stay valid in other processes for up to %s seconds"
+                                % (backend.name, ttl))
+
+    @staticmethod
+    def __key(kind, object_id):
+        return "identity:%s:%s" % (kind, object_id)
+
+    def __get(self, kind, cls, db_session, object_id):
+        key = self.__key(kind, object_id)
+        obj = self.backend.get(key)
+        if obj is not None:
+            return obj
+
+        with db_session() as session:
+            obj = session.query(cls).filter(cls.id == object_id).first()
+            if obj is None:
+                return None
+            session.expunge(obj)
+
+        self.backend.set(key, obj, self.ttl)
+        return obj
+
+    def get_user(self, db_session, user_id) -> AuthNUser:
+        return self.__get('user', AuthNUser, db_session, user_id)
+
+    def get_service_account(self, db_session, service_account_id) -> AuthNServiceAccount:
+        return self.__get('service_account', AuthNServiceAccount, db_session, service_account_id)
+
+    def get_project(self, db_session, project_id) -> Project:
+        return self.__get('project', Project, db_session, project_id)
+
+    def invalidate_user(self, user_id):
+        self.backend.delete(self.__key('user', user_id))
+
+    def invalidate_service_account(self, service_account_id):
+        self.backend.delete(self.__key('service_account', service_account_id))
+
+    def invalidate_project(self, project_id):
+        self.backend.delete(self.__key('project', project_id))
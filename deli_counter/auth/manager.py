@@ -1,18 +1,32 @@
 import importlib
 import logging
 
+import arrow
 import cherrypy
 from simple_settings import settings
 
 from deli_counter.auth.driver import AuthDriver
-from ingredients_db.models.authz import AuthZPolicy, AuthZRolePolicy
+from deli_counter.auth.enforcer import PolicyEnforcer
+from deli_counter.auth.generation import PolicyGeneration
+from deli_counter.auth.roles import RoleDirectory
+from deli_counter.cache.backend import CacheBackend
+from deli_counter.utils import load_class
 from ingredients_db.models.project import Project
 
 
 class AuthManager(object):
-    def __init__(self):
+    def __init__(self, cache_backend: CacheBackend):
         self.logger = logging.getLogger("%s.%s" % (self.__module__, self.__class__.__name__))
+        if settings.AUTH_TOKEN_EMBED_POLICIES and not cache_backend.shared:
+            # Other processes would never see the policy generation change and keep trusting revoked policies
+            raise ValueError("AUTH_TOKEN_EMBED_POLICIES needs a CACHE_BACKEND that is shared between processes, "
+                             "the '%s' cache backend is not." % cache_backend.name)
         self.drivers = {}
+        self.cache_backend = cache_backend
+        self.policy_generation = PolicyGeneration(cache_backend)
+        self.role_directory = RoleDirectory(self.policy_generation)
+        policy_enforcer_klass = load_class(settings.AUTH_POLICY_ENFORCER, PolicyEnforcer)
+        self.policy_enforcer: PolicyEnforcer = policy_enforcer_klass(cache_backend)
 
     def load_drivers(self):
         for driver_string in settings.AUTH_DRIVERS:
@@ -36,23 +50,41 @@ class AuthManager(object):
                 raise ValueError("AUTH_DRIVER class is not a subclass of '" + AuthDriver.__module__ + ".AuthDriver'")
 
             driver: AuthDriver = driver_klass()
+            driver.auth_manager = self
             self.drivers[driver.name] = driver
 
         if len(self.drivers) == 0:
             raise ValueError("No auth drivers loaded")
 
-    def enforce_policy(self, policy_name, session, token: dict, project: Project):
+    def __embedded_policies_current(self, token: dict) -> bool:
+        if token.get('policy_generation') != self.policy_generation.current():
+            return False
+        # Changes made outside of the api do not bump the generation so the policies also expire
+        issued_at = token.get('policies_issued_at')
+        max_age = token.get('policies_max_age')
+        if issued_at is None or max_age is None:
+            return False
+        return arrow.now().float_timestamp - issued_at < max_age
 
-        policy_query = session.query(AuthZPolicy). \
-            join(AuthZRolePolicy, AuthZPolicy.id == AuthZRolePolicy.policy_id).filter(AuthZPolicy.name == policy_name)
+    def enforce_policy(self, policy_name, db_session, token: dict, project: Project):
+        policies = token.get('policies')
+        if policies is not None and self.__embedded_policies_current(token):
+            # The token's policies are still current so we don't need to look at its roles
+            if policy_name in policies['global']:
+                return
+            if project is not None and policy_name in policies['project']:
+                return
+            raise cherrypy.HTTPError(403, "Insufficient permissions to perform the requested action.")
 
         role_ids = token['roles']['global']
         if project is not None:
             role_ids = token['roles']['project'] + role_ids
 
-        for role_id in role_ids:
-            policy = policy_query.filter(AuthZRolePolicy.role_id == role_id).first()
-            if policy is not None:
-                return
+        if self.policy_enforcer.allowed(db_session, policy_name, role_ids):
+            return
 
         raise cherrypy.HTTPError(403, "Insufficient permissions to perform the requested action.")
+
+    def invalidate_roles(self, role_ids):
+        self.policy_generation.bump()
+        self.policy_enforcer.invalidate_roles(role_ids)
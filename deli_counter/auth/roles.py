@@ -0,0 +1,64 @@
+import threading
+
+from deli_counter.auth.generation import PolicyGeneration
+from ingredients_db.models.authz import AuthZRole
+
+
+class RoleDirectory(object):
+    """
+    Resolves role names to ids and back in bulk.
+
+    Resolved roles are kept in memory until the policy generation changes.
+    Roles that are not found are not remembered so they are looked up again
+    the next time they are asked for.
+    """
+
+    def __init__(self, policy_generation: PolicyGeneration):
+        self.policy_generation = policy_generation
+        self._global_ids_by_name = {}
+        self._names_by_id = {}
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def __check_generation(self):
+        generation = self.policy_generation.current()
+        if generation != self._generation:
+            with self._lock:
+                self._global_ids_by_name = {}
+                self._names_by_id = {}
+                self._generation = generation
+
+    def global_role_ids(self, session, role_names) -> list:
+        """
+        Get the ids of the global roles with the given names, names without a role are skipped
+        """
+        self.__check_generation()
+        global_ids_by_name = self._global_ids_by_name
+
+        missing_role_names = [role_name for role_name in role_names if role_name not in global_ids_by_name]
+        if len(missing_role_names) > 0:
+            roles = session.query(AuthZRole.id, AuthZRole.name).filter(
+                AuthZRole.name.in_(missing_role_names)).filter(AuthZRole.project_id == None)  # noqa: E711
+            with self._lock:
+                for role_id, role_name in roles:
+                    global_ids_by_name[role_name] = role_id
+                    self._names_by_id[str(role_id)] = role_name
+
+        return [global_ids_by_name[role_name] for role_name in role_names if role_name in global_ids_by_name]
+
+    def role_names(self, session, role_ids) -> list:
+        """
+        Get the names of the roles with the given ids, ids without a role are skipped
+        """
+        self.__check_generation()
+        names_by_id = self._names_by_id
+
+        role_ids = [str(role_id) for role_id in role_ids]
+        missing_role_ids = [role_id for role_id in role_ids if role_id not in names_by_id]
+        if len(missing_role_ids) > 0:
+            roles = session.query(AuthZRole.id, AuthZRole.name).filter(AuthZRole.id.in_(missing_role_ids))
+            with self._lock:
+                for role_id, role_name in roles:
+                    names_by_id[str(role_id)] = role_name
+
+        return [names_by_id[role_id] for role_id in role_ids if role_id in names_by_id]
@@ -0,0 +1,51 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache(object):
+    """
+    A bounded LRU cache of decrypted token data keyed by a digest of the raw token.
+
+    Entries are only returned while the token they belong to has not expired.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str):
+        key = self._digest(token)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+
+            token_json, expires_at = entry
+            if expires_at <= time.time():
+                del self._tokens[key]
+                return None
+
+            self._tokens.move_to_end(key)
+            return token_json
+
+    def set(self, token: str, token_json: dict, expires_at: float):
+        if self.max_size <= 0:
+            return
+
+        key = self._digest(token)
+        with self._lock:
+            self._tokens[key] = (token_json, expires_at)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
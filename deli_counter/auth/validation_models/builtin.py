@@ -1,5 +1,5 @@
 from schematics import Model
-from schematics.types import StringType, ListType, UUIDType, IntType
+from schematics.types import StringType, ListType, UUIDType, IntType, BooleanType
 
 from ingredients_db.models.builtin import BuiltInUser
 from ingredients_http.schematics.types import ArrowType
@@ -11,7 +11,9 @@ class ParamsBuiltInUser(Model):
 
 class ParamsListBuiltInUser(Model):
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'username', '-username'], default='-created_at')
+    total = BooleanType(default=False)
 
 
 class RequestBuiltInLogin(Model):
@@ -0,0 +1,34 @@
+import logging
+from abc import ABCMeta, abstractmethod
+
+
+class CacheBackend(object):
+    __metaclass__ = ABCMeta
+
+    # Whether values set by one process are seen by every other process
+    shared = False
+
+    def __init__(self, name):
+        self.name = name
+        self.logger = logging.getLogger("%s.%s" % (self.__module__, self.__class__.__name__))
+
+    @abstractmethod
+    def get(self, key: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: str, value, ttl: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add(self, key: str, value, ttl: int) -> bool:
+        """
+        Set the value only if the key has none, atomically for every process sharing the cache
+
+        Returns whether the value was set
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str):
+        raise NotImplementedError
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from deli_counter.cache.backend import CacheBackend
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Keeps cached values in the memory of the current process.
+
+    Values are not shared between processes so invalidations are only seen
+    by the process that made them.
+    """
+
+    def __init__(self, max_items=10000):
+        super().__init__('memory')
+        self.max_items = max_items
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+
+            return value
+
+    def set(self, key: str, value, ttl: int):
+        with self._lock:
+            self.__set(key, value, ttl)
+
+    def add(self, key: str, value, ttl: int) -> bool:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and (item[1] is None or item[1] > time.monotonic()):
+                return False
+            self.__set(key, value, ttl)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __set(self, key, value, ttl):
+        expires_at = None
+        if ttl is not None and ttl > 0:
+            expires_at = time.monotonic() + ttl
+
+        self._items[key] = (value, expires_at)
+        if len(self._items) > self.max_items:
+            self.__purge()
+
+    def __purge(self):
+        now = time.monotonic()
+        for key in [k for k, (_, expires_at) in self._items.items() if expires_at is not None and expires_at <= now]:
+            del self._items[key]
+
+        # Still too big so drop the oldest items
+        while len(self._items) > self.max_items:
+            del self._items[next(iter(self._items))]
@@ -0,0 +1,47 @@
+import pickle
+
+from simple_settings import settings
+
+from deli_counter.cache.backend import CacheBackend
+
+try:
+    import uwsgi
+except ImportError:  # pragma: no cover
+    uwsgi = None
+
+
+class UWSGICacheBackend(CacheBackend):
+    """
+    Stores cached values in a uWSGI cache so they are shared between all the
+    workers of a uWSGI instance.
+
+    The cache named by CACHE_UWSGI_NAME must be configured in wsgi.ini.
+    """
+
+    shared = True
+
+    def __init__(self):
+        super().__init__('uwsgi')
+        if uwsgi is None:
+            raise ValueError("The uWSGI cache backend can only be used when running under uWSGI")
+        self.cache_name = settings.CACHE_UWSGI_NAME
+
+    def get(self, key: str):
+        value = uwsgi.cache_get(key, self.cache_name)
+        if value is None:
+            return None
+        return pickle.loads(value)
+
+    def set(self, key: str, value, ttl: int):
+        data = pickle.dumps(value)
+        if not uwsgi.cache_update(key, data, ttl or 0, self.cache_name):
+            # The cache is full or the value is bigger than cache2 in wsgi.ini allows
+            self.logger.warning("Could not store '%s' (%s bytes) in the uWSGI cache '%s'"
+                                % (key, len(data), self.cache_name))
+
+    def add(self, key: str, value, ttl: int) -> bool:
+        # cache_set, unlike cache_update, does not replace an existing value
+        return bool(uwsgi.cache_set(key, pickle.dumps(value), ttl or 0, self.cache_name))
+
+    def delete(self, key: str):
+        uwsgi.cache_del(key, self.cache_name)
@@ -1,7 +1,9 @@
 import secrets
 
 from clify.command import Command
+from simple_settings import settings
 
+from deli_counter.auth.drivers.builtin.passwords import hash_password
 from ingredients_db.models.builtin import BuiltInUser
 
 
@@ -26,7 +28,8 @@ class GenAdminCommand(Command):
 
             user = BuiltInUser()
             user.username = 'admin'
-            user.password = password
+            user.password = hash_password(password, settings.BUILTIN_PASSWORD_SCRYPT_N,
+                                          settings.BUILTIN_PASSWORD_SCRYPT_R, settings.BUILTIN_PASSWORD_SCRYPT_P)
             user.roles = ["admin"]
             session.add(user)
             session.commit()
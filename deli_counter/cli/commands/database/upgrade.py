@@ -1,5 +1,7 @@
 from clify.command import Command
 
+from deli_counter.db import schema
+
 
 class UpgradeCommand(Command):
     def __init__(self):
@@ -13,4 +15,5 @@ class UpgradeCommand(Command):
 
     def run(self, args) -> int:
         self.parent.database.upgrade(args.revision)
+        schema.upgrade(self.parent.database.engine)
         return 0
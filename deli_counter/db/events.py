@@ -0,0 +1,200 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from simple_settings import settings
+from sqlalchemy import and_, func, or_, select
+
+from deli_counter.db.listener import Listener
+from deli_counter.db.schema import EVENTS_CHANNEL
+from deli_counter.db.tables import events
+
+# Events are read in id order but ids are taken when the event is written, so a transaction can
+# commit a lower id after a higher one was read. Skipped ids are looked for again for this many seconds.
+GAP_TIMEOUT = 10
+# Larger jumps in ids are left by the sequence and not by transactions still running
+MAX_GAPS = 1000
+# Max number of events waiting to be sent to a stream before it is ended
+SUBSCRIPTION_QUEUE_SIZE = 1000
+
+
+class Subscription(object):
+    def __init__(self, project_id, resource_type):
+        self.project_id = project_id
+        self.resource_type = resource_type
+        self.queue = queue.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+        # Set when the stream fell behind and events were dropped, it has to be resumed from its last event
+        self.overflowed = False
+
+    def put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+
+class EventHub(object):
+    """
+    Reads the state changes the triggers record in deli_events once per notification and
+    fans them out to the subscriptions for their project and resource type, so open streams
+    do not query the database for every change.
+
+    Events older than EVENTS_RETENTION are pruned except for the newest one, so a stream
+    resuming from a pruned event can tell it missed events.
+    """
+
+    def __init__(self, db_session, listener: Listener):
+        self.logger = logging.getLogger("%s.%s" % (self.__module__, self.__class__.__name__))
+        self.db_session = db_session
+        self.listener = listener
+        self.max_subscriptions = settings.EVENTS_MAX_SUBSCRIBERS
+        self.retention = settings.EVENTS_RETENTION
+        self.prune_interval = settings.EVENTS_PRUNE_INTERVAL
+
+        self._subscriptions = {}
+        self._subscription_count = 0
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+
+        self._last_id = None
+        self._gaps = {}
+        self._pruned_at = None
+
+    def __notified(self, payload):
+        self._pending.set()
+
+    def read(self):
+        """
+        Read the events written since the last read and hand them to their subscriptions
+        """
+        with self.db_session() as session:
+            if self._last_id is None:
+                # Only events written from now on are fanned out, streams read older ones themselves
+                self._last_id = self.last_id(session)
+                return
+
+            condition = events.c.id > self._last_id
+            if len(self._gaps) > 0:
+                condition = or_(condition, events.c.id.in_(list(self._gaps)))
+            rows = session.execute(select([events]).where(condition).order_by(events.c.id)).fetchall()
+
+        now = time.monotonic()
+        for row in rows:
+            self._gaps.pop(row.id, None)
+            if row.id > self._last_id:
+                if row.id - self._last_id <= MAX_GAPS:
+                    for gap_id in range(self._last_id + 1, row.id):
+                        self._gaps[gap_id] = now
+                self._last_id = row.id
+
+            with self._lock:
+                subscriptions = list(self._subscriptions.get((row.project_id, row.resource_type), []))
+            for subscription in subscriptions:
+                subscription.put(row)
+
+        self._gaps = {gap_id: seen_at for gap_id, seen_at in self._gaps.items() if now - seen_at < GAP_TIMEOUT}
+
+    def prune(self):
+        """
+        Delete the events older than EVENTS_RETENTION seconds except the newest
+        """
+        with self.db_session() as session:
+            newest_id = select([func.max(events.c.id)]).as_scalar()
+            session.execute(events.delete().where(and_(
+                events.c.created_at < func.now() - timedelta(seconds=self.retention),
+                events.c.id < newest_id)))
+            session.commit()
+
+    def backlog(self, session, project_id, resource_type, last_event_id):
+        """
+        Get the events after last_event_id for the project's resources of the resource type
+
+        Returns the events and whether events after last_event_id were already pruned, in
+        which case there are no events and the stream should tell its client to start over.
+        """
+        if last_event_id is None:
+            return [], False
+
+        oldest_id = session.execute(select([func.min(events.c.id)])).scalar()
+        if oldest_id is not None and oldest_id > last_event_id + 1:
+            return [], True
+
+        return session.execute(select([events]).where(and_(
+            events.c.project_id == project_id,
+            events.c.resource_type == resource_type,
+            events.c.id > last_event_id)).order_by(events.c.id)).fetchall(), False
+
+    def last_id(self, session) -> int:
+        return session.execute(select([func.coalesce(func.max(events.c.id), 0)])).scalar()
+
+    def full(self) -> bool:
+        with self._lock:
+            return self._subscription_count >= self.max_subscriptions
+
+    def __run(self):
+        while True:
+            self._pending.clear()
+            try:
+                self.read()
+                if settings.EVENTS_PRUNE and (
+                        self._pruned_at is None or time.monotonic() - self._pruned_at >= self.prune_interval):
+                    self.prune()
+                    self._pruned_at = time.monotonic()
+            except Exception:
+                self.logger.exception("Error reading events, retrying in 1 second")
+                time.sleep(1)
+                continue
+
+            self._ready.set()
+            # Skipped ids are looked for every second until they show up or time out
+            self._pending.wait(1 if len(self._gaps) > 0 else self.prune_interval)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Listening first so no event written after the first read goes unnoticed
+            self.listener.add_callback(EVENTS_CHANNEL, self.__notified)
+            self._thread = threading.Thread(target=self.__run, name='event-hub', daemon=True)
+            self._thread.start()
+
+    @contextmanager
+    def subscribe(self, project_id, resource_type):
+        """
+        Get a subscription receiving the events of the project's resources of the resource type
+        that are written from now on.
+
+        The subscription is None when EVENTS_MAX_SUBSCRIBERS streams are already open in this
+        process, every stream holds a thread while it is open.
+        """
+        with self._lock:
+            if self._subscription_count >= self.max_subscriptions:
+                subscription = None
+            else:
+                self._subscription_count += 1
+                subscription = Subscription(project_id, resource_type)
+                self._subscriptions.setdefault((project_id, resource_type), set()).add(subscription)
+
+        if subscription is None:
+            yield None
+            return
+
+        try:
+            self.start()
+            # Streams read their backlog once the hub is reading so no event falls in between
+            self._ready.wait(GAP_TIMEOUT)
+            yield subscription
+        finally:
+            with self._lock:
+                key = (project_id, resource_type)
+                self._subscriptions[key].discard(subscription)
+                if len(self._subscriptions[key]) == 0:
+                    del self._subscriptions[key]
+                self._subscription_count -= 1
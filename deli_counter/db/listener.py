@@ -0,0 +1,133 @@
+import logging
+import select
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy.engine import Engine
+
+
+class Listener(object):
+    """
+    Receives postgres notifications on a dedicated connection in a background
+    thread and wakes the request threads waiting for them, so waiting for
+    something to change does not need a query per request per second.
+
+    Every waiter is woken when the connection is lost since notifications sent
+    before it is listening again are missed. Waiters always have to check the
+    database after being woken.
+    """
+
+    def __init__(self, engine: Engine, channels, max_waiters):
+        self.logger = logging.getLogger("%s.%s" % (self.__module__, self.__class__.__name__))
+        self.engine = engine
+        self.channels = channels
+
+        self._waiter_slots = threading.BoundedSemaphore(max_waiters)
+        self._waiters = {}
+        self._callbacks = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def __wake(self, key):
+        with self._lock:
+            for event in self._waiters.get(key, []):
+                event.set()
+
+    def __wake_all(self):
+        with self._lock:
+            for events in self._waiters.values():
+                for event in events:
+                    event.set()
+            callbacks = [callback for callbacks in self._callbacks.values() for callback in callbacks]
+        for callback in callbacks:
+            callback(None)
+
+    def __callback(self, channel, payload):
+        with self._lock:
+            callbacks = list(self._callbacks.get(channel, []))
+        for callback in callbacks:
+            callback(payload)
+
+    def __connect(self):
+        connection = self.engine.raw_connection()
+        # The connection is kept for as long as the process runs so it should not count against the pool
+        connection.detach()
+        dbapi_connection = connection.connection
+        dbapi_connection.autocommit = True
+        with dbapi_connection.cursor() as cursor:
+            for channel in self.channels:
+                cursor.execute('LISTEN %s' % channel)
+        return dbapi_connection
+
+    def __listen(self, connection):
+        while True:
+            if select.select([connection], [], [], 5) == ([], [], []):
+                continue
+            connection.poll()
+            while connection.notifies:
+                notify = connection.notifies.pop(0)
+                self.__wake((notify.channel, notify.payload))
+                self.__wake((notify.channel, None))
+                self.__callback(notify.channel, notify.payload)
+
+    def __run(self):
+        while True:
+            connection = None
+            try:
+                connection = self.__connect()
+                # Anything that happened while not listening was missed
+                self.__wake_all()
+                self.__listen(connection)
+            except Exception:
+                self.logger.exception("Error listening for notifications, reconnecting in 1 second")
+                if connection is not None:
+                    connection.close()
+                self.__wake_all()
+                time.sleep(1)
+
+    def __ensure_started(self):
+        # Started on first use so the thread belongs to the worker process and not the uwsgi master
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self.__run, name='listener', daemon=True)
+                    self._thread.start()
+
+    def add_callback(self, channel, callback):
+        """
+        Call callback with the payload of every notification sent on the channel, and with None
+        when notifications may have been missed.
+
+        Callbacks run on the listener's thread so they should only hand the notification off.
+        """
+        with self._lock:
+            self._callbacks.setdefault(channel, []).append(callback)
+        self.__ensure_started()
+
+    @contextmanager
+    def waiting(self, channel, payload=None):
+        """
+        Get an event that is set when a notification is sent on the channel with the payload,
+        or with any payload when it is None.
+
+        The event is None when too many threads are already waiting so the caller should
+        not wait, waiting threads can not serve other requests.
+        """
+        if not self._waiter_slots.acquire(blocking=False):
+            yield None
+            return
+
+        self.__ensure_started()
+        key = (channel, payload)
+        event = threading.Event()
+        with self._lock:
+            self._waiters.setdefault(key, set()).add(event)
+        try:
+            yield event
+        finally:
+            with self._lock:
+                self._waiters[key].discard(event)
+                if len(self._waiters[key]) == 0:
+                    del self._waiters[key]
+            self._waiter_slots.release()
@@ -0,0 +1,182 @@
+from sqlalchemy import and_, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from deli_counter.db.tables import metadata, task_resources
+from ingredients_db.models.authz import AuthZPolicy, AuthZRole, AuthZRolePolicy
+from ingredients_db.models.images import Image
+from ingredients_db.models.instance import Instance
+from ingredients_db.models.keypair import Keypair
+from ingredients_db.models.network import Network
+from ingredients_db.models.network_port import NetworkPort
+from ingredients_db.models.project import Project
+from ingredients_db.models.region import Region
+from ingredients_db.models.task import Task
+from ingredients_db.models.zones import Zone
+
+# Indexes needed by deli counter's queries that the ingredients_db migrations do not create
+# (name, table, definition)
+INDEXES = [
+    # Tag filters when listing instances (@> and ?)
+    ('ix_deli_instances_tags', Instance.__tablename__, 'USING gin (tags)'),
+
+    # Keyset pagination, the sort column followed by the id after any equality filters the list route has
+    ('ix_deli_instances_project_created_at', Instance.__tablename__, '(project_id, created_at, id)'),
+    ('ix_deli_instances_project_name', Instance.__tablename__, '(project_id, name, id)'),
+    ('ix_deli_images_created_at', Image.__tablename__, '(created_at, id)'),
+    ('ix_deli_images_name', Image.__tablename__, '(name, id)'),
+    ('ix_deli_keypairs_project_created_at', Keypair.__tablename__, '(project_id, created_at, id)'),
+    ('ix_deli_keypairs_project_name', Keypair.__tablename__, '(project_id, name, id)'),
+    ('ix_deli_network_ports_project_created_at', NetworkPort.__tablename__, '(project_id, created_at, id)'),
+    ('ix_deli_networks_created_at', Network.__tablename__, '(created_at, id)'),
+    ('ix_deli_networks_name', Network.__tablename__, '(name, id)'),
+    ('ix_deli_projects_created_at', Project.__tablename__, '(created_at, id)'),
+    ('ix_deli_projects_name', Project.__tablename__, '(name, id)'),
+    ('ix_deli_tasks_created_at', Task.__tablename__, '(created_at, id)'),
+    ('ix_deli_tasks_name', Task.__tablename__, '(name, id)'),
+]
+
+# Notified with the task's id when a task stops so long polls for it do not have to query until it has
+TASK_STOPPED_CHANNEL = 'deli_task_stopped'
+
+TRIGGERS = [
+    "CREATE OR REPLACE FUNCTION deli_notify_task_stopped() RETURNS trigger AS $$ "
+    "BEGIN PERFORM pg_notify('%s', NEW.id::text); RETURN NEW; END; $$ LANGUAGE plpgsql" % TASK_STOPPED_CHANNEL,
+    "DROP TRIGGER IF EXISTS deli_task_stopped ON %s" % Task.__tablename__,
+    "CREATE TRIGGER deli_task_stopped AFTER UPDATE OF stopped_at ON %s FOR EACH ROW "
+    "WHEN (OLD.stopped_at IS NULL AND NEW.stopped_at IS NOT NULL) "
+    "EXECUTE PROCEDURE deli_notify_task_stopped()" % Task.__tablename__,
+]
+
+# Notified with the project's id when a state change is recorded in deli_events
+EVENTS_CHANNEL = 'deli_events'
+
+# Resources whose state changes are recorded, (resource type, table)
+EVENT_RESOURCES = [
+    ('instance', Instance.__tablename__),
+    ('image', Image.__tablename__),
+]
+
+TRIGGERS.append(
+    "CREATE OR REPLACE FUNCTION deli_record_event() RETURNS trigger AS $$ "
+    "DECLARE resource RECORD; new_state text; "
+    "BEGIN "
+    "IF TG_OP = 'DELETE' THEN resource := OLD; new_state := 'DELETED'; "
+    "ELSE resource := NEW; new_state := NEW.state::text; END IF; "
+    "IF resource.project_id IS NOT NULL THEN "
+    "INSERT INTO deli_events (project_id, resource_type, resource_id, state) "
+    "VALUES (resource.project_id, TG_ARGV[0], resource.id, new_state); "
+    "PERFORM pg_notify('%s', resource.project_id::text); "
+    "END IF; "
+    "RETURN NULL; END; $$ LANGUAGE plpgsql" % EVENTS_CHANNEL)
+for resource_type, table in EVENT_RESOURCES:
+    TRIGGERS.extend([
+        "DROP TRIGGER IF EXISTS deli_record_event ON %s" % table,
+        "DROP TRIGGER IF EXISTS deli_record_event_update ON %s" % table,
+        "CREATE TRIGGER deli_record_event AFTER INSERT OR DELETE ON %s FOR EACH ROW "
+        "EXECUTE PROCEDURE deli_record_event('%s')" % (table, resource_type),
+        "CREATE TRIGGER deli_record_event_update AFTER UPDATE OF state ON %s FOR EACH ROW "
+        "WHEN (OLD.state IS DISTINCT FROM NEW.state) "
+        "EXECUTE PROCEDURE deli_record_event('%s')" % (table, resource_type),
+    ])
+
+
+# Links the current tasks of resources created before deli_task_resources existed, later tasks are
+# linked by deli_counter.tasks.outbox.create_task. (table, whether it has a project_id)
+TASK_RESOURCES = [
+    (Instance.__tablename__, True),
+    (Image.__tablename__, True),
+    (Network.__tablename__, False),
+    (Region.__tablename__, False),
+    (Zone.__tablename__, False),
+]
+BACKFILLS = []
+for table, has_project in TASK_RESOURCES:
+    BACKFILLS.append(
+        "INSERT INTO %s (task_id, project_id, resource_type, resource_id) "
+        "SELECT current_task_id, %s, '%s', id FROM %s WHERE current_task_id IS NOT NULL "
+        "ON CONFLICT DO NOTHING" % (task_resources.name, 'project_id' if has_project else 'NULL', table, table))
+
+# Policies for deli counter's routes that the ingredients_db migrations do not create
+# (name, description, tags). Tags pick the default roles new projects give the policy to.
+POLICIES = [
+    ('tasks:get:project', "Get a task of the project's instances and images", ['project_member', 'service_account']),
+    ('tasks:list:project', "List the tasks of the project's instances and images",
+     ['project_member', 'service_account']),
+    ('tasks:get:global', "Get a task of a region, zone or network", []),
+    ('tasks:list:global', "List the tasks of regions, zones and networks", []),
+]
+
+# The default role of every project that gets the policies with the tag
+TAG_ROLES = {
+    'project_member': 'default_member',
+    'service_account': 'default_service_account',
+}
+
+# Global roles that get every policy in POLICIES
+GLOBAL_ROLES = ['admin', 'viewer']
+
+
+def create_policies(engine: Engine):
+    """
+    Create the missing policies and give them to the global roles and to the default
+    roles of existing projects, projects created later get them through their tags.
+    """
+    session = Session(bind=engine)
+    try:
+        for name, description, tags in POLICIES:
+            if session.query(AuthZPolicy).filter(AuthZPolicy.name == name).first() is not None:
+                continue
+
+            role_names = [TAG_ROLES[tag] for tag in tags]
+
+            policy = AuthZPolicy()
+            policy.name = name
+            policy.description = description
+            policy.rule = " or ".join("role:%s" % role_name for role_name in GLOBAL_ROLES + role_names)
+            policy.tags = tags
+            session.add(policy)
+            session.flush()
+
+            roles = session.query(AuthZRole.id).filter(or_(
+                and_(AuthZRole.project_id == None, AuthZRole.name.in_(GLOBAL_ROLES)),  # noqa: E711
+                and_(AuthZRole.project_id != None, AuthZRole.name.in_(role_names))))  # noqa: E711
+            for role_id, in roles:
+                role_policy = AuthZRolePolicy()
+                role_policy.role_id = role_id
+                role_policy.policy_id = policy.id
+                session.add(role_policy)
+
+        session.commit()
+    finally:
+        session.close()
+
+
+def upgrade(engine: Engine):
+    """
+    Create any missing tables, indexes, triggers and policies and backfill new tables.
+
+    Indexes are built concurrently so upgrading does not block writes to large tables.
+    """
+    metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        for statement in TRIGGERS + BACKFILLS:
+            connection.execute(statement)
+
+    create_policies(engine)
+
+    names = [name for name, _, _ in INDEXES]
+    with engine.connect() as connection:
+        # Concurrent index builds can not run inside a transaction
+        connection = connection.execution_options(isolation_level='AUTOCOMMIT')
+
+        # A concurrent build that failed leaves an invalid index behind which IF NOT EXISTS would skip
+        invalid = connection.execute(text(
+            "SELECT c.relname FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"), names=names).fetchall()
+        for name, in invalid:
+            connection.execute('DROP INDEX CONCURRENTLY IF EXISTS %s' % name)
+
+        for name, table, definition in INDEXES:
+            connection.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS %s ON %s %s' % (name, table, definition))
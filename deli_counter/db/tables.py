@@ -0,0 +1,43 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, MetaData, String, Table, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+
+# Tables deli counter needs that are not part of the ingredients_db models
+metadata = MetaData()
+
+# Task messages waiting to be published by deli_counter.tasks.outbox.OutboxRelay
+task_outbox = Table(
+    'deli_task_outbox', metadata,
+    Column('id', BigInteger, primary_key=True),
+    Column('task_name', String, nullable=False),
+    # args, kwargs and options for apply_async encoded with kombu's json
+    Column('body', Text, nullable=False),
+    Column('created_at', DateTime(timezone=True), nullable=False, server_default=func.now())
+)
+
+# State changes of project resources recorded by the triggers in deli_counter.db.schema,
+# streamed by deli_counter.db.events.EventHub
+events = Table(
+    'deli_events', metadata,
+    # The event id clients resume streams from
+    Column('id', BigInteger, primary_key=True),
+    Column('project_id', UUID(as_uuid=True), nullable=False),
+    Column('resource_type', String, nullable=False),
+    Column('resource_id', UUID(as_uuid=True), nullable=False),
+    Column('state', String, nullable=False),
+    Column('created_at', DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Index('ix_deli_events_project_id', 'project_id', 'resource_type', 'id'),
+    Index('ix_deli_events_created_at', 'created_at')
+)
+
+# The resource and project of every task deli_counter.tasks.outbox.create_task creates, tasks have
+# neither of their own so the tasks API is scoped through this
+task_resources = Table(
+    'deli_task_resources', metadata,
+    Column('task_id', UUID(as_uuid=True), primary_key=True),
+    # Null for resources that are not in a project, i.e. regions, zones and networks
+    Column('project_id', UUID(as_uuid=True)),
+    # The resource's table name
+    Column('resource_type', String, nullable=False),
+    Column('resource_id', UUID(as_uuid=True), nullable=False),
+    Index('ix_deli_task_resources_project_id', 'project_id', 'task_id')
+)
@@ -0,0 +1,89 @@
+import json
+import queue
+import time
+
+import cherrypy
+from simple_settings import settings
+
+from deli_counter.db.events import EventHub
+
+
+class EventStreamMixin(object):
+    def __format(self, event_id, event_type, data) -> bytes:
+        return ("id: %s\nevent: %s\ndata: %s\n\n" % (event_id, event_type, json.dumps(data))).encode('utf-8')
+
+    def stream_events(self, resource_type, state_cls, last_event_id):
+        """
+        Stream the state changes of the scoped project's resources of the resource type as server-sent events.
+
+        Streams resume after the Last-Event-ID header or the last_event_id param. When events after it
+        were already pruned a reset event is sent instead and the client should list the resources again.
+        Streams end after EVENTS_STREAM_DURATION seconds so the threads they hold are handed back, clients
+        reconnect with the id of the last event they received.
+        """
+        hub: EventHub = self.mount.event_hub
+        if hub.full():
+            raise cherrypy.HTTPError(503, "Too many event streams are open, try again later.")
+
+        header = cherrypy.request.headers.get('Last-Event-ID')
+        if header is not None:
+            try:
+                last_event_id = int(header)
+            except ValueError:
+                raise cherrypy.HTTPError(400, "Invalid Last-Event-ID header.")
+
+        project_id = cherrypy.request.project.id
+        db_session = cherrypy.request.db_session
+
+        cherrypy.response.headers['Content-Type'] = 'text/event-stream'
+        cherrypy.response.headers['Cache-Control'] = 'no-cache'
+        cherrypy.response.stream = True
+
+        def state(name):
+            # The triggers record the enum's name like sqlalchemy stores it
+            if name in state_cls.__members__:
+                return state_cls[name].value
+            return name
+
+        def state_change(event):
+            return self.__format(event.id, 'state', {
+                'resource_type': event.resource_type,
+                'resource_id': event.resource_id,
+                'state': state(event.state),
+                'created_at': event.created_at.isoformat()
+            })
+
+        def generate():
+            with hub.subscribe(project_id, resource_type) as subscription:
+                # Clients reconnect after a second when the stream ends
+                yield b'retry: 1000\n\n'
+                if subscription is None:
+                    return
+
+                with db_session() as session:
+                    backlog, reset = hub.backlog(session, project_id, resource_type, last_event_id)
+                    if reset:
+                        yield self.__format(hub.last_id(session), 'reset', {})
+
+                sent = set()
+                for event in backlog:
+                    sent.add(event.id)
+                    yield state_change(event)
+
+                deadline = time.monotonic() + settings.EVENTS_STREAM_DURATION
+                while not subscription.overflowed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        event = subscription.queue.get(timeout=min(remaining, settings.EVENTS_KEEPALIVE_INTERVAL))
+                    except queue.Empty:
+                        # Writing to a client that went away ends the stream
+                        yield b': keepalive\n\n'
+                        continue
+
+                    if event.id not in sent:
+                        sent.add(event.id)
+                        yield state_change(event)
+
+        return generate()
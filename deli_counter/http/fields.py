@@ -0,0 +1,83 @@
+import logging
+
+import cherrypy
+from schematics import Model
+from schematics.exceptions import DataError
+from sqlalchemy import inspect
+
+from ingredients_http.errors.validation import ResponseValidationError
+
+
+def parse_fields(cls, value):
+    """
+    Parse the comma separated fields query parameter into a list of the response
+    model's fields
+    """
+    if not isinstance(value, str):
+        raise cherrypy.HTTPError(400, "fields can only be given once.")
+
+    request_fields = []
+    for name in value.split(","):
+        if name not in cls._fields:
+            raise cherrypy.HTTPError(400, "Unknown field '%s'." % name)
+        if name not in request_fields:
+            request_fields.append(name)
+    return request_fields
+
+
+def requested(name) -> bool:
+    """
+    Check if a response field was asked for
+    """
+    request_fields = getattr(cherrypy.serving.request, 'fields', None)
+    return request_fields is None or name in request_fields
+
+
+def load_only_columns(db_cls, request_fields, *required):
+    """
+    The column attributes of db_cls that need to be loaded to build the requested fields
+    """
+    column_names = inspect(db_cls).column_attrs.keys()
+    return [name for name in column_names if name in request_fields or name in required]
+
+
+class LoadedAttributes(object):
+    """
+    Wraps an object loaded with load_only so from_database can read every attribute.
+
+    Attributes that were not loaded read as None (or an empty list for relationships)
+    instead of being loaded one object at a time.
+    """
+
+    def __init__(self, db_object):
+        state = inspect(db_object)
+        self._db_object = db_object
+        self._unloaded = state.unloaded
+        self._relationships = state.mapper.relationships
+
+    def __getattr__(self, name):
+        if name in self._unloaded:
+            if name in self._relationships and self._relationships[name].uselist:
+                return []
+            return None
+        return getattr(self._db_object, name)
+
+
+def export(value: Model, request_fields=None) -> dict:
+    """
+    Validate a response model and export only the requested fields
+    """
+    try:
+        # Fields that were not asked for are not set
+        value.validate(partial=request_fields is not None)
+    except DataError as e:
+        try:
+            raise ResponseValidationError(e)
+        except ResponseValidationError:
+            cherrypy.log.error('Error with model_out response', severity=logging.ERROR, traceback=True)
+            raise
+
+    native = value.to_native()
+    if request_fields is None:
+        return native
+    return {name: native[name] for name in request_fields}
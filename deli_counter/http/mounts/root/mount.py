@@ -2,12 +2,22 @@ import json
 
 import arrow
 import cherrypy
+from celery import current_app
 from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from kombu import Connection
 from simple_settings import settings
 
+from deli_counter.auth.identity import IdentityCache
 from deli_counter.auth.manager import AuthManager
-from ingredients_db.models.authn import AuthNUser, AuthNServiceAccount
-from ingredients_db.models.project import Project
+from deli_counter.auth.token_cache import TokenCache
+from deli_counter.cache.backend import CacheBackend
+from deli_counter.db.events import EventHub
+from deli_counter.db.listener import Listener
+from deli_counter.db.schema import TASK_STOPPED_CHANNEL, EVENTS_CHANNEL
+from deli_counter.http import tools
+from deli_counter.tasks.outbox import OutboxRelay
+from deli_counter.tasks.publisher import Publisher
+from deli_counter.utils import load_class
 from ingredients_http.app import HTTPApplication
 from ingredients_http.app_mount import ApplicationMount
 from ingredients_http.route import Route
@@ -19,7 +29,15 @@ class RootMount(ApplicationMount):
     def __init__(self, app: HTTPApplication):
         super().__init__(app=app, mount_point='/')
         self.auth_manager: AuthManager = None
+        self.fernet: MultiFernet = None
+        self.token_cache: TokenCache = None
+        self.cache_backend: CacheBackend = None
+        self.identity_cache: IdentityCache = None
         self.messaging = None
+        self.publisher: Publisher = None
+        self.outbox_relay: OutboxRelay = None
+        self.listener: Listener = None
+        self.event_hub: EventHub = None
 
     def validate_token(self):
         authorization_header = cherrypy.request.headers.get('Authorization', None)
@@ -31,45 +49,53 @@ class RootMount(ApplicationMount):
         if method != 'Bearer':
             raise cherrypy.HTTPError(400, 'Only Bearer tokens are allowed.')
 
-        fernets = []
-        for key in settings.AUTH_FERNET_KEYS:
-            fernets.append(Fernet(key))
-        fernet = MultiFernet(fernets)
+        token_json = self.token_cache.get(fernet_token)
+        if token_json is None:
+            try:
+                token_data_bytes = self.fernet.decrypt(fernet_token.encode())
+            except InvalidToken:
+                raise cherrypy.HTTPError(401, 'Invalid Authorization Token.')
 
-        try:
-            token_data_bytes = fernet.decrypt(fernet_token.encode())
-        except InvalidToken:
-            raise cherrypy.HTTPError(401, 'Invalid Authorization Token.')
+            token_json = json.loads(token_data_bytes.decode())
 
-        token_json = json.loads(token_data_bytes.decode())
+            if 'policies' in token_json:
+                token_json['policies'] = {
+                    'global': frozenset(token_json['policies']['global']),
+                    'project': frozenset(token_json['policies']['project'])
+                }
 
-        expires_at = arrow.get(token_json['expires_at'])
+            expires_at = arrow.get(token_json['expires_at'])
 
-        if expires_at <= arrow.now():
-            # Token is expired so it is invalid
-            raise cherrypy.HTTPError(401, 'Invalid Authorization Token.')
+            if expires_at <= arrow.now():
+                # Token is expired so it is invalid
+                raise cherrypy.HTTPError(401, 'Invalid Authorization Token.')
+
+            self.token_cache.set(fernet_token, token_json, expires_at.float_timestamp)
 
         cherrypy.request.token = {
-            'roles': token_json['roles']
+            'roles': token_json['roles'],
+            'policies': token_json.get('policies'),
+            'policy_generation': token_json.get('policy_generation'),
+            'policies_issued_at': token_json.get('policies_issued_at'),
+            'policies_max_age': token_json.get('policies_max_age')
         }
 
-        with cherrypy.request.db_session() as session:
-            if 'service_account_id' in token_json:
-                user = session.query(AuthNServiceAccount).filter(
-                    AuthNServiceAccount.id == token_json['service_account_id']).first()
-            else:
-                user = session.query(AuthNUser).filter(AuthNUser.id == token_json['user_id']).first()
-            if user is None:
+        if 'service_account_id' in token_json:
+            user = self.identity_cache.get_service_account(cherrypy.request.db_session,
+                                                           token_json['service_account_id'])
+        else:
+            user = self.identity_cache.get_user(cherrypy.request.db_session, token_json['user_id'])
+        if user is None:
+            raise cherrypy.HTTPError(401, 'Invalid Authorization Token.')
+        cherrypy.request.user = user
+
+        cherrypy.request.project = None
+        if 'project_id' in token_json:
+            cherrypy.request.project = self.identity_cache.get_project(cherrypy.request.db_session,
+                                                                       token_json['project_id'])
+            if cherrypy.request.project is None:
+                # The project was deleted, the token must not turn into an unscoped one
                 raise cherrypy.HTTPError(401, 'Invalid Authorization Token.')
-            session.expunge(user)
-            cherrypy.request.user = user
-
-            cherrypy.request.project = None
-            if 'project_id' in token_json:
-                project = session.query(Project).filter(Project.id == token_json['project_id']).first()
-                if project is not None:
-                    cherrypy.request.project = project
-                    session.expunge(project)
 
     def validate_project_scope(self):
         if cherrypy.request.project is None:
@@ -77,8 +103,8 @@ class RootMount(ApplicationMount):
 
     def enforce_policy(self, policy_name, resource_object=None):
         resource_object = getattr(cherrypy.request, "resource_object", resource_object)
-        with cherrypy.request.db_session() as session:
-            self.auth_manager.enforce_policy(policy_name, session, cherrypy.request.token, cherrypy.request.project)
+        self.auth_manager.enforce_policy(policy_name, cherrypy.request.db_session, cherrypy.request.token,
+                                         cherrypy.request.project)
 
     def resource_object(self, id_param, cls):
         resource_id = cherrypy.request.params[id_param]
@@ -101,19 +127,55 @@ class RootMount(ApplicationMount):
         cherrypy.tools.enforce_policy = cherrypy.Tool('before_request_body', self.enforce_policy, priority=40)
         cherrypy.tools.resource_object = cherrypy.Tool('before_request_body', self.resource_object, priority=50)
 
+        # Runs before model_params so it can take the fields param out of the request params
+        cherrypy.tools.fields = cherrypy.Tool('before_request_body', tools.fields, priority=5)
+        # Replace the ingredients_http tools to support fields and the cursor from PaginationMixin.paginate
+        cherrypy.tools.model_out = cherrypy.Tool('before_handler', tools.model_out)
+        cherrypy.tools.model_out_pagination = cherrypy.Tool('before_handler', tools.model_out_pagination)
+
+    def __setup_cache(self):
+        cache_backend_klass = load_class(settings.CACHE_BACKEND, CacheBackend)
+        self.cache_backend = cache_backend_klass()
+
     def __setup_auth(self):
-        self.auth_manager = AuthManager()
+        self.identity_cache = IdentityCache(self.cache_backend, settings.AUTH_IDENTITY_CACHE_TTL)
+
+        self.auth_manager = AuthManager(self.cache_backend)
         self.auth_manager.load_drivers()
 
+        self.fernet = MultiFernet([Fernet(key) for key in settings.AUTH_FERNET_KEYS])
+        self.token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+
     def __setup_messaging(self):
         self.messaging = Messaging(settings.RABBITMQ_HOST, settings.RABBITMQ_PORT, settings.RABBITMQ_USERNAME,
                                    settings.RABBITMQ_PASSWORD, settings.RABBITMQ_VHOST)
         self.messaging.connect()
 
+        connection = Connection(hostname=settings.RABBITMQ_HOST, port=settings.RABBITMQ_PORT,
+                                userid=settings.RABBITMQ_USERNAME, password=settings.RABBITMQ_PASSWORD,
+                                virtual_host=settings.RABBITMQ_VHOST)
+        self.publisher = Publisher(current_app, connection)
+
+        if settings.TASK_OUTBOX_RELAY:
+            # Needs uwsgi's lazy-apps so the thread is started in every worker instead of the master
+            self.outbox_relay = OutboxRelay(self.app.database.session, self.publisher.publish)
+            self.outbox_relay.start()
+
+    def __setup_listener(self):
+        self.listener = Listener(self.app.database.engine, [TASK_STOPPED_CHANNEL, EVENTS_CHANNEL],
+                                 settings.TASK_WAIT_MAX_WAITERS)
+
+        self.event_hub = EventHub(self.app.database.session, self.listener)
+        if settings.EVENTS_PRUNE:
+            # Started here so events are pruned even when no stream was opened in this process
+            self.event_hub.start()
+
     def setup(self):
         self.__setup_tools()
+        self.__setup_cache()
         self.__setup_auth()
         self.__setup_messaging()
+        self.__setup_listener()
         super().setup()
 
     def mount_config(self):
@@ -14,6 +14,7 @@ class AuthRouter(Router):
 
         for _, driver in self.drivers.items():
             driver_router: Router = driver.auth_router()
+            driver_router.mount = self.mount
             driver_router.setup_routes(dispatcher, uri_prefix)
 
         super().setup_routes(dispatcher, uri_prefix)
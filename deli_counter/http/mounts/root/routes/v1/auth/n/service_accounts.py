@@ -1,10 +1,9 @@
-import uuid
-
 import cherrypy
 from sqlalchemy.orm import Query
 
 from deli_counter.http.mounts.root.routes.v1.auth.n.validation_models.service_accounts import \
     RequestCreateServiceAccount, ResponseServiceAccount, ParamsServiceAccount, ParamsListServiceAccount
+from deli_counter.http.pagination import PaginationMixin
 from ingredients_db.models.authn import AuthNServiceAccount
 from ingredients_db.models.authz import AuthZRole
 from ingredients_http.request_methods import RequestMethods
@@ -12,7 +11,7 @@ from ingredients_http.route import Route
 from ingredients_http.router import Router
 
 
-class AuthNUserRouter(Router):
+class AuthNUserRouter(PaginationMixin, Router):
     def __init__(self):
         super().__init__('service-accounts')
 
@@ -52,6 +51,7 @@ class AuthNUserRouter(Router):
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_params(cls=ParamsServiceAccount)
     @cherrypy.tools.model_out(cls=ResponseServiceAccount)
+    @cherrypy.tools.fields(cls=ResponseServiceAccount)
     @cherrypy.tools.resource_object(id_param="service_account_id", cls=AuthNServiceAccount)
     @cherrypy.tools.enforce_policy(policy_name="service_accounts:get")
     def get(self, service_account_id):
@@ -61,13 +61,15 @@ class AuthNUserRouter(Router):
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_params(cls=ParamsListServiceAccount)
     @cherrypy.tools.model_out_pagination(cls=ResponseServiceAccount)
+    @cherrypy.tools.fields(cls=ResponseServiceAccount)
     @cherrypy.tools.enforce_policy(policy_name="service_account:list")
-    def list(self, limit: int, marker: uuid.UUID):
+    def list(self, limit: int, marker: str, sort: str, total: bool):
         project = cherrypy.request.project
         starting_query = Query(AuthNServiceAccount).filter(AuthNServiceAccount.project_id == project.id)
-        return self.paginate(AuthNServiceAccount, ResponseServiceAccount, limit, marker, starting_query=starting_query)
+        return self.paginate(AuthNServiceAccount, ResponseServiceAccount, limit, marker, starting_query=starting_query,
+                             sort=sort, total=total)
 
-    @Route('{service_account}', methods=[RequestMethods.DELETE])
+    @Route('{service_account_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_params(cls=ParamsServiceAccount)
     @cherrypy.tools.resource_object(id_param="service_account_id", cls=AuthNServiceAccount)
@@ -86,3 +88,5 @@ class AuthNUserRouter(Router):
 
             session.delete(service_account)
             session.commit()
+
+        self.mount.identity_cache.invalidate_service_account(service_account_id)
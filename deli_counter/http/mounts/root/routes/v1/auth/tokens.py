@@ -19,18 +19,12 @@ class AuthNTokenRouter(Router):
     @Route()
     @cherrypy.tools.model_out(cls=ResponseVerifyToken)
     def get(self):
-        global_role_names = []
+        role_directory = self.mount.auth_manager.role_directory
         project_role_names = []
         with cherrypy.request.db_session() as session:
-            for role_id in cherrypy.request.token['roles']['global']:
-                role = session.query(AuthZRole).filter(AuthZRole.id == role_id).first()
-                if role is not None:
-                    global_role_names.append(role.name)
+            global_role_names = role_directory.role_names(session, cherrypy.request.token['roles']['global'])
             if cherrypy.request.project is not None:
-                for role_id in cherrypy.request.token['roles']['project']:
-                    role = session.query(AuthZRole).filter(AuthZRole.id == role_id).first()
-                    if role is not None:
-                        project_role_names.append(role.name)
+                project_role_names = role_directory.role_names(session, cherrypy.request.token['roles']['project'])
 
         response = ResponseVerifyToken()
 
@@ -81,12 +75,8 @@ class AuthNTokenRouter(Router):
 
             # Do we want to ask the driver for roles again or do we just copy them over?
 
-            global_role_names = []
-            for role_id in cherrypy.request.token['roles']['global']:
-                print(role_id)
-                role = session.query(AuthZRole).filter(AuthZRole.id == role_id).first()
-                if role is not None:
-                    global_role_names.append(role.name)
+            global_role_names = self.mount.auth_manager.role_directory.role_names(
+                session, cherrypy.request.token['roles']['global'])
 
             project_role_ids = []
             project_roles = session.query(AuthZRole).join(ProjectMembers,
@@ -1,10 +1,9 @@
-import uuid
-
 import cherrypy
 from sqlalchemy.orm import Query
 
 from deli_counter.http.mounts.root.routes.v1.auth.z.validation_models.roles import ResponseRole, RequestCreateRole, \
     ParamsRole, ParamsListRole, RoleType
+from deli_counter.http.pagination import PaginationMixin
 from ingredients_db.models.authz import AuthZRole
 from ingredients_http.request_methods import RequestMethods
 from ingredients_http.route import Route
@@ -22,7 +21,7 @@ protected_roles = [
 ]
 
 
-class AuthZRoleRouter(Router):
+class AuthZRoleRouter(PaginationMixin, Router):
     def __init__(self):
         super().__init__('roles')
 
@@ -64,6 +63,7 @@ class AuthZRoleRouter(Router):
     @Route('{role_id}')
     @cherrypy.tools.model_params(cls=ParamsRole)
     @cherrypy.tools.model_out(cls=ResponseRole)
+    @cherrypy.tools.fields(cls=ResponseRole)
     @cherrypy.tools.resource_object(id_param="role_id", cls=AuthZRole)
     @cherrypy.tools.enforce_policy(policy_name="roles:get")
     def get(self, role_id):
@@ -72,14 +72,16 @@ class AuthZRoleRouter(Router):
     @Route()
     @cherrypy.tools.model_params(cls=ParamsListRole)
     @cherrypy.tools.model_out_pagination(cls=ResponseRole)
+    @cherrypy.tools.fields(cls=ResponseRole)
     @cherrypy.tools.enforce_policy(policy_name="roles:list")
-    def list(self, type: RoleType, limit: int, marker: uuid.UUID):
+    def list(self, type: RoleType, limit: int, marker: str, sort: str, total: bool):
         if type == RoleType.GLOBAL:
             starting_query = Query(AuthZRole).filter(AuthZRole.project_id == None)  # noqa: E711
         else:
             self.mount.validate_project_scope()
             starting_query = Query(AuthZRole).filter(AuthZRole.project_id == cherrypy.request.project.id)
-        return self.paginate(AuthZRole, ResponseRole, limit, marker, starting_query=starting_query)
+        return self.paginate(AuthZRole, ResponseRole, limit, marker, starting_query=starting_query,
+                             sort=sort, total=total)
 
     @Route('{role_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.model_params(cls=ParamsRole)
@@ -106,3 +108,5 @@ class AuthZRoleRouter(Router):
 
             session.delete(role)
             session.commit()
+
+        self.mount.auth_manager.invalidate_roles([role_id])
@@ -1,5 +1,5 @@
 from schematics import Model
-from schematics.types import UUIDType, IntType, StringType
+from schematics.types import UUIDType, IntType, StringType, BooleanType
 
 from ingredients_db.models.authz import AuthZPolicy
 from ingredients_http.schematics.types import ArrowType
@@ -11,7 +11,9 @@ class ParamsPolicy(Model):
 
 class ParamsListPolicy(Model):
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'name', '-name'], default='-created_at')
+    total = BooleanType(default=False)
 
 
 class RequestUpdatePolicy(Model):
@@ -1,7 +1,7 @@
 import enum
 
 from schematics import Model
-from schematics.types import UUIDType, IntType, StringType
+from schematics.types import UUIDType, IntType, StringType, BooleanType
 
 from ingredients_db.models.authz import AuthZRole
 from ingredients_http.schematics.types import ArrowType, EnumType
@@ -19,7 +19,9 @@ class ParamsRole(Model):
 class ParamsListRole(Model):
     type = EnumType(RoleType, required=True)
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'name', '-name'], default='-created_at')
+    total = BooleanType(default=False)
 
 
 class RequestCreateRole(Model):
@@ -1,21 +1,22 @@
-import uuid
-
 import cherrypy
 from sqlalchemy import or_
 from sqlalchemy.orm import Query
 
+from deli_counter.http.events import EventStreamMixin
+from deli_counter.http.mounts.root.routes.v1.validation_models.events import ParamsEvents
 from deli_counter.http.mounts.root.routes.v1.validation_models.images import ParamsImage, RequestCreateImage, \
-    ResponseImage, ParamsListImage
+    ResponseImage, ParamsExportImage, ParamsListImage
+from deli_counter.http.pagination import PaginationMixin
+from deli_counter.tasks.outbox import create_task
 from ingredients_db.models.images import Image, ImageVisibility, ImageState
 from ingredients_db.models.region import Region, RegionState
 from ingredients_http.request_methods import RequestMethods
 from ingredients_http.route import Route
 from ingredients_http.router import Router
 from ingredients_tasks.tasks.image import create_image, delete_image
-from ingredients_tasks.tasks.tasks import create_task
 
 
-class ImageRouter(Router):
+class ImageRouter(PaginationMixin, EventStreamMixin, Router):
     def __init__(self):
         super().__init__(uri_base='images')
 
@@ -75,17 +76,13 @@ class ImageRouter(Router):
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_params(cls=ParamsImage)
     @cherrypy.tools.model_out(cls=ResponseImage)
+    @cherrypy.tools.fields(cls=ResponseImage)
     @cherrypy.tools.resource_object(id_param="image_id", cls=Image)
     @cherrypy.tools.enforce_policy(policy_name="images:get")
     def get(self, image_id):
         return ResponseImage.from_database(cherrypy.request.resource_object)
 
-    @Route()
-    @cherrypy.tools.project_scope()
-    @cherrypy.tools.model_params(cls=ParamsListImage)
-    @cherrypy.tools.model_out_pagination(cls=ResponseImage)
-    @cherrypy.tools.enforce_policy(policy_name="images:list")
-    def list(self, region_id, limit: int, marker: uuid.UUID):
+    def __list_query(self, region_id) -> Query:
         project = cherrypy.request.project
         starting_query = Query(Image).filter(
             or_(Image.project_id == project.id,
@@ -97,7 +94,32 @@ class ImageRouter(Router):
                 if region is None:
                     raise cherrypy.HTTPError(404, "A region with the requested id does not exist.")
             starting_query = starting_query.filter(Image.region_id == region.id)
-        return self.paginate(Image, ResponseImage, limit, marker, starting_query=starting_query)
+        return starting_query
+
+    @Route()
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_params(cls=ParamsListImage)
+    @cherrypy.tools.model_out_pagination(cls=ResponseImage)
+    @cherrypy.tools.fields(cls=ResponseImage)
+    @cherrypy.tools.enforce_policy(policy_name="images:list")
+    def list(self, region_id, limit: int, marker: str, sort: str, total: bool):
+        return self.paginate(Image, ResponseImage, limit, marker, starting_query=self.__list_query(region_id),
+                             sort=sort, total=total)
+
+    @Route(route='export')
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_params(cls=ParamsExportImage)
+    @cherrypy.tools.fields(cls=ResponseImage)
+    @cherrypy.tools.enforce_policy(policy_name="images:list")
+    def export(self, region_id):
+        return self.stream(Image, ResponseImage, starting_query=self.__list_query(region_id))
+
+    @Route(route='events')
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_params(cls=ParamsEvents)
+    @cherrypy.tools.enforce_policy(policy_name="images:list")
+    def events(self, last_event_id):
+        return self.stream_events('image', ImageState, last_event_id)
 
     @Route(route='{image_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.project_scope()
@@ -1,12 +1,21 @@
 import uuid
 
 import cherrypy
-from sqlalchemy.orm import Query
+from sqlalchemy import and_
+from sqlalchemy.orm import Query, aliased, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
+from deli_counter.http.events import EventStreamMixin
+from deli_counter.http.mounts.root.routes.v1.validation_models.events import ParamsEvents
 from deli_counter.http.mounts.root.routes.v1.validation_models.images import ResponseImage
 from deli_counter.http.mounts.root.routes.v1.validation_models.instances import RequestCreateInstance, \
-    ResponseInstance, ParamsInstance, ParamsListInstance, RequestInstanceImage, RequestInstancePowerOffRestart, \
-    RequestInstanceResetState
+    ResponseInstance, ParamsInstance, ParamsExportInstance, ParamsListInstance, RequestInstanceImage, \
+    RequestInstancePowerOffRestart, RequestInstanceResetState, RequestBatchCreateInstance, \
+    ResponseBatchCreateInstance, ResponseBatchInstanceResult, RequestBatchInstanceAction, \
+    RequestBatchInstancePowerOffRestart, ResponseBatchInstanceAction, ResponseBatchInstanceActionResult
+from deli_counter.http.fields import requested
+from deli_counter.http.pagination import PaginationMixin
+from deli_counter.tasks.outbox import create_task
 from ingredients_db.models.authn import AuthNServiceAccount
 from ingredients_db.models.images import Image, ImageVisibility, ImageState
 from ingredients_db.models.instance import Instance, InstanceState
@@ -22,13 +31,193 @@ from ingredients_http.router import Router
 from ingredients_tasks.tasks.image import convert_vm
 from ingredients_tasks.tasks.instance import create_instance, delete_instance, start_instance, stop_instance, \
     restart_instance
-from ingredients_tasks.tasks.tasks import create_task
 
 
-class InstanceRouter(Router):
+class InstanceRouter(PaginationMixin, EventStreamMixin, Router):
     def __init__(self):
         super().__init__(uri_base='instances')
 
+    def __load_references(self, session, project, request, name=None):
+        """
+        Load everything a new instance references in one query and validate it in memory.
+
+        When a name is given an instance in the project with that name is a conflict.
+        """
+        conflicting_instance = aliased(Instance)
+        if request.service_account_id is not None:
+            service_account_condition = AuthNServiceAccount.id == request.service_account_id
+        else:
+            service_account_condition = and_(AuthNServiceAccount.project_id == project.id,
+                                             AuthNServiceAccount.name == "default")
+        prefetch = session.query(Region, Image, Network, Zone, AuthNServiceAccount, conflicting_instance.id). \
+            outerjoin(Image, and_(Image.id == request.image_id, Image.region_id == Region.id)). \
+            outerjoin(Network, and_(Network.id == request.network_id, Network.region_id == Region.id)). \
+            outerjoin(Zone, and_(Zone.id == request.zone_id, Zone.region_id == Region.id)). \
+            outerjoin(AuthNServiceAccount, service_account_condition). \
+            outerjoin(conflicting_instance, and_(conflicting_instance.project_id == project.id,
+                                                 conflicting_instance.name == name)). \
+            filter(Region.id == request.region_id).first()
+
+        if prefetch is None:
+            # Region does not exist but a name conflict takes priority
+            if name is not None:
+                instance = session.query(Instance.id).filter(Instance.project_id == project.id).filter(
+                    Instance.name == name).first()
+                if instance is not None:
+                    raise cherrypy.HTTPError(409, 'An instance already exists with the requested name.')
+            raise cherrypy.HTTPError(404, "A region with the requested id does not exist.")
+
+        region, image, network, zone, service_account, conflicting_instance_id = prefetch
+
+        if conflicting_instance_id is not None:
+            raise cherrypy.HTTPError(409, 'An instance already exists with the requested name.')
+
+        if region.state != RegionState.CREATED:
+            raise cherrypy.HTTPError(412,
+                                     "The requested region is not in the following state: %s" %
+                                     RegionState.CREATED.value)
+
+        if region.schedulable is False:
+            raise cherrypy.HTTPError(412, "The requested region is not currently schedulable.")
+
+        if image is None:
+            raise cherrypy.HTTPError(404, "An image with the requested id does not exist.")
+
+        if image.state != ImageState.CREATED:
+            raise cherrypy.HTTPError(412, "The requested image is not in the '%s' state" % (
+                ImageState.CREATED.value))
+
+        if image.project_id != project.id:
+            if image.visibility == ImageVisibility.PRIVATE:
+                raise cherrypy.HTTPError(400, "The requested image does not belong to the scoped project.")
+            elif image.visibility == ImageVisibility.SHARED:
+                if project not in image.members:
+                    raise cherrypy.HTTPError(400, "The requested image is not shared with the scoped project.")
+            elif image.visibility == ImageVisibility.PUBLIC:
+                # Image is public so don't error
+                pass
+
+        if request.service_account_id is not None:
+            if service_account is None:
+                raise cherrypy.HTTPError(404, "A service account with the requested id does not exist.")
+            if service_account.project_id != project.id:
+                raise cherrypy.HTTPError(400,
+                                         "The requested service account does not belong to the scoped project.")
+
+        if network is None:
+            raise cherrypy.HTTPError(404, "A network with the requested id does not exist.")
+
+        if network.state != NetworkState.CREATED:
+            raise cherrypy.HTTPError(412, "The requested network is not in the '%s' state" % (
+                NetworkState.CREATED.value))
+
+        if request.zone_id is not None:
+            if zone is None:
+                raise cherrypy.HTTPError(404, "A zone with the requested id does not exist.")
+
+            if zone.state != ZoneState.CREATED:
+                raise cherrypy.HTTPError(412,
+                                         "The requested zone is not in the following state: %s" %
+                                         ZoneState.CREATED.value)
+
+            if zone.schedulable is False:
+                raise cherrypy.HTTPError(412, "The requested zone is not currently schedulable.")
+
+        keypairs = []
+        if len(request.keypair_ids) > 0:
+            keypairs_by_id = {str(keypair.id): keypair for keypair in session.query(Keypair).filter(
+                Keypair.id.in_(request.keypair_ids)).filter(Keypair.project_id == project.id)}
+            for keypair_id in request.keypair_ids:
+                if str(keypair_id) not in keypairs_by_id:
+                    raise cherrypy.HTTPError(404,
+                                             "Could not find a keypair within the scoped project with the id %s" %
+                                             keypair_id)
+                keypairs.append(keypairs_by_id[str(keypair_id)])
+
+        return region, image, network, zone, service_account, keypairs
+
+    def __new_instance(self, session, project, request, name, region, image, network, zone, service_account,
+                       keypairs) -> Instance:
+        # Ids are generated here so everything can be inserted with a single flush
+        network_port = NetworkPort()
+        network_port.id = uuid.uuid4()
+        network_port.network_id = network.id
+        network_port.project_id = project.id
+        session.add(network_port)
+
+        instance = Instance()
+        instance.id = uuid.uuid4()
+        instance.name = name
+        instance.image_id = image.id
+        instance.project_id = project.id
+        instance.network_port_id = network_port.id
+        instance.tags = request.tags
+        instance.service_account_id = service_account.id
+
+        instance.region_id = region.id
+        if zone is not None:
+            instance.zone_id = zone.id
+
+        instance.keypairs = list(keypairs)
+        session.add(instance)
+
+        return instance
+
+    def __batch_action(self, request: RequestBatchInstanceAction, states, new_state, state_error, celery_task,
+                       **kwargs) -> ResponseBatchInstanceAction:
+        """
+        Move the selected instances in one of the states to the new state and create a task for each of them.
+
+        Instances are loaded and updated with one statement each, instances in the wrong state are rejected.
+        The tasks are created per instance but their messages reach the outbox in one insert on commit.
+        """
+        has_tags = request.tags is not None and len(request.tags) > 0
+        if (len(request.instance_ids) > 0) == has_tags:
+            raise cherrypy.HTTPError(400, "Either instance_ids or tags is required but not both.")
+
+        response = ResponseBatchInstanceAction()
+
+        with cherrypy.request.db_session() as session:
+            query = session.query(Instance).filter(Instance.project_id == cherrypy.request.project.id)
+            if has_tags:
+                query = query.filter(Instance.tags.contains(request.tags))
+            else:
+                query = query.filter(Instance.id.in_(request.instance_ids))
+            # Lock the rows so their state can't change between checking and updating it
+            instances = query.with_for_update().all()
+
+            accepted = []
+            for instance in instances:
+                result = ResponseBatchInstanceActionResult()
+                result.instance_id = instance.id
+                result.accepted = instance.state in states
+                if result.accepted:
+                    accepted.append(instance)
+                else:
+                    result.error = state_error
+                response.instances.append(result)
+
+            found_ids = set(str(instance.id) for instance in instances)
+            for instance_id in request.instance_ids:
+                if str(instance_id) not in found_ids:
+                    result = ResponseBatchInstanceActionResult()
+                    result.instance_id = instance_id
+                    result.accepted = False
+                    result.error = "The resource could not be found."
+                    response.instances.append(result)
+
+            if len(accepted) > 0:
+                session.query(Instance).filter(Instance.id.in_([instance.id for instance in accepted])).update(
+                    {Instance.state: new_state}, synchronize_session=False)
+                for instance in accepted:
+                    # The update already changed the rows so the session doesn't need to
+                    set_committed_value(instance, 'state', new_state)
+                    create_task(session, instance, celery_task, instance_id=instance.id, **kwargs)
+
+            session.commit()
+
+        return response
+
     @Route(methods=[RequestMethods.POST])
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_in(cls=RequestCreateInstance)
@@ -40,122 +229,74 @@ class InstanceRouter(Router):
         with cherrypy.request.db_session() as session:
             project = cherrypy.request.project
 
-            instance = session.query(Instance).filter(Instance.project_id == project.id).filter(
-                Instance.name == request.name).first()
-            if instance is not None:
-                raise cherrypy.HTTPError(409, 'An instance already exists with the requested name.')
+            references = self.__load_references(session, project, request, name=request.name)
+            instance = self.__new_instance(session, project, request, request.name, *references)
+            session.flush()
 
-            region = session.query(Region).filter(Region.id == request.region_id).first()
-            if region is None:
-                raise cherrypy.HTTPError(404, "A region with the requested id does not exist.")
+            create_task(session, instance, create_instance, instance_id=instance.id)
 
-            if region.state != RegionState.CREATED:
-                raise cherrypy.HTTPError(412,
-                                         "The requested region is not in the following state: %s" %
-                                         RegionState.CREATED.value)
-
-            if region.schedulable is False:
-                raise cherrypy.HTTPError(412, "The requested region is not currently schedulable.")
-
-            image = session.query(Image).filter(Image.id == request.image_id).filter(
-                Image.region_id == region.id).first()
-            if image is None:
-                raise cherrypy.HTTPError(404, "An image with the requested id does not exist.")
-
-            if image.state != ImageState.CREATED:
-                raise cherrypy.HTTPError(412, "The requested image is not in the '%s' state" % (
-                    ImageState.CREATED.value))
-
-            if image.project_id != project.id:
-                if image.visibility == ImageVisibility.PRIVATE:
-                    raise cherrypy.HTTPError(400, "The requested image does not belong to the scoped project.")
-                elif image.visibility == ImageVisibility.SHARED:
-                    if project not in image.members:
-                        raise cherrypy.HTTPError(400, "The requested image is not shared with the scoped project.")
-                elif image.visibility == ImageVisibility.PUBLIC:
-                    # Image is public so don't error
-                    pass
-
-            if request.service_account_id is not None:
-                service_account: AuthNServiceAccount = session.query(AuthNServiceAccount).filter(
-                    AuthNServiceAccount.id == request.service_account_id).first()
-                if service_account is None:
-                    raise cherrypy.HTTPError(404, "A service account with the requested id does not exist.")
-                if service_account.project_id != project.id:
-                    raise cherrypy.HTTPError(400,
-                                             "The requested service account does not belong to the scoped project.")
-            else:
-                service_account = session.query(AuthNServiceAccount).filter(
-                    AuthNServiceAccount.project_id == project.id).filter(
-                    AuthNServiceAccount.name == "default").first()
-
-            network = session.query(Network).filter(Network.id == request.network_id).filter(
-                Network.region_id == region.id).first()
-            if network is None:
-                raise cherrypy.HTTPError(404, "A network with the requested id does not exist.")
-
-            if network.state != NetworkState.CREATED:
-                raise cherrypy.HTTPError(412, "The requested network is not in the '%s' state" % (
-                    NetworkState.CREATED.value))
-
-            zone = None
-            if request.zone_id is not None:
-                zone = session.query(Zone).filter(Zone.id == request.zone_id).filter(
-                    Zone.region_id == region.id).first()
-                if zone is None:
-                    raise cherrypy.HTTPError(404, "A zone with the requested id does not exist.")
+            response = ResponseInstance.from_database(instance)
+            session.commit()
 
-                if zone.state != ZoneState.CREATED:
-                    raise cherrypy.HTTPError(412,
-                                             "The requested zone is not in the following state: %s" %
-                                             ZoneState.CREATED.value)
+            return response
 
-                if zone.schedulable is False:
-                    raise cherrypy.HTTPError(412, "The requested zone is not currently schedulable.")
+    @Route(route='batch', methods=[RequestMethods.POST])
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_in(cls=RequestBatchCreateInstance)
+    @cherrypy.tools.model_out(cls=ResponseBatchCreateInstance)
+    @cherrypy.tools.enforce_policy(policy_name="instances:create")
+    def create_batch(self):
+        request: RequestBatchCreateInstance = cherrypy.request.model
+        names = request.names()
+        if len(set(names)) != len(names):
+            raise cherrypy.HTTPError(400, "name_template does not generate unique names.")
 
-            network_port = NetworkPort()
-            network_port.network_id = network.id
-            network_port.project_id = project.id
-            session.add(network_port)
-            session.flush()
+        response = ResponseBatchCreateInstance()
 
-            instance = Instance()
-            instance.name = request.name
-            instance.image_id = image.id
-            instance.project_id = project.id
-            instance.network_port_id = network_port.id
-            instance.tags = request.tags
-            instance.service_account_id = service_account.id
+        with cherrypy.request.db_session() as session:
+            project = cherrypy.request.project
 
-            instance.region_id = region.id
-            if zone is not None:
-                instance.zone_id = zone.id
+            references = self.__load_references(session, project, request)
 
-            session.add(instance)
-            session.flush()
+            existing_names = set(name for name, in session.query(Instance.name).filter(
+                Instance.project_id == project.id).filter(Instance.name.in_(names)))
 
-            for keypair_id in request.keypair_ids:
-                keypair = session.query(Keypair).filter(Keypair.id == keypair_id).filter(
-                    Keypair.project_id == project.id).first()
+            instances = []
+            for name in names:
+                result = ResponseBatchInstanceResult()
+                result.name = name
+                if name in existing_names:
+                    result.created = False
+                    result.error = 'An instance already exists with the requested name.'
+                else:
+                    result.created = True
+                    instances.append((result, self.__new_instance(session, project, request, name, *references)))
+                response.instances.append(result)
 
-                if keypair is None:
-                    raise cherrypy.HTTPError(404, "Could not find a keypair within the scoped project with the id %s" %
-                                             keypair_id)
+            # All the network ports and instances are inserted in one flush
+            session.flush()
 
-                instance.keypairs.append(keypair)
+            # The task rows are still created one at a time by ingredients_tasks' create_task but their
+            # messages are written to the outbox with one insert when the session commits
+            for _, instance in instances:
+                create_task(session, instance, create_instance, instance_id=instance.id)
 
-            print("TASK")
-            create_task(session, instance, create_instance, instance_id=instance.id)
+            if len(instances) > 0:
+                # Load the server generated columns for every instance at once instead of one at a time
+                session.query(Instance).filter(Instance.id.in_([instance.id for _, instance in instances])).all()
+
+            for result, instance in instances:
+                result.instance = ResponseInstance.from_database(instance)
 
-            response = ResponseInstance.from_database(instance)
             session.commit()
 
-            return response
+        return response
 
     @Route(route='{instance_id}')
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_params(cls=ParamsInstance)
     @cherrypy.tools.model_out(cls=ResponseInstance)
+    @cherrypy.tools.fields(cls=ResponseInstance)
     @cherrypy.tools.resource_object(id_param="instance_id", cls=Instance)
     @cherrypy.tools.enforce_policy(policy_name="instances:get")
     def get(self, instance_id: uuid.UUID):
@@ -163,15 +304,19 @@ class InstanceRouter(Router):
             instance: Instance = session.merge(cherrypy.request.resource_object, load=False)
             return ResponseInstance.from_database(instance)
 
-    @Route()
-    @cherrypy.tools.project_scope()
-    @cherrypy.tools.model_params(cls=ParamsListInstance)
-    @cherrypy.tools.model_out_pagination(cls=ResponseInstance)
-    @cherrypy.tools.enforce_policy(policy_name="instances:list")
-    def list(self, image_id, region_id, zone_id, limit: int, marker: uuid.UUID):
-        # TODO: allow filtering by tags
+    def __list_query(self, image_id, region_id, zone_id, tags) -> Query:
         project = cherrypy.request.project
         starting_query = Query(Instance).filter(Instance.project_id == project.id)
+        if tags is not None:
+            # Both filters are served by the GIN index on the tags column
+            for tag in tags.split(","):
+                key, _, value = tag.partition(":")
+                if key == '':
+                    raise cherrypy.HTTPError(400, "Tag filters must have a key.")
+                if value != '':
+                    starting_query = starting_query.filter(Instance.tags.contains({key: value}))
+                else:
+                    starting_query = starting_query.filter(Instance.tags.has_key(key))  # noqa: W601
         if image_id is not None:
             starting_query = starting_query.filter(Instance.image_id == image_id)
         if region_id is not None:
@@ -186,7 +331,41 @@ class InstanceRouter(Router):
                 if zone is None:
                     raise cherrypy.HTTPError(404, "A zone with the requested id does not exist.")
             starting_query = starting_query.filter(Instance.zone_id == zone_id)
-        return self.paginate(Instance, ResponseInstance, limit, marker, starting_query=starting_query)
+        return starting_query
+
+    def __list_options(self):
+        options = []
+        if requested('keypair_ids'):
+            options.append(selectinload(Instance.keypairs))
+        return options
+
+    @Route()
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_params(cls=ParamsListInstance)
+    @cherrypy.tools.model_out_pagination(cls=ResponseInstance)
+    @cherrypy.tools.fields(cls=ResponseInstance)
+    @cherrypy.tools.enforce_policy(policy_name="instances:list")
+    def list(self, image_id, region_id, zone_id, tags, limit: int, marker: str, sort: str, total: bool):
+        return self.paginate(Instance, ResponseInstance, limit, marker,
+                             starting_query=self.__list_query(image_id, region_id, zone_id, tags),
+                             options=self.__list_options(), sort=sort, total=total)
+
+    @Route(route='export')
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_params(cls=ParamsExportInstance)
+    @cherrypy.tools.fields(cls=ResponseInstance)
+    @cherrypy.tools.enforce_policy(policy_name="instances:list")
+    def export(self, image_id, region_id, zone_id, tags):
+        return self.stream(Instance, ResponseInstance,
+                           starting_query=self.__list_query(image_id, region_id, zone_id, tags),
+                           options=self.__list_options())
+
+    @Route(route='events')
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_params(cls=ParamsEvents)
+    @cherrypy.tools.enforce_policy(policy_name="instances:list")
+    def events(self, last_event_id):
+        return self.stream_events('instance', InstanceState, last_event_id)
 
     @Route(route='{instance_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.project_scope()
@@ -210,6 +389,59 @@ class InstanceRouter(Router):
 
             session.commit()
 
+    # The batch routes are named action_batch_* so they sort, and so are routed, before the
+    # '{instance_id}/action/*' routes which would otherwise match 'batch' as an instance id
+    @Route(route='batch/action/stop', methods=[RequestMethods.PUT])
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_in(cls=RequestBatchInstancePowerOffRestart)
+    @cherrypy.tools.model_out(cls=ResponseBatchInstanceAction)
+    @cherrypy.tools.enforce_policy(policy_name="instances:action:stop")
+    def action_batch_stop(self):
+        request: RequestBatchInstancePowerOffRestart = cherrypy.request.model
+        cherrypy.response.status = 202
+        return self.__batch_action(request, [InstanceState.ACTIVE], InstanceState.STOPPING,
+                                   "Can only stop an instance in the following state: %s" %
+                                   InstanceState.ACTIVE.value,
+                                   stop_instance, hard=request.hard, timeout=request.timeout)
+
+    @Route(route='batch/action/start', methods=[RequestMethods.PUT])
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_in(cls=RequestBatchInstanceAction)
+    @cherrypy.tools.model_out(cls=ResponseBatchInstanceAction)
+    @cherrypy.tools.enforce_policy(policy_name="instances:action:start")
+    def action_batch_start(self):
+        cherrypy.response.status = 202
+        return self.__batch_action(cherrypy.request.model, [InstanceState.STOPPED], InstanceState.STARTING,
+                                   "Can only start an instance in the following state: %s" %
+                                   InstanceState.STOPPED.value,
+                                   start_instance)
+
+    @Route(route='batch/action/restart', methods=[RequestMethods.PUT])
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_in(cls=RequestBatchInstancePowerOffRestart)
+    @cherrypy.tools.model_out(cls=ResponseBatchInstanceAction)
+    @cherrypy.tools.enforce_policy(policy_name="instances:action:restart")
+    def action_batch_restart(self):
+        request: RequestBatchInstancePowerOffRestart = cherrypy.request.model
+        cherrypy.response.status = 202
+        return self.__batch_action(request, [InstanceState.ACTIVE], InstanceState.RESTARTING,
+                                   "Can only restart an instance in the following state: %s" %
+                                   InstanceState.ACTIVE.value,
+                                   restart_instance, hard=request.hard, timeout=request.timeout)
+
+    @Route(route='batch/delete', methods=[RequestMethods.POST])
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_in(cls=RequestBatchInstanceAction)
+    @cherrypy.tools.model_out(cls=ResponseBatchInstanceAction)
+    @cherrypy.tools.enforce_policy(policy_name="instances:delete")
+    def delete_batch(self):
+        cherrypy.response.status = 202
+        states = [InstanceState.STOPPED, InstanceState.ACTIVE, InstanceState.ERROR]
+        return self.__batch_action(cherrypy.request.model, states, InstanceState.DELETING,
+                                   "Can only delete an instance in the following states: %s" %
+                                   [state.value for state in states],
+                                   delete_instance, delete_backing=True)
+
     @Route(route='{instance_id}/action/stop', methods=[RequestMethods.PUT])
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_params(cls=ParamsInstance)
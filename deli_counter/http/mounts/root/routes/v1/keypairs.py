@@ -5,13 +5,14 @@ from sqlalchemy.orm import Query
 
 from deli_counter.http.mounts.root.routes.v1.validation_models.keypairs import RequestCreateKeypair, \
     ParamsListKeypair, ParamsKeypair, ResponseKeypair
+from deli_counter.http.pagination import PaginationMixin
 from ingredients_db.models.keypair import Keypair
 from ingredients_http.request_methods import RequestMethods
 from ingredients_http.route import Route
 from ingredients_http.router import Router
 
 
-class KeypairsRouter(Router):
+class KeypairsRouter(PaginationMixin, Router):
     def __init__(self):
         super().__init__(uri_base='keypairs')
 
@@ -43,6 +44,7 @@ class KeypairsRouter(Router):
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_params(cls=ParamsKeypair)
     @cherrypy.tools.model_out(cls=ResponseKeypair)
+    @cherrypy.tools.fields(cls=ResponseKeypair)
     @cherrypy.tools.resource_object(id_param="keypair_id", cls=Keypair)
     @cherrypy.tools.enforce_policy(policy_name="keypairs:get")
     def get(self, keypair_id: uuid.UUID):
@@ -52,11 +54,13 @@ class KeypairsRouter(Router):
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_params(cls=ParamsListKeypair)
     @cherrypy.tools.model_out_pagination(cls=ResponseKeypair)
+    @cherrypy.tools.fields(cls=ResponseKeypair)
     @cherrypy.tools.enforce_policy(policy_name="keypairs:list")
-    def list(self, limit: int, marker: uuid.UUID):
+    def list(self, limit: int, marker: str, sort: str, total: bool):
         project = cherrypy.request.project
         starting_query = Query(Keypair).filter(Keypair.project_id == project.id)
-        return self.paginate(Keypair, ResponseKeypair, limit, marker, starting_query=starting_query)
+        return self.paginate(Keypair, ResponseKeypair, limit, marker, starting_query=starting_query,
+                             sort=sort, total=total)
 
     @Route(route='{keypair_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.project_scope()
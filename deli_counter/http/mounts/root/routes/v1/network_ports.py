@@ -1,10 +1,9 @@
-import uuid
-
 import cherrypy
 from sqlalchemy.orm import Query
 
 from deli_counter.http.mounts.root.routes.v1.validation_models.network_ports import ParamsNetworkPort, \
-    ParamsListNetworkPort, ResponseNetworkPort
+    ParamsExportNetworkPort, ParamsListNetworkPort, ResponseNetworkPort
+from deli_counter.http.pagination import PaginationMixin
 from ingredients_db.models.instance import Instance
 from ingredients_db.models.network_port import NetworkPort
 from ingredients_http.request_methods import RequestMethods
@@ -12,7 +11,7 @@ from ingredients_http.route import Route
 from ingredients_http.router import Router
 
 
-class NetworkPortRouter(Router):
+class NetworkPortRouter(PaginationMixin, Router):
     def __init__(self):
         super().__init__(uri_base='network-ports')
 
@@ -22,6 +21,7 @@ class NetworkPortRouter(Router):
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_params(cls=ParamsNetworkPort)
     @cherrypy.tools.model_out(cls=ResponseNetworkPort)
+    @cherrypy.tools.fields(cls=ResponseNetworkPort)
     @cherrypy.tools.resource_object(id_param="network_port_id", cls=NetworkPort)
     @cherrypy.tools.enforce_policy(policy_name="network_ports:get")
     def get(self, network_port_id):
@@ -31,11 +31,23 @@ class NetworkPortRouter(Router):
     @cherrypy.tools.project_scope()
     @cherrypy.tools.model_params(cls=ParamsListNetworkPort)
     @cherrypy.tools.model_out_pagination(cls=ResponseNetworkPort)
+    @cherrypy.tools.fields(cls=ResponseNetworkPort)
+    @cherrypy.tools.enforce_policy(policy_name="network_ports:list")
+    def list(self, limit: int, marker: str, sort: str, total: bool):
+        project = cherrypy.request.project
+        starting_query = Query(NetworkPort).filter(NetworkPort.project_id == project.id)
+        return self.paginate(NetworkPort, ResponseNetworkPort, limit, marker, starting_query=starting_query,
+                             sort=sort, total=total)
+
+    @Route(route='export')
+    @cherrypy.tools.project_scope()
+    @cherrypy.tools.model_params(cls=ParamsExportNetworkPort)
+    @cherrypy.tools.fields(cls=ResponseNetworkPort)
     @cherrypy.tools.enforce_policy(policy_name="network_ports:list")
-    def list(self, limit: int, marker: uuid.UUID):
+    def export(self):
         project = cherrypy.request.project
         starting_query = Query(NetworkPort).filter(NetworkPort.project_id == project.id)
-        return self.paginate(NetworkPort, ResponseNetworkPort, limit, marker, starting_query=starting_query)
+        return self.stream(NetworkPort, ResponseNetworkPort, starting_query=starting_query)
 
     @Route(route='{network_port_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.project_scope()
@@ -1,10 +1,10 @@
-import uuid
-
 import cherrypy
 from sqlalchemy.orm import Query
 
 from deli_counter.http.mounts.root.routes.v1.validation_models.networks import RequestCreateNetwork, ResponseNetwork, \
     ParamsNetwork, ParamsListNetwork
+from deli_counter.http.pagination import PaginationMixin
+from deli_counter.tasks.outbox import create_task
 from ingredients_db.models.network import Network, NetworkState
 from ingredients_db.models.network_port import NetworkPort
 from ingredients_db.models.region import Region, RegionState
@@ -12,10 +12,9 @@ from ingredients_http.request_methods import RequestMethods
 from ingredients_http.route import Route
 from ingredients_http.router import Router
 from ingredients_tasks.tasks.network import create_network
-from ingredients_tasks.tasks.tasks import create_task
 
 
-class NetworkRouter(Router):
+class NetworkRouter(PaginationMixin, Router):
     def __init__(self):
         super().__init__(uri_base='networks')
         # TODO: default to admins only
@@ -72,6 +71,7 @@ class NetworkRouter(Router):
     @Route(route='{network_id}')
     @cherrypy.tools.model_params(cls=ParamsNetwork)
     @cherrypy.tools.model_out(cls=ResponseNetwork)
+    @cherrypy.tools.fields(cls=ResponseNetwork)
     @cherrypy.tools.resource_object(id_param="network_id", cls=Network)
     @cherrypy.tools.enforce_policy(policy_name="networks:get")
     def get(self, network_id):
@@ -80,8 +80,9 @@ class NetworkRouter(Router):
     @Route()
     @cherrypy.tools.model_params(cls=ParamsListNetwork)
     @cherrypy.tools.model_out_pagination(cls=ResponseNetwork)
+    @cherrypy.tools.fields(cls=ResponseNetwork)
     @cherrypy.tools.enforce_policy(policy_name="networks:list")
-    def list(self, name, region_id, limit: int, marker: uuid.UUID):
+    def list(self, name, region_id, limit: int, marker: str, sort: str, total: bool):
         starting_query = Query(Network)
         if region_id is not None:
             with cherrypy.request.db_session() as session:
@@ -91,7 +92,8 @@ class NetworkRouter(Router):
             starting_query = starting_query.filter(Network.region_id == region.id)
         if name is not None:
             starting_query = starting_query.filter(Network.name == name)
-        return self.paginate(Network, ResponseNetwork, limit, marker, starting_query=starting_query)
+        return self.paginate(Network, ResponseNetwork, limit, marker, starting_query=starting_query,
+                             sort=sort, total=total)
 
     @Route(route='{network_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.model_params(cls=ParamsNetwork)
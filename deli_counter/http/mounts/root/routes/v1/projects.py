@@ -1,10 +1,9 @@
-import uuid
-
 import cherrypy
 from sqlalchemy.orm import Query
 
 from deli_counter.http.mounts.root.routes.v1.validation_models.projects import ParamsProject, RequestCreateProject, \
     ResponseProject, ParamsListProject
+from deli_counter.http.pagination import PaginationMixin
 from ingredients_db.models.authn import AuthNServiceAccount
 from ingredients_db.models.authz import AuthZRole, AuthZPolicy, AuthZRolePolicy
 from ingredients_db.models.images import Image
@@ -17,7 +16,7 @@ from ingredients_http.router import Router
 # TODO: restrict project to certain networks
 
 
-class ProjectRouter(Router):
+class ProjectRouter(PaginationMixin, Router):
     def __init__(self):
         super().__init__(uri_base='projects')
 
@@ -86,6 +85,7 @@ class ProjectRouter(Router):
     @Route(route='{project_id}')
     @cherrypy.tools.model_params(cls=ParamsProject)
     @cherrypy.tools.model_out(cls=ResponseProject)
+    @cherrypy.tools.fields(cls=ResponseProject)
     @cherrypy.tools.resource_object(id_param="project_id", cls=Project)
     @cherrypy.tools.enforce_policy(policy_name="projects:get")
     def get(self, project_id):
@@ -94,13 +94,15 @@ class ProjectRouter(Router):
     @Route()
     @cherrypy.tools.model_params(cls=ParamsListProject)
     @cherrypy.tools.model_out_pagination(cls=ResponseProject)
+    @cherrypy.tools.fields(cls=ResponseProject)
     @cherrypy.tools.enforce_policy(policy_name="projects:list")
-    def list(self, all: bool, limit: int, marker: uuid.UUID):
+    def list(self, all: bool, limit: int, marker: str, sort: str, total: bool):
         starting_query = Query(Project).join(ProjectMembers, Project.id == ProjectMembers.project_id).filter(
             ProjectMembers.user_id == cherrypy.request.user.id)
         if all:
             starting_query = None
-        return self.paginate(Project, ResponseProject, limit, marker, starting_query=starting_query)
+        return self.paginate(Project, ResponseProject, limit, marker, starting_query=starting_query,
+                             sort=sort, total=total)
 
     @Route(route='{project_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.model_params(cls=ParamsProject)
@@ -130,10 +132,21 @@ class ProjectRouter(Router):
             session.query(ProjectMembers).filter(ProjectMembers.project_id == project.id).delete()
 
             # Delete service accounts
+            service_account_ids = [service_account_id for service_account_id, in
+                                   session.query(AuthNServiceAccount.id).filter(
+                                       AuthNServiceAccount.project_id == project.id)]
             session.query(AuthNServiceAccount).filter(AuthNServiceAccount.project_id == project.id).delete()
 
+            # Roles CASCADE delete but we need their ids to drop them from the policy engine
+            role_ids = [role_id for role_id, in session.query(AuthZRole.id).filter(AuthZRole.project_id == project.id)]
+
             # Everything else should CASCADE delete
 
             project.state = ProjectState.DELETED
             session.delete(project)
             session.commit()
+
+        self.mount.auth_manager.invalidate_roles(role_ids)
+        self.mount.identity_cache.invalidate_project(project_id)
+        for service_account_id in service_account_ids:
+            self.mount.identity_cache.invalidate_service_account(service_account_id)
@@ -3,15 +3,16 @@ from sqlalchemy.orm import Query
 
 from deli_counter.http.mounts.root.routes.v1.validation_models.regions import ResponseRegion, RequestCreateRegion, \
     ParamsRegion, ParamsListRegion, RequestRegionSchedule
+from deli_counter.http.pagination import PaginationMixin
+from deli_counter.tasks.outbox import create_task
 from ingredients_db.models.region import Region, RegionState
 from ingredients_http.request_methods import RequestMethods
 from ingredients_http.route import Route
 from ingredients_http.router import Router
 from ingredients_tasks.tasks.region import create_region
-from ingredients_tasks.tasks.tasks import create_task
 
 
-class RegionsRouter(Router):
+class RegionsRouter(PaginationMixin, Router):
     def __init__(self):
         super().__init__(uri_base='regions')
 
@@ -50,6 +51,7 @@ class RegionsRouter(Router):
     @Route(route='{region_id}')
     @cherrypy.tools.model_params(cls=ParamsRegion)
     @cherrypy.tools.model_out(cls=ResponseRegion)
+    @cherrypy.tools.fields(cls=ResponseRegion)
     @cherrypy.tools.resource_object(id_param="region_id", cls=Region)
     @cherrypy.tools.enforce_policy(policy_name="regions:get")
     def get(self, region_id):
@@ -58,12 +60,14 @@ class RegionsRouter(Router):
     @Route()
     @cherrypy.tools.model_params(cls=ParamsListRegion)
     @cherrypy.tools.model_out_pagination(cls=ResponseRegion)
+    @cherrypy.tools.fields(cls=ResponseRegion)
     @cherrypy.tools.enforce_policy(policy_name="regions:list")
-    def list(self, name, limit, marker):
+    def list(self, name, limit, marker, sort, total):
         starting_query = None
         if name is not None:
             starting_query = Query(Region).filter(Region.name == name)
-        return self.paginate(Region, ResponseRegion, limit, marker, starting_query=starting_query)
+        return self.paginate(Region, ResponseRegion, limit, marker, starting_query=starting_query,
+                             sort=sort, total=total)
 
     @Route(route='{region_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.model_params(cls=ParamsRegion)
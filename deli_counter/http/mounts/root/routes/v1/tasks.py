@@ -1,8 +1,96 @@
+import time
+
+import cherrypy
+from simple_settings import settings
+from sqlalchemy import select
+from sqlalchemy.orm import Query
+
+from deli_counter.db.schema import TASK_STOPPED_CHANNEL
+from deli_counter.db.tables import task_resources
+from deli_counter.http.mounts.root.routes.v1.validation_models.task import TaskModel, ParamsTask, ParamsListTask, \
+    TaskType
+from deli_counter.http.pagination import PaginationMixin
+from ingredients_db.models.task import Task
+from ingredients_http.route import Route
 from ingredients_http.router import Router
 
 
-class TasksRouter(Router):
+class TasksRouter(PaginationMixin, Router):
     def __init__(self):
         super().__init__(uri_base='tasks')
 
-# TODO: tasks api plz
+    def __wait(self, task_id, timeout):
+        """
+        Wait for the task to stop, woken by the notification its stopped_at trigger sends
+
+        The task was already found in the scoped project so it is loaded by id only.
+        """
+
+        def load():
+            with cherrypy.request.db_session() as session:
+                task = session.query(Task).filter(Task.id == task_id).first()
+                session.expunge_all()
+                return task
+
+        deadline = time.monotonic() + timeout
+        with self.mount.listener.waiting(TASK_STOPPED_CHANNEL, str(task_id)) as stopped:
+            # Loaded again once listening since it may have stopped after it was first loaded
+            task = load()
+
+            # Returned without waiting when too many requests are already waiting
+            while stopped is not None and task is not None and task.stopped_at is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not stopped.wait(remaining):
+                    break
+                # Also woken when the listener reconnects so check it really stopped
+                stopped.clear()
+                task = load()
+
+        if task is None:
+            raise cherrypy.HTTPError(404, "The resource could not be found.")
+        return task
+
+    @Route(route='{task_id}')
+    @cherrypy.tools.model_params(cls=ParamsTask)
+    @cherrypy.tools.model_out(cls=TaskModel)
+    @cherrypy.tools.fields(cls=TaskModel)
+    def get(self, task_id, wait):
+        with cherrypy.request.db_session() as session:
+            row = session.query(Task, task_resources.c.project_id).join(
+                task_resources, task_resources.c.task_id == Task.id).filter(Task.id == task_id).first()
+            if row is None:
+                raise cherrypy.HTTPError(404, "The resource could not be found.")
+            task, project_id = row
+            session.expunge(task)
+
+        if project_id is None:
+            self.mount.enforce_policy("tasks:get:global")
+        else:
+            self.mount.validate_project_scope()
+            self.mount.enforce_policy("tasks:get:project")
+            # Tasks of other projects' resources do not exist as far as the project can tell
+            if project_id != cherrypy.request.project.id:
+                raise cherrypy.HTTPError(404, "The resource could not be found.")
+
+        if wait is not None and task.stopped_at is None:
+            timeout = min(int(wait.rstrip('s')), settings.TASK_WAIT_MAX)
+            if timeout > 0:
+                task = self.__wait(task_id, timeout)
+
+        return TaskModel.from_database(task)
+
+    @Route()
+    @cherrypy.tools.model_params(cls=ParamsListTask)
+    @cherrypy.tools.model_out_pagination(cls=TaskModel)
+    @cherrypy.tools.fields(cls=TaskModel)
+    def list(self, type: TaskType, limit, marker, sort, total):
+        if type == TaskType.GLOBAL:
+            self.mount.enforce_policy("tasks:list:global")
+            task_ids = select([task_resources.c.task_id]).where(task_resources.c.project_id == None)  # noqa: E711
+        else:
+            self.mount.validate_project_scope()
+            self.mount.enforce_policy("tasks:list:project")
+            task_ids = select([task_resources.c.task_id]).where(
+                task_resources.c.project_id == cherrypy.request.project.id)
+        return self.paginate(Task, TaskModel, limit, marker, starting_query=Query(Task).filter(Task.id.in_(task_ids)),
+                             sort=sort, total=total)
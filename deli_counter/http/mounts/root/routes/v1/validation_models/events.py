@@ -0,0 +1,7 @@
+from schematics import Model
+from schematics.types import IntType
+
+
+class ParamsEvents(Model):
+    # Resume after this event, the Last-Event-ID header takes precedence
+    last_event_id = IntType(min_value=0)
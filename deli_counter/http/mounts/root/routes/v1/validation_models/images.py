@@ -9,10 +9,15 @@ class ParamsImage(Model):
     image_id = UUIDType(required=True)
 
 
-class ParamsListImage(Model):
+class ParamsExportImage(Model):
     region_id = UUIDType()
+
+
+class ParamsListImage(ParamsExportImage):
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'name', '-name'], default='-created_at')
+    total = BooleanType(default=False)
 
 
 class RequestCreateImage(Model):
@@ -1,5 +1,6 @@
 from schematics import Model
-from schematics.types import StringType, UUIDType, IntType, DictType, ListType, BooleanType
+from schematics.exceptions import ValidationError
+from schematics.types import StringType, UUIDType, IntType, DictType, ListType, BooleanType, ModelType
 
 from ingredients_db.models.images import ImageVisibility
 from ingredients_db.models.instance import Instance, InstanceState
@@ -17,6 +18,32 @@ class RequestCreateInstance(Model):
     tags = DictType(StringType)
 
 
+class RequestBatchCreateInstance(Model):
+    # {index} is replaced with the instance's number, starting at 1
+    name_template = StringType(required=True, min_length=3)
+    count = IntType(required=True, min_value=1, max_value=250)
+    image_id = UUIDType(required=True)
+    service_account_id = UUIDType()
+    network_id = UUIDType(required=True)
+    region_id = UUIDType(required=True)
+    zone_id = UUIDType()
+    keypair_ids = ListType(UUIDType, default=list)
+    tags = DictType(StringType)
+
+    def validate_name_template(self, data, value):
+        if '{index}' not in value:
+            raise ValidationError("name_template must contain '{index}'")
+        try:
+            value.format(index=1)
+        except (KeyError, IndexError, ValueError):
+            raise ValidationError("name_template can only contain the '{index}' placeholder")
+
+        return value
+
+    def names(self):
+        return [self.name_template.format(index=index) for index in range(1, self.count + 1)]
+
+
 class ResponseInstance(Model):
     id = UUIDType(required=True)
     name = StringType(required=True, min_length=3)
@@ -56,16 +83,35 @@ class ResponseInstance(Model):
         return instance_model
 
 
+class ResponseBatchInstanceResult(Model):
+    name = StringType(required=True)
+    created = BooleanType(required=True)
+    error = StringType()
+    instance = ModelType(ResponseInstance)
+
+
+class ResponseBatchCreateInstance(Model):
+    instances = ListType(ModelType(ResponseBatchInstanceResult), default=list)
+
+
 class ParamsInstance(Model):
     instance_id = UUIDType(required=True)
 
 
-class ParamsListInstance(Model):
+class ParamsExportInstance(Model):
     image_id = UUIDType()
     zone_id = UUIDType()
     region_id = UUIDType()
+    # Comma separated list of tags the instances must all have
+    # key:value to match the tag's value or key to only check that the tag exists
+    tags = StringType(min_length=1)
+
+
+class ParamsListInstance(ParamsExportInstance):
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'name', '-name'], default='-created_at')
+    total = BooleanType(default=False)
 
 
 class RequestInstanceImage(Model):
@@ -78,5 +124,26 @@ class RequestInstancePowerOffRestart(Model):
     timeout = IntType(default=60, min_value=60, max_value=300)
 
 
+class RequestBatchInstanceAction(Model):
+    # Instances are selected by their ids or by having all of the tags
+    instance_ids = ListType(UUIDType, default=list, max_size=500)
+    tags = DictType(StringType)
+
+
+class RequestBatchInstancePowerOffRestart(RequestBatchInstanceAction):
+    hard = BooleanType(default=False)
+    timeout = IntType(default=60, min_value=60, max_value=300)
+
+
+class ResponseBatchInstanceActionResult(Model):
+    instance_id = UUIDType(required=True)
+    accepted = BooleanType(required=True)
+    error = StringType()
+
+
+class ResponseBatchInstanceAction(Model):
+    instances = ListType(ModelType(ResponseBatchInstanceActionResult), default=list)
+
+
 class RequestInstanceResetState(Model):
     active = BooleanType(default=False)
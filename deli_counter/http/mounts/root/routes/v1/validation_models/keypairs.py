@@ -3,7 +3,7 @@ from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.serialization import load_ssh_public_key
 from schematics import Model
 from schematics.exceptions import ValidationError
-from schematics.types import UUIDType, IntType, StringType
+from schematics.types import UUIDType, IntType, StringType, BooleanType
 
 from ingredients_db.models.keypair import Keypair
 
@@ -14,7 +14,9 @@ class ParamsKeypair(Model):
 
 class ParamsListKeypair(Model):
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'name', '-name'], default='-created_at')
+    total = BooleanType(default=False)
 
 
 class RequestCreateKeypair(Model):
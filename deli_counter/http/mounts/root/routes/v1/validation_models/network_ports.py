@@ -1,5 +1,5 @@
 from schematics import Model
-from schematics.types import UUIDType, IntType
+from schematics.types import UUIDType, IntType, StringType, BooleanType
 
 from ingredients_db.models.network_port import NetworkPort
 from ingredients_http.schematics.types import IPv4AddressType
@@ -9,9 +9,15 @@ class ParamsNetworkPort(Model):
     network_port_id = UUIDType(required=True)
 
 
+class ParamsExportNetworkPort(Model):
+    pass
+
+
 class ParamsListNetworkPort(Model):
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at'], default='-created_at')
+    total = BooleanType(default=False)
 
 
 class ResponseNetworkPort(Model):
@@ -2,7 +2,7 @@ import ipaddress  # noqa: F401
 
 from schematics import Model
 from schematics.exceptions import ValidationError
-from schematics.types import UUIDType, IntType, StringType, ListType
+from schematics.types import UUIDType, IntType, StringType, ListType, BooleanType
 
 from ingredients_db.models.network import Network, NetworkState
 from ingredients_http.schematics.types import IPv4NetworkType, IPv4AddressType, EnumType, ArrowType
@@ -93,4 +93,6 @@ class ParamsListNetwork(Model):
     name = StringType()
     region_id = UUIDType()
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'name', '-name'], default='-created_at')
+    total = BooleanType(default=False)
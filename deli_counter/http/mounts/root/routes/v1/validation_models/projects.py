@@ -16,7 +16,9 @@ class ParamsProject(Model):
 class ParamsListProject(Model):
     all = BooleanType(default=False)
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'name', '-name'], default='-created_at')
+    total = BooleanType(default=False)
 
 
 class ResponseProject(Model):
@@ -19,7 +19,9 @@ class ParamsRegion(Model):
 class ParamsListRegion(Model):
     name = StringType()
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'name', '-name'], default='-created_at')
+    total = BooleanType(default=False)
 
 
 class RequestRegionSchedule(Model):
@@ -1,10 +1,33 @@
+import enum
+
 from schematics import Model
-from schematics.types import UUIDType, StringType
+from schematics.types import UUIDType, StringType, IntType, BooleanType
 
 from ingredients_db.models.task import TaskState, Task
 from ingredients_http.schematics.types import EnumType, ArrowType
 
 
+class TaskType(enum.Enum):
+    # Tasks of regions, zones and networks
+    GLOBAL = 'global'
+    # Tasks of the scoped project's instances and images
+    PROJECT = 'project'
+
+
+class ParamsTask(Model):
+    task_id = UUIDType(required=True)
+    # Seconds to wait for the task to stop, i.e. 30 or 30s
+    wait = StringType(regex=r'^[0-9]+s?$')
+
+
+class ParamsListTask(Model):
+    type = EnumType(TaskType, default=TaskType.PROJECT)
+    limit = IntType(default=100, max_value=100, min_value=1)
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'name', '-name'], default='-created_at')
+    total = BooleanType(default=False)
+
+
 class TaskModel(Model):
     id = UUIDType(required=True)
     name = StringType(required=True)
@@ -22,7 +22,9 @@ class ParamsZone(Model):
 class ParamsListZone(Model):
     region_id = UUIDType()
     limit = IntType(default=100, max_value=100, min_value=1)
-    marker = UUIDType()
+    marker = StringType()
+    sort = StringType(choices=['created_at', '-created_at', 'name', '-name'], default='-created_at')
+    total = BooleanType(default=False)
 
 
 class RequestZoneSchedule(Model):
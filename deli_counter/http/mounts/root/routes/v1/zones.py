@@ -3,16 +3,17 @@ from sqlalchemy.orm import Query
 
 from deli_counter.http.mounts.root.routes.v1.validation_models.zones import RequestCreateZone, ResponseZone, \
     ParamsZone, ParamsListZone, RequestZoneSchedule
+from deli_counter.http.pagination import PaginationMixin
+from deli_counter.tasks.outbox import create_task
 from ingredients_db.models.region import Region, RegionState
 from ingredients_db.models.zones import Zone, ZoneState
 from ingredients_http.request_methods import RequestMethods
 from ingredients_http.route import Route
 from ingredients_http.router import Router
-from ingredients_tasks.tasks.tasks import create_task
 from ingredients_tasks.tasks.zone import create_zone
 
 
-class ZoneRouter(Router):
+class ZoneRouter(PaginationMixin, Router):
     def __init__(self):
         super().__init__(uri_base='zones')
 
@@ -62,6 +63,7 @@ class ZoneRouter(Router):
     @Route(route='{zone_id}')
     @cherrypy.tools.model_params(cls=ParamsZone)
     @cherrypy.tools.model_out(cls=ResponseZone)
+    @cherrypy.tools.fields(cls=ResponseZone)
     @cherrypy.tools.resource_object(id_param="zone_id", cls=Zone)
     @cherrypy.tools.enforce_policy(policy_name="zones:get")
     def get(self, zone_id):
@@ -70,8 +72,9 @@ class ZoneRouter(Router):
     @Route()
     @cherrypy.tools.model_params(cls=ParamsListZone)
     @cherrypy.tools.model_out_pagination(cls=ResponseZone)
+    @cherrypy.tools.fields(cls=ResponseZone)
     @cherrypy.tools.enforce_policy(policy_name="zones:list")
-    def list(self, region_id, limit, marker):
+    def list(self, region_id, limit, marker, sort, total):
         starting_query = Query(Zone)
         if region_id is not None:
             with cherrypy.request.db_session() as session:
@@ -79,7 +82,7 @@ class ZoneRouter(Router):
                 if region is None:
                     raise cherrypy.HTTPError(404, "A region with the requested id does not exist.")
             starting_query = starting_query.filter(Zone.region_id == region.id)
-        return self.paginate(Zone, ResponseZone, limit, marker, starting_query=starting_query)
+        return self.paginate(Zone, ResponseZone, limit, marker, starting_query=starting_query, sort=sort, total=total)
 
     @Route(route='{zone_id}', methods=[RequestMethods.DELETE])
     @cherrypy.tools.model_params(cls=ParamsZone)
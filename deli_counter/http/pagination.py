@@ -0,0 +1,244 @@
+import base64
+import hashlib
+import hmac
+import json
+import uuid
+
+import arrow
+import cherrypy
+from schematics import Model
+from simple_settings import settings
+from sqlalchemy import literal, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query, raiseload, load_only
+from sqlalchemy.sql.expression import Executable, ClauseElement
+
+from deli_counter.http.fields import LoadedAttributes, export, load_only_columns
+from deli_counter.http.serializers import SERIALIZERS
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _cursor_signatures(payload: bytes):
+    # Signed with keys derived from the fernet keys so cursors survive key rotation like tokens do
+    for key in settings.AUTH_FERNET_KEYS:
+        cursor_key = hmac.new(base64.urlsafe_b64decode(key), b'deli_counter.pagination', hashlib.sha256).digest()
+        yield hmac.new(cursor_key, payload, hashlib.sha256).digest()[:16]
+
+
+def encode_cursor(sort: str, value, id) -> str:
+    """
+    Create an opaque cursor pointing after the object with the given sort value and id
+    """
+    if hasattr(value, 'isoformat'):
+        value = {'at': value.isoformat()}
+    payload = json.dumps([sort, value, str(id)], separators=(',', ':')).encode()
+    return _b64encode(payload) + "." + _b64encode(next(_cursor_signatures(payload)))
+
+
+def decode_cursor(cursor: str, sort: str):
+    """
+    Get the sort value and id from a cursor created by encode_cursor for the same sort
+    """
+    try:
+        payload, signature = cursor.split(".")
+        payload = _b64decode(payload)
+        signature = _b64decode(signature)
+    except ValueError:
+        raise cherrypy.HTTPError(400, "Invalid marker.")
+
+    if not any(hmac.compare_digest(signature, expected) for expected in _cursor_signatures(payload)):
+        raise cherrypy.HTTPError(400, "Invalid marker.")
+
+    cursor_sort, value, id = json.loads(payload.decode())
+    if cursor_sort != sort:
+        raise cherrypy.HTTPError(400, "The marker was created with a different sort.")
+    if isinstance(value, dict):
+        value = arrow.get(value['at']).datetime
+
+    return value, uuid.UUID(id)
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN a statement to get the planner's estimate of how many rows it returns
+    """
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element, compiler, **kwargs):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kwargs)
+
+
+class PaginationMixin(object):
+    """
+    Keyset pagination for routers that serialize database objects in their list routes.
+
+    Objects are ordered by the sort column then id so every page is an index range scan
+    starting after the previous page's last object, no matter how deep the page is.
+
+    Routers declare the loader options (i.e. selectinload) needed by their response
+    model's from_database so relationships are loaded for the whole page at once
+    instead of once per object. When only some fields were requested only their
+    columns are selected.
+
+    Objects are serialized straight to dicts when the response model has a compiled
+    serializer, otherwise the response model's from_database is used.
+
+    Export routes stream every object with the same filters as their list route.
+    """
+
+    def __total(self, session, query: Query) -> dict:
+        """
+        Count the objects a query returns.
+
+        The planner's estimate is used when it is over PAGINATION_TOTAL_EXACT_THRESHOLD
+        otherwise the objects are counted. Either way the result is cached for
+        PAGINATION_TOTAL_CACHE_TTL seconds.
+        """
+        statement = query.order_by(None).statement
+        compiled = statement.compile(dialect=session.get_bind().dialect)
+        cache_key = 'pagination:total:' + hashlib.sha256(
+            (str(compiled) + repr(sorted(compiled.params.items()))).encode()).hexdigest()
+
+        if settings.PAGINATION_TOTAL_CACHE_TTL > 0:
+            total = self.mount.cache_backend.get(cache_key)
+            if total is not None:
+                return total
+
+        plan = session.execute(Explain(statement)).scalar()
+        count = int(plan[0]['Plan']['Plan Rows'])
+        total = {'count': count, 'exact': False}
+        if count <= settings.PAGINATION_TOTAL_EXACT_THRESHOLD:
+            total = {'count': query.order_by(None).count(), 'exact': True}
+
+        if settings.PAGINATION_TOTAL_CACHE_TTL > 0:
+            self.mount.cache_backend.set(cache_key, total, settings.PAGINATION_TOTAL_CACHE_TTL)
+        return total
+
+    def __query(self, db_cls, starting_query, options, sort_column) -> Query:
+        if starting_query is None:
+            starting_query = Query(db_cls)
+        if options is not None:
+            starting_query = starting_query.options(*options)
+        if settings.DATABASE_RAISE_ON_LAZY_LOAD:
+            # Any relationship that was not eagerly loaded raises instead of querying
+            starting_query = starting_query.options(raiseload('*'))
+
+        request_fields = getattr(cherrypy.request, 'fields', None)
+        if request_fields is not None:
+            # Only select the columns needed for the requested fields and the cursor
+            starting_query = starting_query.options(
+                load_only(*load_only_columns(db_cls, request_fields, 'id', sort_column.key)))
+
+        return starting_query
+
+    def __serialize(self, response_cls, db_object, request_fields):
+        serializer = SERIALIZERS.get(response_cls)
+        if serializer is not None:
+            return serializer.dump(db_object, request_fields)
+        if request_fields is not None:
+            db_object = LoadedAttributes(db_object)
+        return response_cls.from_database(db_object)
+
+    def paginate(self, db_cls, response_cls, limit, marker, starting_query=None, options=None, sort='-created_at',
+                 total=False):
+        descending = sort.startswith('-')
+        sort_column = getattr(db_cls, sort.lstrip('-'))
+        keyset = tuple_(sort_column, db_cls.id)
+
+        starting_query = self.__query(db_cls, starting_query, options, sort_column)
+        request_fields = getattr(cherrypy.request, 'fields', None)
+
+        resp_objects = []
+        with cherrypy.request.db_session() as session:
+            starting_query.session = session
+            if descending:
+                db_objects = starting_query.order_by(sort_column.desc(), db_cls.id.desc())
+            else:
+                db_objects = starting_query.order_by(sort_column.asc(), db_cls.id.asc())
+
+            if marker is not None:
+                try:
+                    marker_id = uuid.UUID(marker)
+                except ValueError:
+                    marker_value, marker_id = decode_cursor(marker, sort)
+                else:
+                    # Markers used to be the id of the last object so keep them working for old next links
+                    marker_object = session.query(db_cls).filter(db_cls.id == marker_id).first()
+                    if marker_object is None:
+                        raise cherrypy.HTTPError(status=400, message="Unknown marker ID")
+                    marker_value = getattr(marker_object, sort_column.key)
+
+                marker_keyset = tuple_(literal(marker_value, sort_column.type), literal(marker_id, db_cls.id.type))
+                if descending:
+                    db_objects = db_objects.filter(keyset < marker_keyset)
+                else:
+                    db_objects = db_objects.filter(keyset > marker_keyset)
+
+            # Get one extra object to know if there are more pages
+            db_objects = db_objects.limit(limit + 1).all()
+
+            for db_object in db_objects[:limit]:
+                resp_objects.append(self.__serialize(response_cls, db_object, request_fields))
+
+            next_marker = None
+            if len(db_objects) > limit:
+                last_object = db_objects[limit - 1]
+                next_marker = encode_cursor(sort, getattr(last_object, sort_column.key), last_object.id)
+
+            resp_total = None
+            if total:
+                if marker is None and next_marker is None:
+                    # Everything fit on the first page
+                    resp_total = {'count': len(resp_objects), 'exact': True}
+                else:
+                    resp_total = self.__total(session, starting_query)
+
+        return resp_objects, next_marker, resp_total
+
+    def stream(self, db_cls, response_cls, starting_query=None, options=None):
+        """
+        Stream every object as newline delimited json ordered by created_at then id.
+
+        Objects are read from a server side cursor EXPORT_BATCH_SIZE at a time and every
+        batch is sent as soon as it is serialized so memory use does not grow with the
+        number of objects.
+        """
+        starting_query = self.__query(db_cls, starting_query, options, db_cls.created_at)
+        request_fields = getattr(cherrypy.request, 'fields', None)
+        db_session = cherrypy.request.db_session
+
+        cherrypy.response.headers['Content-Type'] = 'application/x-ndjson'
+        # No Content-Length so the response is sent chunked
+        cherrypy.response.stream = True
+
+        def generate():
+            with db_session() as session:
+                starting_query.session = session
+                db_objects = starting_query.order_by(db_cls.created_at.asc(), db_cls.id.asc()).yield_per(
+                    settings.EXPORT_BATCH_SIZE)
+
+                lines = []
+                for db_object in db_objects:
+                    value = self.__serialize(response_cls, db_object, request_fields)
+                    if isinstance(value, Model):
+                        value = export(value, request_fields)
+                    lines.append(json.dumps(value))
+                    if len(lines) >= settings.EXPORT_BATCH_SIZE:
+                        yield ("\n".join(lines) + "\n").encode('utf-8')
+                        lines = []
+
+                if len(lines) > 0:
+                    yield ("\n".join(lines) + "\n").encode('utf-8')
+
+        return generate()
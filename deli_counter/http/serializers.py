@@ -0,0 +1,107 @@
+import ipaddress
+import uuid
+from collections import OrderedDict
+from operator import attrgetter, methodcaller
+
+import arrow
+from schematics.types import BaseType, BooleanType, DictType, IntType, ListType, StringType, UUIDType
+
+from deli_counter.http.mounts.root.routes.v1.validation_models.images import ResponseImage
+from deli_counter.http.mounts.root.routes.v1.validation_models.instances import ResponseInstance
+from deli_counter.http.mounts.root.routes.v1.validation_models.keypairs import ResponseKeypair
+from deli_counter.http.mounts.root.routes.v1.validation_models.network_ports import ResponseNetworkPort
+from deli_counter.http.mounts.root.routes.v1.validation_models.networks import ResponseNetwork
+from deli_counter.http.mounts.root.routes.v1.validation_models.projects import ResponseProject
+from deli_counter.http.mounts.root.routes.v1.validation_models.regions import ResponseRegion
+from deli_counter.http.mounts.root.routes.v1.validation_models.task import TaskModel
+from deli_counter.http.mounts.root.routes.v1.validation_models.zones import ResponseZone
+from ingredients_http.schematics.types import ArrowType, EnumType, IPv4AddressType, IPv4NetworkType
+
+
+def _converter(field: BaseType):
+    """
+    Build a function giving the same value as the field's to_native
+    after it has been through the application's json encoder
+    """
+    if isinstance(field, ListType):
+        convert_item = _converter(field.field)
+        return lambda value: [None if item is None else convert_item(item) for item in value]
+
+    if isinstance(field, DictType):
+        convert_item = _converter(field.field)
+        return lambda value: {str(key): None if item is None else convert_item(item) for key, item in value.items()}
+
+    if isinstance(field, UUIDType):
+        native_type, primitive = uuid.UUID, str
+    elif isinstance(field, ArrowType):
+        native_type, primitive = arrow.Arrow, methodcaller('isoformat')
+    elif isinstance(field, EnumType):
+        native_type, primitive = field.enum_class, attrgetter('value')
+    elif isinstance(field, IPv4AddressType):
+        native_type, primitive = ipaddress.IPv4Address, str
+    elif isinstance(field, IPv4NetworkType):
+        native_type, primitive = ipaddress.IPv4Network, str
+    elif isinstance(field, (StringType, IntType, BooleanType)):
+        native_type, primitive = field.native_type, None
+    else:
+        raise TypeError("Can not serialize %s fields" % field.__class__.__name__)
+
+    to_native = field.to_native
+
+    def convert(value):
+        # Values from the database almost always have the native type already
+        if value.__class__ is not native_type:
+            value = to_native(value)
+        if primitive is None:
+            return value
+        return primitive(value)
+
+    return convert
+
+
+class Serializer(object):
+    """
+    Turns database objects into the same json compatible dicts as a response model's
+    from_database followed by to_native without building the schematics model.
+
+    The accessor and conversion for every field is worked out once. Fields are read from
+    the attribute with the same name unless an accessor is given for them. Rows from
+    Core queries can be serialized as well as ORM objects as long as their columns are
+    named after the fields.
+
+    Nothing is validated, values from the database are trusted to already be valid.
+    """
+
+    def __init__(self, model_cls, **accessors):
+        self.model_cls = model_cls
+        self._plan = OrderedDict()
+        for name, field in model_cls._fields.items():
+            self._plan[name] = (accessors.pop(name, attrgetter(name)), _converter(field))
+
+        if len(accessors) > 0:
+            raise TypeError("%s does not have the fields %s" % (model_cls.__name__, ", ".join(accessors)))
+
+    def dump(self, db_object, request_fields=None) -> dict:
+        """
+        Serialize a database object, only reading the requested fields when given
+        """
+        data = {}
+        for name in self._plan.keys() if request_fields is None else request_fields:
+            accessor, convert = self._plan[name]
+            value = accessor(db_object)
+            data[name] = None if value is None else convert(value)
+        return data
+
+
+SERIALIZERS = {
+    ResponseImage: Serializer(ResponseImage),
+    ResponseInstance: Serializer(ResponseInstance,
+                                 keypair_ids=lambda instance: [keypair.id for keypair in instance.keypairs]),
+    ResponseKeypair: Serializer(ResponseKeypair),
+    ResponseNetworkPort: Serializer(ResponseNetworkPort),
+    ResponseNetwork: Serializer(ResponseNetwork),
+    ResponseProject: Serializer(ResponseProject),
+    ResponseRegion: Serializer(ResponseRegion),
+    ResponseZone: Serializer(ResponseZone),
+    TaskModel: Serializer(TaskModel),
+}
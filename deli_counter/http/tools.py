@@ -0,0 +1,99 @@
+import json
+from urllib.parse import urlencode
+
+import cherrypy
+from schematics import Model
+
+from deli_counter.http.fields import parse_fields, export
+
+
+def fields(cls):
+    """
+    Read the fields query parameter into request.fields, the response model's fields
+    that were asked for or None when all of them should be returned.
+
+    Runs before model_params so routes do not have to declare the parameter.
+    """
+    request = cherrypy.serving.request
+    request.fields = None
+
+    value = request.params.pop('fields', None)
+    if value is not None:
+        request.fields = parse_fields(cls, value)
+
+
+def model_out(cls=None):
+    """
+    Replaces the ingredients_http tool of the same name so only the requested fields are returned
+    """
+
+    def model_handler(*args, **kwargs):
+        value = cherrypy.serving.request._model_inner_handler(*args, **kwargs)
+        if issubclass(value.__class__, Model) is False:
+            raise cherrypy.HTTPError(500, "Output Model class (" + value.__class__.__name__ +
+                                     ") is not a subclass of  " + Model.__module__ + "." + Model.__name__)
+        if cls is not None and value.__class__ != cls:
+            raise cherrypy.HTTPError(500, "Output Model class (" + value.__class__.__name__ +
+                                     ") does not match given class " + cls.__name__)
+
+        return json.dumps(export(value, getattr(cherrypy.serving.request, 'fields', None))).encode('utf-8')
+
+    request = cherrypy.serving.request
+    if request.handler is None:  # pragma: no cover
+        return
+    request._model_inner_handler = request.handler
+    request.handler = model_handler
+    cherrypy.serving.response.headers['Content-Type'] = 'application/json'
+
+
+def model_out_pagination(cls=None):
+    """
+    Replaces the ingredients_http tool of the same name so the next link uses the
+    cursor returned by PaginationMixin.paginate as its marker, the total is
+    included when it was asked for and only the requested fields are returned.
+    """
+
+    def model_handler(*args, **kwargs):
+        request = cherrypy.serving.request
+        request_fields = getattr(request, 'fields', None)
+        list_name = request.path_info.split("/")[-1]
+        data = {
+            list_name: []
+        }
+
+        values, next_marker, total = request._model_inner_handler(*args, **kwargs)
+        for value in values:
+            if isinstance(value, dict):
+                # Already serialized with only the requested fields
+                data[list_name].append(value)
+                continue
+            if cls is not None and value.__class__ != cls:
+                raise cherrypy.HTTPError(500, "Output Model class (" + value.__class__.__name__ +
+                                         ") does not match given class " + cls.__name__)
+
+            data[list_name].append(export(value, request_fields))
+
+        if total is not None:
+            data[list_name + "_total"] = total
+
+        data[list_name + "_links"] = []
+        if next_marker is not None:
+            req_params = {k: v for k, v in request.params.items() if v is not None}
+            req_params['marker'] = next_marker
+            if request_fields is not None:
+                req_params['fields'] = ",".join(request_fields)
+            data[list_name + "_links"] = [
+                {
+                    "href": cherrypy.url(qs=urlencode(req_params)),
+                    "rel": "next"
+                }
+            ]
+
+        return json.dumps(data).encode('utf-8')
+
+    request = cherrypy.serving.request
+    if request.handler is None:  # pragma: no cover
+        return
+    request._model_inner_handler = request.handler
+    request.handler = model_handler
+    cherrypy.serving.response.headers['Content-Type'] = 'application/json'
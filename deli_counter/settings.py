@@ -84,6 +84,21 @@ if os.environ.get('CLI'):
 DATABASE_HOST = os.environ['DATABASE_HOST']
 DATABASE_USERNAME = os.environ['DATABASE_USERNAME']
 DATABASE_PASSWORD = os.environ['DATABASE_PASSWORD']
+# Raise instead of lazy loading relationships that list routes did not ask to be eagerly loaded
+# Used by tests to catch serializers that would run a query per object
+DATABASE_RAISE_ON_LAZY_LOAD = os.environ.get('DATABASE_RAISE_ON_LAZY_LOAD', 'false').lower() == 'true'
+
+####################
+# PAGINATION       #
+####################
+
+# Lists estimated by the query planner to have more objects than this report the estimate as their total
+# instead of counting the objects
+PAGINATION_TOTAL_EXACT_THRESHOLD = int(os.environ.get('PAGINATION_TOTAL_EXACT_THRESHOLD', 10000))
+# Seconds to cache list totals, 0 to disable
+PAGINATION_TOTAL_CACHE_TTL = int(os.environ.get('PAGINATION_TOTAL_CACHE_TTL', 30))
+# Number of objects export routes read from the database and send at a time
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
 
 ####################
 # RABBITMQ         #
@@ -95,17 +110,96 @@ RABBITMQ_HOST = os.environ['RABBITMQ_HOST']
 RABBITMQ_USERNAME = os.environ['RABBITMQ_USERNAME']
 RABBITMQ_PASSWORD = os.environ['RABBITMQ_PASSWORD']
 
+####################
+# TASKS            #
+####################
+
+# Publish the task messages routes write to the outbox from a background thread in every process
+TASK_OUTBOX_RELAY = os.environ.get('TASK_OUTBOX_RELAY', 'true').lower() == 'true'
+# Max number of task messages published at a time
+TASK_OUTBOX_BATCH_SIZE = int(os.environ.get('TASK_OUTBOX_BATCH_SIZE', 100))
+# Seconds between checks for task messages written by other processes
+TASK_OUTBOX_POLL_INTERVAL = float(os.environ.get('TASK_OUTBOX_POLL_INTERVAL', 1))
+# Max number of connections to the broker per process used to publish task messages
+TASK_PUBLISHER_POOL_SIZE = int(os.environ.get('TASK_PUBLISHER_POOL_SIZE', 2))
+# Seconds to wait for a free connection before giving up on publishing, so a slow broker backs publishing off
+TASK_PUBLISHER_TIMEOUT = float(os.environ.get('TASK_PUBLISHER_TIMEOUT', 10))
+# Number of times to reconnect when the connection to the broker is lost while publishing
+TASK_PUBLISHER_RETRIES = int(os.environ.get('TASK_PUBLISHER_RETRIES', 5))
+# Max seconds to wait between reconnects, the wait grows by a second every attempt
+TASK_PUBLISHER_RETRY_INTERVAL_MAX = int(os.environ.get('TASK_PUBLISHER_RETRY_INTERVAL_MAX', 5))
+# Max seconds a task can be long polled for with the wait param
+TASK_WAIT_MAX = int(os.environ.get('TASK_WAIT_MAX', 60))
+# Max number of requests per process long polling tasks, past that tasks are returned without waiting
+# so waiting requests never take every uwsgi thread
+TASK_WAIT_MAX_WAITERS = int(os.environ.get('TASK_WAIT_MAX_WAITERS', 8))
+
+####################
+# EVENTS           #
+####################
+
+# Seconds state change events are kept for streams to resume from
+EVENTS_RETENTION = int(os.environ.get('EVENTS_RETENTION', 3600))
+# Prune events older than EVENTS_RETENTION from a background thread in every process
+EVENTS_PRUNE = os.environ.get('EVENTS_PRUNE', 'true').lower() == 'true'
+# Seconds between prunes
+EVENTS_PRUNE_INTERVAL = int(os.environ.get('EVENTS_PRUNE_INTERVAL', 60))
+# Max number of open event streams per process, every stream holds a uwsgi thread while it is open
+EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 4))
+# Seconds between keepalive comments so proxies keep idle streams open and closed clients are noticed
+EVENTS_KEEPALIVE_INTERVAL = float(os.environ.get('EVENTS_KEEPALIVE_INTERVAL', 15))
+# Seconds before a stream is ended and the client has to reconnect, so the threads streams hold are handed back
+EVENTS_STREAM_DURATION = int(os.environ.get('EVENTS_STREAM_DURATION', 300))
+
+####################
+# CACHE            #
+####################
+
+# Backend used for caches that should be shared between processes
+# Memory (per process): deli_counter.cache.backends.memory:MemoryCacheBackend
+# uWSGI (shared by all workers): deli_counter.cache.backends.uwsgi_cache:UWSGICacheBackend
+# With the memory backend deleted users, service accounts and projects are only evicted from the identity
+# cache of the worker that deleted them, the others accept their tokens for up to AUTH_IDENTITY_CACHE_TTL.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'deli_counter.cache.backends.uwsgi_cache:UWSGICacheBackend')
+# Name of the cache configured in wsgi.ini when using the uWSGI cache backend
+CACHE_UWSGI_NAME = os.environ.get('CACHE_UWSGI_NAME', 'deli_counter')
+
 ####################
 # Auth             #
 ####################
 
 AUTH_DRIVERS = os.environ.get('AUTH_DRIVERS', "deli_counter.auth_drivers.db.driver:DBAuthDriver").split(",")
 AUTH_FERNET_KEYS = os.environ['AUTH_FERNET_KEYS'].split(",")
+# Number of decrypted tokens to keep in memory per process
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 4096))
+# Seconds to cache the users, service accounts and projects that tokens resolve to, see CACHE_BACKEND
+AUTH_IDENTITY_CACHE_TTL = int(os.environ.get('AUTH_IDENTITY_CACHE_TTL', 300))
+# How policies are checked
+# Database (one query per check): deli_counter.auth.enforcers.database:DatabasePolicyEnforcer
+# Memory (role policies kept in memory): deli_counter.auth.enforcers.memory:MemoryPolicyEnforcer
+# The memory enforcer needs a CACHE_BACKEND that is shared between processes, deli counter refuses to start otherwise.
+AUTH_POLICY_ENFORCER = os.environ.get('AUTH_POLICY_ENFORCER',
+                                      'deli_counter.auth.enforcers.database:DatabasePolicyEnforcer')
+# Embed the policies granted to a token into the token so requests can be authorized without the database.
+# Needs a CACHE_BACKEND that is shared between processes (uWSGI), deli counter refuses to start otherwise.
+AUTH_TOKEN_EMBED_POLICIES = os.environ.get('AUTH_TOKEN_EMBED_POLICIES', 'false').lower() == 'true'
+# Seconds the policies embedded in a token are trusted for, older tokens are checked against their roles
+AUTH_TOKEN_POLICIES_MAX_AGE = int(os.environ.get('AUTH_TOKEN_POLICIES_MAX_AGE', 300))
+# Seconds between full reloads of the in-memory role policies
+AUTH_POLICY_REFRESH_INTERVAL = int(os.environ.get('AUTH_POLICY_REFRESH_INTERVAL', 300))
 
 ####################
 # BUiltIn AUTH     #
 ####################
-# Does builtin auth need any params?
+
+# scrypt cost parameters for builtin passwords, passwords are rehashed on login when these change
+BUILTIN_PASSWORD_SCRYPT_N = int(os.environ.get('BUILTIN_PASSWORD_SCRYPT_N', 16384))
+BUILTIN_PASSWORD_SCRYPT_R = int(os.environ.get('BUILTIN_PASSWORD_SCRYPT_R', 8))
+BUILTIN_PASSWORD_SCRYPT_P = int(os.environ.get('BUILTIN_PASSWORD_SCRYPT_P', 1))
+# Number of processes (per uwsgi worker) used to hash passwords
+BUILTIN_PASSWORD_WORKERS = int(os.environ.get('BUILTIN_PASSWORD_WORKERS', 2))
+# Max number of passwords waiting to be hashed before logins are rejected with a 503
+BUILTIN_PASSWORD_QUEUE_SIZE = int(os.environ.get('BUILTIN_PASSWORD_QUEUE_SIZE', 16))
 
 ####################
 # GITHUB AUTH      #
@@ -120,6 +214,21 @@ GITHUB_TEAM_ROLES_PREFIX = os.environ.get("GITHUB_TEAM_ROLES_PREFIX", "sandwich-
 # Split the env var into a dict because it is faster to search
 _github_team_roles = os.environ.get('GITHUB_TEAM_ROLES', 'sandwich-admin:admin')
 GITHUB_TEAM_ROLES = dict(item.split(":") for item in _github_team_roles.split(","))
+# How to find the teams a user is in
+# org: check the user's membership of each org team that maps to a role
+# user: list the user's teams once, falls back to org if that fails
+GITHUB_TEAM_RESOLUTION = os.environ.get('GITHUB_TEAM_RESOLUTION', 'org')
+# Max number of team membership checks to run at the same time
+GITHUB_TEAM_WORKERS = int(os.environ.get('GITHUB_TEAM_WORKERS', 8))
+# Max number of pooled connections to GitHub
+GITHUB_HTTP_POOL_SIZE = int(os.environ.get('GITHUB_HTTP_POOL_SIZE', 10))
+# Seconds to wait for GitHub to respond
+GITHUB_HTTP_TIMEOUT = int(os.environ.get('GITHUB_HTTP_TIMEOUT', 10))
+# Number of times to retry GitHub requests that failed with a 5xx or were rate limited
+GITHUB_HTTP_RETRIES = int(os.environ.get('GITHUB_HTTP_RETRIES', 3))
+GITHUB_HTTP_BACKOFF = float(os.environ.get('GITHUB_HTTP_BACKOFF', 0.5))
+# Seconds to cache which of the organization's teams map to roles, per user, 0 to disable
+GITHUB_TEAM_CACHE_TTL = int(os.environ.get('GITHUB_TEAM_CACHE_TTL', 300))
 
 ####################
 # GITLAB AUTH      #
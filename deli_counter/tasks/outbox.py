@@ -0,0 +1,143 @@
+import logging
+import threading
+
+from kombu.utils import json as kombu_json
+from simple_settings import settings
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from deli_counter.db.tables import task_outbox, task_resources
+from ingredients_db.models.task import Task
+from ingredients_tasks.tasks import tasks
+
+# Set when a transaction that wrote to the outbox commits so this process's relay does not wait to poll
+_pending = threading.Event()
+
+# Key of the session.info dict holding the rows, by table, that are inserted when the session commits
+_ROWS_KEY = 'deli_outbox_rows'
+
+
+def _write_rows(session):
+    rows = session.info.pop(_ROWS_KEY, {})
+    for table, values in rows.items():
+        # One multi row insert for every task created in the transaction, i.e. a whole batch of instances
+        session.execute(table.insert().values(values))
+
+
+def _discard_rows(session):
+    session.info.pop(_ROWS_KEY, None)
+
+
+def _wake_relay(session):
+    _pending.set()
+
+
+def _add_row(session: Session, table, **values):
+    session.info.setdefault(_ROWS_KEY, {}).setdefault(table, []).append(values)
+    if not event.contains(session, 'before_commit', _write_rows):
+        event.listen(session, 'before_commit', _write_rows)
+        event.listen(session, 'after_rollback', _discard_rows)
+        event.listen(session, 'after_commit', _wake_relay)
+
+
+class OutboxTask(object):
+    """
+    Stands in for a celery task so create_task writes the task's message to the
+    outbox in the session's transaction instead of publishing it.
+
+    Messages are kept on the session and inserted together right before it commits.
+    """
+
+    def __init__(self, session: Session, celery_task):
+        self._session = session
+        self._celery_task = celery_task
+
+    def __getattr__(self, name):
+        return getattr(self._celery_task, name)
+
+    def apply_async(self, args=None, kwargs=None, **options):
+        body = kombu_json.dumps({'args': args, 'kwargs': kwargs, 'options': options})
+        _add_row(self._session, task_outbox, task_name=self._celery_task.name, body=body)
+
+
+def create_task(session: Session, entity, celery_task, **kwargs) -> Task:
+    """
+    Create a task for the entity like ingredients_tasks' create_task does.
+
+    The task's message is only published by the OutboxRelay once the session's
+    transaction commits, so it is never lost or sent for a rolled back change.
+
+    The task is linked to the entity and its project so it stays in the project
+    after the entity moves on to another task.
+    """
+    task = tasks.create_task(session, entity, OutboxTask(session, celery_task), **kwargs)
+    if task.id is None:
+        session.flush()
+    _add_row(session, task_resources, task_id=task.id, project_id=getattr(entity, 'project_id', None),
+             resource_type=entity.__tablename__, resource_id=entity.id)
+    return task
+
+
+class OutboxRelay(object):
+    """
+    Publishes the messages create_task writes to the outbox in batches with the
+    given publish function, i.e. Publisher.publish.
+
+    Every process runs a relay thread. Batches are claimed with FOR UPDATE SKIP LOCKED
+    so relays in other processes publish different messages, and messages are only
+    deleted once their batch was published. A relay that dies after publishing but
+    before deleting its batch means those messages are published again.
+    """
+
+    def __init__(self, db_session, publish):
+        self.logger = logging.getLogger("%s.%s" % (self.__module__, self.__class__.__name__))
+        self.db_session = db_session
+        self.publish = publish
+        self.batch_size = settings.TASK_OUTBOX_BATCH_SIZE
+        self.poll_interval = settings.TASK_OUTBOX_POLL_INTERVAL
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def relay_batch(self) -> int:
+        """
+        Publish the oldest batch of messages no other relay is publishing
+
+        Returns the number of messages published
+        """
+        with self.db_session() as session:
+            messages = session.execute(
+                select([task_outbox]).order_by(task_outbox.c.id).limit(self.batch_size).with_for_update(
+                    skip_locked=True)).fetchall()
+            if len(messages) == 0:
+                return 0
+
+            self.publish(messages)
+
+            session.execute(task_outbox.delete().where(task_outbox.c.id.in_([message.id for message in messages])))
+            session.commit()
+
+        return len(messages)
+
+    def __run(self):
+        while not self._stopped.is_set():
+            _pending.clear()
+            try:
+                published = self.relay_batch()
+            except Exception:
+                self.logger.exception("Error publishing task messages, retrying in %s seconds" % self.poll_interval)
+                published = 0
+
+            if published < self.batch_size:
+                _pending.wait(self.poll_interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.__run, name='outbox-relay', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        _pending.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+
+from kombu import Connection
+from kombu.utils import json as kombu_json
+from simple_settings import settings
+
+
+class PublisherBusy(Exception):
+    pass
+
+
+class Publisher(object):
+    """
+    Publishes task messages over a pool of broker connections shared by every thread.
+
+    Each pooled connection keeps its channel open in confirm mode between publishes.
+    Publishes reconnect with an increasing backoff when the connection is lost and
+    when all connections are busy for TASK_PUBLISHER_TIMEOUT seconds PublisherBusy
+    is raised so callers back off instead of queueing up behind a slow broker.
+    """
+
+    def __init__(self, app, connection: Connection):
+        self.logger = logging.getLogger("%s.%s" % (self.__module__, self.__class__.__name__))
+        self.app = app
+        self.timeout = settings.TASK_PUBLISHER_TIMEOUT
+
+        connection = connection.clone(
+            transport_options=dict(connection.transport_options, confirm_publish=True))
+        self._pool = connection.Pool(limit=settings.TASK_PUBLISHER_POOL_SIZE)
+        self._retry_policy = {
+            'max_retries': settings.TASK_PUBLISHER_RETRIES,
+            'interval_start': 0,
+            'interval_step': 1,
+            'interval_max': settings.TASK_PUBLISHER_RETRY_INTERVAL_MAX,
+            'errback': self.__reconnecting
+        }
+
+        self._lock = threading.Lock()
+        self._published = 0
+        self._failed = 0
+        self._reconnects = 0
+        self._in_flight = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def __reconnecting(self, exc, interval):
+        with self._lock:
+            self._reconnects += 1
+        self.logger.warning("Lost connection to the broker (%s), reconnecting in %s seconds" % (exc, interval))
+
+    def __publish(self, producer, message):
+        celery_task = self.app.tasks.get(message.task_name)
+        if celery_task is None:
+            self.logger.error("Dropping message %s for unknown task %s" % (message.id, message.task_name))
+            return
+
+        body = kombu_json.loads(message.body)
+        celery_task.apply_async(args=body['args'], kwargs=body['kwargs'], producer=producer, retry=True,
+                                retry_policy=self._retry_policy, **body['options'])
+
+    def publish(self, messages):
+        """
+        Publish task messages, each one is confirmed by the broker before the next is sent
+        """
+        try:
+            connection = self._pool.acquire(block=True, timeout=self.timeout)
+        except self._pool.LimitExceeded:
+            raise PublisherBusy("All %s broker connections are busy." % self._pool.limit)
+
+        remaining = len(messages)
+        with self._lock:
+            self._in_flight += remaining
+        try:
+            producer = connection.Producer()
+            for message in messages:
+                started = time.monotonic()
+                try:
+                    self.__publish(producer, message)
+                except Exception:
+                    with self._lock:
+                        self._failed += 1
+                    raise
+
+                latency = time.monotonic() - started
+                remaining -= 1
+                with self._lock:
+                    self._published += 1
+                    self._in_flight -= 1
+                    self._latency_total += latency
+                    self._latency_max = max(self._latency_max, latency)
+        finally:
+            with self._lock:
+                self._in_flight -= remaining
+            # Lost connections were already revived by the retries so the connection can always be reused
+            connection.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'published': self._published,
+                'failed': self._failed,
+                'reconnects': self._reconnects,
+                'in_flight': self._in_flight,
+                'latency_mean': self._latency_total / self._published if self._published > 0 else 0.0,
+                'latency_max': self._latency_max
+            }
+
+    def close(self):
+        self._pool.force_close_all()
@@ -5,7 +5,10 @@ import arrow
 import webtest
 from cryptography.fernet import Fernet
 from faker import Faker
+from sqlalchemy import create_engine
 
+from deli_counter.cache.backends.memory import MemoryCacheBackend
+from deli_counter.db import schema
 from deli_counter.http.app import Application
 from deli_counter.http.mounts.root.mount import RootMount
 from ingredients_db.models.authn import AuthNUser, AuthNServiceAccount
@@ -22,6 +25,11 @@ from ingredients_http.test.base import APITestCase
 fake = Faker()
 
 
+class SharedMemoryCacheBackend(MemoryCacheBackend):
+    # Tests run in one process so the memory backend can stand in for a shared one
+    shared = True
+
+
 class DeliTestCase(APITestCase):
     def settings_module(self) -> str:
         return 'deli_counter.test.settings.all'
@@ -30,7 +38,14 @@ class DeliTestCase(APITestCase):
         return Application
 
     def setup_mounts(self, app):
-        app.register_mount(RootMount(app))
+        self.root_mount = RootMount(app)
+        app.register_mount(self.root_mount)
+
+    def setup_database(self, uri):
+        super().setup_database(uri)
+        engine = create_engine(uri)
+        schema.upgrade(engine)
+        engine.dispose()
 
     def create_authn_user(self, app, username=None, driver='db') -> AuthNUser:
         with app.database.session() as session:
@@ -55,6 +55,21 @@ LOGGING_CONFIG = {
     }
 }
 
+####################
+# DATABASE         #
+####################
+
+# Fail on relationships lazy loaded while serializing list pages
+DATABASE_RAISE_ON_LAZY_LOAD = True
+
+####################
+# PAGINATION       #
+####################
+
+PAGINATION_TOTAL_EXACT_THRESHOLD = 10000
+PAGINATION_TOTAL_CACHE_TTL = 0
+EXPORT_BATCH_SIZE = 100
+
 ####################
 # RABBITMQ         #
 ####################
@@ -66,6 +81,41 @@ RABBITMQ_HOST = '127.0.0.1'
 RABBITMQ_USERNAME = 'guest'
 RABBITMQ_PASSWORD = 'guest'
 
+####################
+# TASKS            #
+####################
+
+# Tests check the outbox and run the relay themselves
+TASK_OUTBOX_RELAY = False
+TASK_OUTBOX_BATCH_SIZE = 2
+TASK_OUTBOX_POLL_INTERVAL = 1
+TASK_PUBLISHER_POOL_SIZE = 1
+TASK_PUBLISHER_TIMEOUT = 0.1
+TASK_PUBLISHER_RETRIES = 2
+TASK_PUBLISHER_RETRY_INTERVAL_MAX = 0
+TASK_WAIT_MAX = 5
+TASK_WAIT_MAX_WAITERS = 2
+
+####################
+# EVENTS           #
+####################
+
+EVENTS_RETENTION = 3600
+# Tests prune themselves
+EVENTS_PRUNE = False
+EVENTS_PRUNE_INTERVAL = 60
+EVENTS_MAX_SUBSCRIBERS = 2
+EVENTS_KEEPALIVE_INTERVAL = 0.5
+# Streams end quickly so webtest gets the whole response
+EVENTS_STREAM_DURATION = 2
+
+####################
+# CACHE            #
+####################
+
+CACHE_BACKEND = 'deli_counter.cache.backends.memory:MemoryCacheBackend'
+CACHE_UWSGI_NAME = 'deli_counter'
+
 ####################
 # Auth             #
 ####################
@@ -76,6 +126,23 @@ AUTH_DRIVERS = [
 ]
 
 AUTH_FERNET_KEYS = ["xVc2Y7UeZWmNVVYZUwh35w2J8V69kkn60EDr6TdAQoc="]
+AUTH_TOKEN_CACHE_SIZE = 128
+AUTH_IDENTITY_CACHE_TTL = 300
+AUTH_POLICY_ENFORCER = 'deli_counter.auth.enforcers.database:DatabasePolicyEnforcer'
+AUTH_POLICY_REFRESH_INTERVAL = 300
+AUTH_TOKEN_EMBED_POLICIES = False
+AUTH_TOKEN_POLICIES_MAX_AGE = 300
+
+####################
+# BUILTIN AUTH     #
+####################
+
+# Keep hashing cheap so tests are fast
+BUILTIN_PASSWORD_SCRYPT_N = 1024
+BUILTIN_PASSWORD_SCRYPT_R = 8
+BUILTIN_PASSWORD_SCRYPT_P = 1
+BUILTIN_PASSWORD_WORKERS = 1
+BUILTIN_PASSWORD_QUEUE_SIZE = 4
 
 ####################
 # GITHUB AUTH      #
@@ -90,3 +157,10 @@ GITHUB_TEAM_ROLES = {
     "sandwich-admin": "admin"
 }
 GITHUB_TEAM_ROLES_PREFIX = "sandwich-"
+GITHUB_TEAM_RESOLUTION = 'org'
+GITHUB_TEAM_WORKERS = 2
+GITHUB_TEAM_CACHE_TTL = 0
+GITHUB_HTTP_POOL_SIZE = 2
+GITHUB_HTTP_TIMEOUT = 5
+GITHUB_HTTP_RETRIES = 0
+GITHUB_HTTP_BACKOFF = 0
@@ -1,4 +1,11 @@
+import time
+
+from deli_counter.auth.identity import IdentityCache
+from deli_counter.auth.token_cache import TokenCache
+from deli_counter.cache.backends.memory import MemoryCacheBackend
 from deli_counter.test.base import DeliTestCase
+from ingredients_db.models.authn import AuthNServiceAccount, AuthNUser
+from ingredients_db.models.project import Project
 
 
 # TODO: do this
@@ -14,3 +21,111 @@ class TestAuthN(DeliTestCase):
 
     def test_get_user(self, wsgi):
         pass
+
+
+class TestIdentityCache(DeliTestCase):
+    @staticmethod
+    def no_db_session():
+        raise AssertionError("Database should not be used for cached identities")
+
+    def delete_row(self, app, cls, object_id):
+        with app.database.session() as session:
+            session.query(cls).filter(cls.id == object_id).delete()
+            session.commit()
+
+    def default_service_account(self, app, project) -> AuthNServiceAccount:
+        with app.database.session() as session:
+            service_account = session.query(AuthNServiceAccount).filter(
+                AuthNServiceAccount.project_id == project.id).first()
+            session.expunge(service_account)
+            return service_account
+
+    def test_cached(self, app):
+        identity_cache = IdentityCache(MemoryCacheBackend(), 60)
+        user = self.create_authn_user(app)
+        project = self.create_project(app)
+        service_account = self.default_service_account(app, project)
+
+        assert identity_cache.get_user(app.database.session, user.id).id == user.id
+        assert identity_cache.get_project(app.database.session, project.id).id == project.id
+        assert identity_cache.get_service_account(app.database.session, service_account.id).id == service_account.id
+
+        assert identity_cache.get_user(self.no_db_session, user.id).id == user.id
+        assert identity_cache.get_project(self.no_db_session, project.id).id == project.id
+        assert identity_cache.get_service_account(self.no_db_session, service_account.id).id == service_account.id
+
+        # Missing identities are not cached
+        self.delete_row(app, AuthNUser, user.id)
+        assert IdentityCache(MemoryCacheBackend(), 60).get_user(app.database.session, user.id) is None
+
+    def test_invalidate(self, app):
+        identity_cache = IdentityCache(MemoryCacheBackend(), 60)
+        user = self.create_authn_user(app)
+        project = self.create_project(app)
+        service_account = self.default_service_account(app, project)
+        identity_cache.get_user(app.database.session, user.id)
+        identity_cache.get_project(app.database.session, project.id)
+        identity_cache.get_service_account(app.database.session, service_account.id)
+
+        self.delete_row(app, AuthNUser, user.id)
+        self.delete_row(app, AuthNServiceAccount, service_account.id)
+        self.delete_row(app, Project, project.id)
+
+        identity_cache.invalidate_user(user.id)
+        assert identity_cache.get_user(app.database.session, user.id) is None
+        identity_cache.invalidate_service_account(service_account.id)
+        assert identity_cache.get_service_account(app.database.session, service_account.id) is None
+        identity_cache.invalidate_project(project.id)
+        assert identity_cache.get_project(app.database.session, project.id) is None
+
+    def test_deleted_user_token(self, wsgi, app):
+        user = self.create_authn_user(app)
+        token = self.create_token(app, roles=["admin"], authn_user=user)
+
+        # The user is cached by the first request
+        self.get(wsgi, "/v1/regions", token=token)
+
+        # What deleting a user through its auth driver does
+        self.delete_row(app, AuthNUser, user.id)
+        self.root_mount.identity_cache.invalidate_user(user.id)
+
+        self.get(wsgi, "/v1/regions", token=token, status=401)
+
+    def test_deleted_project_token(self, wsgi, app):
+        admin_token = self.create_token(app, roles=["admin"])
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        self.get(wsgi, "/v1/instances", token=token)
+
+        self.delete(wsgi, "/v1/projects/%s" % project.id, token=admin_token, status=204)
+
+        # Rejected instead of being treated as a token that is not scoped to a project
+        self.get(wsgi, "/v1/instances", token=token, status=401)
+
+
+class TestTokenCache(object):
+    def test_get_set(self):
+        cache = TokenCache(2)
+        cache.set("token", {"user_id": "1"}, time.time() + 60)
+
+        assert cache.get("token") == {"user_id": "1"}
+        assert cache.get("other") is None
+
+    def test_expired(self):
+        cache = TokenCache(2)
+        cache.set("token", {"user_id": "1"}, time.time() - 1)
+
+        assert cache.get("token") is None
+
+    def test_evicts_least_recently_used(self):
+        cache = TokenCache(2)
+        cache.set("token1", {"user_id": "1"}, time.time() + 60)
+        cache.set("token2", {"user_id": "2"}, time.time() + 60)
+
+        # Touch token1 so token2 is the least recently used
+        cache.get("token1")
+        cache.set("token3", {"user_id": "3"}, time.time() + 60)
+
+        assert cache.get("token1") is not None
+        assert cache.get("token2") is None
+        assert cache.get("token3") is not None
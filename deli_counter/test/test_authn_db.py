@@ -1,3 +1,8 @@
+import cherrypy
+import pytest
+from simple_settings.utils import settings_stub
+
+from deli_counter.auth.drivers.builtin.passwords import hash_password, verify_password, PasswordHasher
 from deli_counter.test.base import DeliTestCase
 
 
@@ -5,3 +10,40 @@ class TestAuthNDB(DeliTestCase):
     pass
 
 # TODO: do this
+
+
+class TestPasswords(DeliTestCase):
+    def test_hash_password(self):
+        encoded = hash_password("password", 1024, 8, 1)
+
+        assert encoded.startswith("scrypt$1024$8$1$")
+        assert verify_password("password", encoded) is True
+        assert verify_password("wrong", encoded) is False
+        # Salts are random
+        assert encoded != hash_password("password", 1024, 8, 1)
+
+    def test_plaintext_password(self):
+        assert verify_password("password", "password") is True
+        assert verify_password("wrong", "password") is False
+
+    def test_needs_rehash(self, app):
+        password_hasher = PasswordHasher()
+
+        assert password_hasher.needs_rehash("password") is True
+        assert password_hasher.needs_rehash(hash_password("password", 2048, 8, 1)) is True
+        assert password_hasher.needs_rehash(password_hasher.hash("password")) is False
+
+    def test_hasher_verify(self, app):
+        password_hasher = PasswordHasher()
+        encoded = password_hasher.hash("password")
+
+        assert password_hasher.verify("password", encoded) is True
+        assert password_hasher.verify("wrong", encoded) is False
+
+    def test_hasher_overloaded(self, app):
+        with settings_stub(BUILTIN_PASSWORD_QUEUE_SIZE=0):
+            password_hasher = PasswordHasher()
+
+        with pytest.raises(cherrypy.HTTPError) as e:
+            password_hasher.hash("password")
+        assert e.value.status == 503
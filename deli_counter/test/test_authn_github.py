@@ -1,12 +1,19 @@
+import json
 from unittest.mock import patch, MagicMock
 
+from cryptography.fernet import Fernet
+
 from github import BadCredentialsException
 from github.Authorization import Authorization
 from github.GithubException import TwoFactorException, GithubException
 from github.Organization import Organization
 from github.Team import Team
+from simple_settings import settings
+from simple_settings.utils import settings_stub
 
+from deli_counter.auth.drivers.github.http import GithubRetry
 from deli_counter.test.base import DeliTestCase, fake
+from ingredients_db.models.authz import AuthZRole
 
 
 # TODO: assert all responses
@@ -97,14 +104,14 @@ class TestAuthNGithubGeneral(DeliTestCase):
             'username': fake.word(),
             'password': fake.word()
         }
-        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock:
+        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock, \
+                patch('github.Team.Team.has_in_members', return_value=True):
             github_user = github_user_mock.return_value
             github_user.create_authorization.return_value = Authorization(None, [], {"token": "123456789"},
                                                                           completed=True)
             github_user.login = 'user'
 
             admin_team = Team(None, [], {"name": "sandwich-admin"}, completed=True)
-            admin_team.has_in_members = MagicMock(return_value=True)
 
             org = Organization(None, [], {"login": "sandwich"}, completed=True)
             org.get_teams = MagicMock(return_value=[admin_team])
@@ -120,14 +127,14 @@ class TestAuthNGithubGeneral(DeliTestCase):
             'username': fake.word(),
             'password': fake.word()
         }
-        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock:
+        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock, \
+                patch('github.Team.Team.has_in_members', return_value=True):
             github_user = github_user_mock.return_value
             github_user.create_authorization.return_value = Authorization(None, [], {"token": "123456789"},
                                                                           completed=True)
             github_user.login = 'user'
 
             prefix_team = Team(None, [], {"name": "sandwich-role1"}, completed=True)
-            prefix_team.has_in_members = MagicMock(return_value=True)
 
             org = Organization(None, [], {"login": "sandwich"}, completed=True)
             org.get_teams = MagicMock(return_value=[prefix_team])
@@ -143,7 +150,8 @@ class TestAuthNGithubGeneral(DeliTestCase):
             'username': fake.word(),
             'password': fake.word()
         }
-        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock:
+        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock, \
+                patch('github.Team.Team.has_in_members', return_value=True):
             # TODO: create role role1
 
             github_user = github_user_mock.return_value
@@ -152,7 +160,6 @@ class TestAuthNGithubGeneral(DeliTestCase):
             github_user.login = 'user'
 
             prefix_team = Team(None, [], {"name": "sandwich-role1"}, completed=True)
-            prefix_team.has_in_members = MagicMock(return_value=True)
 
             org = Organization(None, [], {"login": "sandwich"}, completed=True)
             org.get_teams = MagicMock(return_value=[prefix_team])
@@ -168,14 +175,14 @@ class TestAuthNGithubGeneral(DeliTestCase):
             'username': fake.word(),
             'password': fake.word()
         }
-        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock:
+        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock, \
+                patch('github.Team.Team.has_in_members', return_value=False):
             github_user = github_user_mock.return_value
             github_user.create_authorization.return_value = Authorization(None, [], {"token": "123456789"},
                                                                           completed=True)
             github_user.login = 'user'
 
             prefix_team = Team(None, [], {"name": "sandwich-role1"}, completed=True)
-            prefix_team.has_in_members = MagicMock(return_value=False)
 
             org = Organization(None, [], {"login": "sandwich"}, completed=True)
             org.get_teams = MagicMock(return_value=[prefix_team])
@@ -191,7 +198,8 @@ class TestAuthNGithubGeneral(DeliTestCase):
             'username': fake.word(),
             'password': fake.word()
         }
-        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock:
+        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock, \
+                patch('github.Team.Team.has_in_members', return_value=True):
             # TODO: create role role1
 
             github_user = github_user_mock.return_value
@@ -200,10 +208,8 @@ class TestAuthNGithubGeneral(DeliTestCase):
             github_user.login = 'user'
 
             admin_team = Team(None, [], {"name": "sandwich-admin"}, completed=True)
-            admin_team.has_in_members = MagicMock(return_value=True)
 
             prefix_team = Team(None, [], {"name": "sandwich-role1"}, completed=True)
-            prefix_team.has_in_members = MagicMock(return_value=True)
 
             org = Organization(None, [], {"login": "sandwich"}, completed=True)
             org.get_teams = MagicMock(return_value=[admin_team, prefix_team])
@@ -213,3 +219,125 @@ class TestAuthNGithubGeneral(DeliTestCase):
             self.post(wsgi, '/v1/auth/github/authorization', body=body)
 
             # TODO: query token for admin, role1 roles
+
+    def test_unmapped_team_not_checked(self, wsgi):
+        body = {
+            'username': fake.word(),
+            'password': fake.word()
+        }
+        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock, \
+                patch('github.Team.Team.has_in_members', return_value=True) as has_in_members:
+            github_user = github_user_mock.return_value
+            github_user.create_authorization.return_value = Authorization(None, [], {"token": "123456789"},
+                                                                          completed=True)
+            github_user.login = 'user'
+
+            other_team = Team(None, [], {"name": "other-team"}, completed=True)
+
+            org = Organization(None, [], {"login": "sandwich"}, completed=True)
+            org.get_teams = MagicMock(return_value=[other_team])
+
+            github_user.get_orgs.return_value = [org]
+
+            self.post(wsgi, '/v1/auth/github/authorization', body=body)
+
+            # Teams that don't map to a role should not be checked
+            has_in_members.assert_not_called()
+
+
+class TestAuthNGithubUserTeams(DeliTestCase):
+
+    def login(self, wsgi, user_teams, org_teams, login='user', resolution='user'):
+        body = {
+            'username': fake.word(),
+            'password': fake.word()
+        }
+        with patch('github.AuthenticatedUser.AuthenticatedUser') as github_user_mock, \
+                patch('github.Team.Team.has_in_members', return_value=True) as has_in_members, \
+                settings_stub(GITHUB_TEAM_RESOLUTION=resolution):
+            github_user = github_user_mock.return_value
+            github_user.create_authorization.return_value = Authorization(None, [], {"token": "123456789"},
+                                                                          completed=True)
+            github_user.login = login
+            if isinstance(user_teams, Exception):
+                github_user.get_teams.side_effect = user_teams
+            else:
+                github_user.get_teams.return_value = user_teams
+
+            org = Organization(None, [], {"login": "sandwich"}, completed=True)
+            org.get_teams = MagicMock(return_value=org_teams)
+            org.get_team = MagicMock(side_effect=lambda team_id: {team.id: team for team in org_teams}[team_id])
+            self.org = org
+
+            github_user.get_orgs.return_value = [org]
+
+            resp = self.post(wsgi, '/v1/auth/github/authorization', body=body)
+
+        fernet = Fernet(settings.AUTH_FERNET_KEYS[0])
+        token_data = json.loads(fernet.decrypt(resp.json['access_token'].encode()).decode())
+        return token_data, has_in_members
+
+    def admin_role_id(self, app):
+        with app.database.session() as session:
+            role = session.query(AuthZRole).filter(AuthZRole.name == "admin").filter(
+                AuthZRole.project_id == None).first()  # noqa: E711
+            return str(role.id)
+
+    def test_user_teams(self, wsgi, app):
+        admin_team = Team(None, [], {"id": 1, "name": "sandwich-admin"}, completed=True)
+        org_teams = [admin_team, Team(None, [], {"id": 2, "name": "sandwich-role1"}, completed=True)]
+
+        token_data, has_in_members = self.login(wsgi, [admin_team], org_teams)
+
+        assert token_data['roles']['global'] == [self.admin_role_id(app)]
+        # The org teams should not be checked one by one
+        has_in_members.assert_not_called()
+
+    def test_user_teams_other_org(self, wsgi):
+        # Same name as a mapped team but it is not one of the org's teams
+        other_team = Team(None, [], {"id": 3, "name": "sandwich-admin"}, completed=True)
+        org_teams = [Team(None, [], {"id": 1, "name": "sandwich-admin"}, completed=True)]
+
+        token_data, has_in_members = self.login(wsgi, [other_team], org_teams)
+
+        assert token_data['roles']['global'] == []
+        has_in_members.assert_not_called()
+
+    def test_user_teams_fallback(self, wsgi, app):
+        org_teams = [Team(None, [], {"id": 1, "name": "sandwich-admin"}, completed=True)]
+
+        token_data, has_in_members = self.login(wsgi, GithubException(403, 'no read:org'), org_teams)
+
+        assert token_data['roles']['global'] == [self.admin_role_id(app)]
+        has_in_members.assert_called_once()
+
+    def test_team_cache_per_user(self, wsgi, app):
+        admin_team = Team(None, [], {"id": 1, "name": "sandwich-admin"}, completed=True)
+
+        with settings_stub(GITHUB_TEAM_CACHE_TTL=60):
+            # The admin team is secret so the first user to log in can not see it
+            token_data, _ = self.login(wsgi, [], [], login='user1')
+            assert token_data['roles']['global'] == []
+
+            # Which does not hide it from a user that can
+            token_data, _ = self.login(wsgi, [admin_team], [admin_team], login='user2')
+            assert token_data['roles']['global'] == [self.admin_role_id(app)]
+
+            # Logging in again uses the cached teams, the org's teams are fetched with the user's client
+            token_data, has_in_members = self.login(wsgi, [], [admin_team], login='user2', resolution='org')
+            assert token_data['roles']['global'] == [self.admin_role_id(app)]
+            self.org.get_teams.assert_not_called()
+            self.org.get_team.assert_called_once_with(1)
+            has_in_members.assert_called_once()
+
+
+class TestGithubRetry(object):
+    def test_retry(self):
+        retry = GithubRetry(total=3, status_forcelist=[500, 502, 503, 504])
+
+        assert retry.is_retry('GET', 502) is True
+        # Secondary rate limits
+        assert bool(retry.is_retry('GET', 403, has_retry_after=True)) is True
+        assert bool(retry.is_retry('GET', 403)) is False
+        # Requests that are not idempotent are never retried
+        assert retry.is_retry('POST', 502) is False
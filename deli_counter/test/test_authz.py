@@ -1,15 +1,33 @@
 import uuid
 
+import arrow
+import cherrypy
+import pytest
+from simple_settings.utils import settings_stub
+
+from deli_counter.auth.enforcers.memory import MemoryPolicyEnforcer
+from deli_counter.auth.generation import PolicyGeneration
+from deli_counter.auth.manager import AuthManager
+from deli_counter.cache.backends.memory import MemoryCacheBackend
 from deli_counter.http.mounts.root.routes.v1.auth.z.validation_models.policies import ResponsePolicy
 from deli_counter.http.mounts.root.routes.v1.auth.z.validation_models.roles import ResponseRole
-from deli_counter.test.base import DeliTestCase, fake
-from ingredients_db.models.authz import AuthZRole
+from deli_counter.test.base import DeliTestCase, SharedMemoryCacheBackend, fake
+from ingredients_db.models.authz import AuthZRole, AuthZPolicy, AuthZRolePolicy
 
 
 class TestAuthZ(DeliTestCase):
     # TODO: check that routes have correct decorators
     # TODO: test model validations
 
+    def grant_policy(self, app, role, policy_name):
+        with app.database.session() as session:
+            policy = session.query(AuthZPolicy).filter(AuthZPolicy.name == policy_name).first()
+            role_policy = AuthZRolePolicy()
+            role_policy.role_id = role.id
+            role_policy.policy_id = policy.id
+            session.add(role_policy)
+            session.commit()
+
     def test_get_policy(self, wsgi, app):
         policy = self.create_policy(app, "role:test")
         admin_token = self.create_token(app, roles=["admin"])
@@ -95,3 +113,166 @@ class TestAuthZ(DeliTestCase):
         with app.database.session() as session:
             role = session.query(AuthZRole).filter(AuthZRole.id == role.id).first()
             assert role is None
+
+    def test_delete_role_revokes_policies(self, wsgi, app):
+        admin_token = self.create_token(app, roles=["admin"])
+        role = self.create_role(app)
+
+        with app.database.session() as session:
+            policy = session.query(AuthZPolicy).filter(AuthZPolicy.name == "regions:list").first()
+            role_policy = AuthZRolePolicy()
+            role_policy.role_id = role.id
+            role_policy.policy_id = policy.id
+            session.add(role_policy)
+            session.commit()
+
+        role_token = self.create_token(app, roles=[role.name])
+
+        # Role has the policy
+        self.get(wsgi, "/v1/regions", token=role_token)
+
+        self.delete(wsgi, "/v1/auth/z/roles/%s" % role.id, token=admin_token, status=204)
+
+        # Role is gone so the token should not have the policy anymore
+        self.get(wsgi, "/v1/regions", token=role_token, status=403)
+
+    def test_enforce_embedded_policies(self, app):
+        auth_manager = AuthManager(MemoryCacheBackend())
+
+        def no_db_session():
+            raise AssertionError("Database should not be used for current embedded policies")
+
+        token = {
+            'roles': {
+                'global': [],
+                'project': []
+            },
+            'policies': {
+                'global': frozenset(["regions:list"]),
+                'project': frozenset(["instances:list"])
+            },
+            'policy_generation': auth_manager.policy_generation.current(),
+            'policies_issued_at': arrow.now().float_timestamp,
+            'policies_max_age': 300
+        }
+
+        auth_manager.enforce_policy("regions:list", no_db_session, token, None)
+        with pytest.raises(cherrypy.HTTPError):
+            auth_manager.enforce_policy("regions:create", no_db_session, token, None)
+        # Project policies only apply to project scoped tokens
+        with pytest.raises(cherrypy.HTTPError):
+            auth_manager.enforce_policy("instances:list", no_db_session, token, None)
+
+        # Once the generation changes the token's roles are checked instead
+        auth_manager.invalidate_roles([])
+        with pytest.raises(cherrypy.HTTPError):
+            auth_manager.enforce_policy("regions:list", app.database.session, token, None)
+
+    def test_embedded_policies_max_age(self, app):
+        auth_manager = AuthManager(MemoryCacheBackend())
+        token = {
+            'roles': {
+                'global': [],
+                'project': []
+            },
+            'policies': {
+                'global': frozenset(["regions:list"]),
+                'project': frozenset()
+            },
+            'policy_generation': auth_manager.policy_generation.current(),
+            'policies_issued_at': arrow.now().float_timestamp - 301,
+            'policies_max_age': 300
+        }
+
+        # Too old to be trusted even though the generation did not change so the token's roles are checked
+        with pytest.raises(cherrypy.HTTPError):
+            auth_manager.enforce_policy("regions:list", app.database.session, token, None)
+
+        token['policies_issued_at'] = arrow.now().float_timestamp
+        auth_manager.enforce_policy("regions:list", app.database.session, token, None)
+
+    def test_embed_policies_needs_shared_cache(self, app):
+        with settings_stub(AUTH_TOKEN_EMBED_POLICIES=True):
+            # Other processes would keep trusting policies revoked in this one
+            with pytest.raises(ValueError):
+                AuthManager(MemoryCacheBackend())
+            AuthManager(SharedMemoryCacheBackend())
+
+    def test_policy_generation(self, app):
+        cache_backend = MemoryCacheBackend()
+        policy_generation = PolicyGeneration(cache_backend)
+        other_policy_generation = PolicyGeneration(cache_backend)
+
+        # Whichever starts the generation first, every process agrees on it and it does not expire
+        generation = policy_generation.current()
+        assert other_policy_generation.current() == generation
+        assert policy_generation.current() == generation
+
+        # Only changes to roles or their policies replace it
+        new_generation = other_policy_generation.bump()
+        assert new_generation != generation
+        assert policy_generation.current() == new_generation
+
+    def test_memory_enforcer(self, app):
+        enforcer = MemoryPolicyEnforcer(SharedMemoryCacheBackend())
+        role = self.create_role(app)
+        self.grant_policy(app, role, "regions:list")
+
+        assert enforcer.allowed(app.database.session, "regions:list", [role.id]) is True
+        assert enforcer.allowed(app.database.session, "regions:create", [role.id]) is False
+        assert enforcer.allowed(app.database.session, "regions:list", []) is False
+        assert enforcer.allowed(app.database.session, fake.pystr(min_chars=3), [role.id]) is False
+
+        # Roles created after the policies were loaded are loaded when they are first checked
+        other_role = self.create_role(app)
+        self.grant_policy(app, other_role, "regions:create")
+        assert enforcer.allowed(app.database.session, "regions:create", [role.id, other_role.id]) is True
+
+    def test_memory_enforcer_needs_shared_cache(self, app):
+        with pytest.raises(ValueError):
+            MemoryPolicyEnforcer(MemoryCacheBackend())
+
+    def test_memory_enforcer_generation(self, app):
+        cache_backend = SharedMemoryCacheBackend()
+        enforcer = MemoryPolicyEnforcer(cache_backend)
+        role = self.create_role(app)
+        assert enforcer.allowed(app.database.session, "regions:list", [role.id]) is False
+
+        # Still answered from memory
+        self.grant_policy(app, role, "regions:list")
+        assert enforcer.allowed(app.database.session, "regions:list", [role.id]) is False
+
+        # Another process changed a role
+        PolicyGeneration(cache_backend).bump()
+        assert enforcer.allowed(app.database.session, "regions:list", [role.id]) is True
+
+    def test_memory_enforcer_delete_role(self, app):
+        with settings_stub(AUTH_POLICY_ENFORCER='deli_counter.auth.enforcers.memory:MemoryPolicyEnforcer'):
+            auth_manager = AuthManager(SharedMemoryCacheBackend())
+        enforcer = auth_manager.policy_enforcer
+        assert isinstance(enforcer, MemoryPolicyEnforcer)
+        role = self.create_role(app)
+        self.grant_policy(app, role, "regions:list")
+        assert enforcer.allowed(app.database.session, "regions:list", [role.id]) is True
+
+        with app.database.session() as session:
+            session.query(AuthZRolePolicy).filter(AuthZRolePolicy.role_id == role.id).delete()
+            session.query(AuthZRole).filter(AuthZRole.id == role.id).delete()
+            session.commit()
+        auth_manager.invalidate_roles([role.id])
+
+        assert enforcer.allowed(app.database.session, "regions:list", [role.id]) is False
+
+    def test_role_directory(self, app):
+        role_directory = AuthManager(MemoryCacheBackend()).role_directory
+        role = self.create_role(app)
+        missing_name = fake.pystr(min_chars=3)
+
+        with app.database.session() as session:
+            assert role_directory.global_role_ids(session, [missing_name, role.name]) == [role.id]
+            assert role_directory.role_names(session, [uuid.uuid4(), role.id]) == [role.name]
+
+        # Resolved roles are served from memory
+        with app.database.session() as session:
+            assert role_directory.global_role_ids(session, [role.name]) == [role.id]
+            assert role_directory.role_names(session, [str(role.id)]) == [role.name]
@@ -0,0 +1,90 @@
+import configparser
+import os
+import pickle
+
+import deli_counter
+from deli_counter.cache.backends.memory import MemoryCacheBackend
+
+
+def github_teams(count):
+    # The shape of the team listing the GitHub auth driver caches
+    teams = []
+    for team_id in range(count):
+        url = "https://api.github.com/teams/%s" % team_id
+        teams.append({
+            "id": team_id,
+            "node_id": "MDQ6VGVhbTE%08d" % team_id,
+            "url": url,
+            "html_url": "https://github.com/orgs/example/teams/team-%s" % team_id,
+            "name": "team-%s" % team_id,
+            "slug": "team-%s" % team_id,
+            "description": "Members of team %s" % team_id,
+            "privacy": "closed",
+            "permission": "pull",
+            "members_url": url + "/members{/member}",
+            "repositories_url": url + "/repos",
+            "parent": None,
+        })
+    return teams
+
+
+class TestMemoryCacheBackend(object):
+    def test_get_set_delete(self):
+        cache = MemoryCacheBackend()
+        cache.set("key", "value", 60)
+        assert cache.get("key") == "value"
+
+        cache.delete("key")
+        assert cache.get("key") is None
+
+    def test_expired(self):
+        cache = MemoryCacheBackend()
+        cache.set("key", "value", 60)
+        cache._items["key"] = ("value", 0)
+
+        assert cache.get("key") is None
+
+    def test_max_items(self):
+        cache = MemoryCacheBackend(max_items=2)
+        cache.set("one", 1, 60)
+        cache.set("two", 2, 60)
+        cache.set("three", 3, 60)
+
+        assert cache.get("one") is None
+        assert cache.get("two") == 2
+        assert cache.get("three") == 3
+
+    def test_large_value(self):
+        cache = MemoryCacheBackend()
+        teams = github_teams(1000)
+        cache.set("teams", teams, 60)
+
+        assert cache.get("teams") == teams
+
+    def test_add(self):
+        cache = MemoryCacheBackend()
+        assert cache.add("key", "value", 60) is True
+        # Only set when there is no value yet
+        assert cache.add("key", "other", 60) is False
+        assert cache.get("key") == "value"
+
+        cache._items["key"] = ("value", 0)
+        assert cache.add("key", "other", 60) is True
+        assert cache.get("key") == "other"
+
+
+class TestUWSGICacheConfig(object):
+    def max_value_size(self):
+        config = configparser.ConfigParser(strict=False, interpolation=None)
+        config.read(os.path.join(os.path.dirname(deli_counter.__file__), os.pardir, 'wsgi.ini'))
+        options = dict(option.split('=', 1) for option in config['uwsgi']['cache2'].split(','))
+
+        blocksize = int(options.get('blocksize', 65536))
+        if options.get('bitmap') == '1':
+            # A value can take every block
+            return blocksize * int(options.get('blocks', options['items']))
+        return blocksize
+
+    def test_large_value(self):
+        # The uWSGI backend pickles values, the cache has to fit a big organization's team listing
+        assert len(pickle.dumps(github_teams(1000))) < self.max_value_size()
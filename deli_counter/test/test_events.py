@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+
+from simple_settings.utils import settings_stub
+from sqlalchemy import select
+
+from deli_counter.db.events import EventHub
+from deli_counter.db.tables import events
+from deli_counter.test.base import DeliTestCase
+from ingredients_db.models.images import Image, ImageState
+from ingredients_db.models.instance import Instance, InstanceState
+
+
+class TestEvents(DeliTestCase):
+    def watch(self, wsgi, token, resource='instances', **kwargs):
+        resp = self.get(wsgi, "/v1/%s/events" % resource, token=token, **kwargs)
+        assert resp.headers['Content-Type'].startswith('text/event-stream')
+
+        stream_events = []
+        for block in resp.text.split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+            if 'event' in fields:
+                stream_events.append({'id': int(fields['id']), 'event': fields['event'],
+                                      'data': json.loads(fields['data'])})
+        return stream_events
+
+    def set_state(self, app, cls, resource_id, state, delay=0):
+        time.sleep(delay)
+        with app.database.session() as session:
+            resource = session.query(cls).filter(cls.id == resource_id).one()
+            resource.state = state
+            session.commit()
+
+    def event_ids(self, app):
+        with app.database.session() as session:
+            return [row.id for row in session.execute(select([events]).order_by(events.c.id))]
+
+    def test_watch(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        image = self.create_image(app, project=project, region=region)
+        instance = self.create_instance(app, project=project, region=region, image=image)
+        other_instance = self.create_instance(app)
+
+        def change():
+            self.set_state(app, Instance, instance.id, InstanceState.STOPPING, delay=0.5)
+            self.set_state(app, Instance, other_instance.id, InstanceState.STOPPING)
+            self.set_state(app, Image, image.id, ImageState.DELETING)
+            # Updates that do not change the state are not events
+            self.set_state(app, Instance, instance.id, InstanceState.STOPPING)
+
+        changer = threading.Thread(target=change)
+        changer.start()
+        stream_events = self.watch(wsgi, token)
+        changer.join()
+
+        assert [(event['event'], event['data']['resource_id'], event['data']['state'])
+                for event in stream_events] == [('state', str(instance.id), InstanceState.STOPPING.value)]
+
+    def test_resume(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        instance = self.create_instance(app, project=project)
+        self.set_state(app, Instance, instance.id, InstanceState.STOPPING)
+        self.set_state(app, Instance, instance.id, InstanceState.STOPPED)
+        *_, stopping_id, stopped_id = self.event_ids(app)
+
+        stream_events = self.watch(wsgi, token, headers={'Last-Event-ID': str(stopping_id)})
+        assert [(event['id'], event['data']['state']) for event in stream_events] == [
+            (stopped_id, InstanceState.STOPPED.value)]
+
+        stream_events = self.watch(wsgi, token, params={'last_event_id': stopping_id - 1})
+        assert [event['id'] for event in stream_events] == [stopping_id, stopped_id]
+
+        self.get(wsgi, "/v1/instances/events", token=token, headers={'Last-Event-ID': 'latest'}, status=400)
+
+    def test_reset(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        instance = self.create_instance(app, project=project)
+        self.set_state(app, Instance, instance.id, InstanceState.STOPPING)
+        self.set_state(app, Instance, instance.id, InstanceState.STOPPED)
+        *_, stopping_id, stopped_id = self.event_ids(app)
+
+        with app.database.session() as session:
+            session.execute(events.delete().where(events.c.id <= stopping_id))
+            session.commit()
+
+        # The events after the one the client saw last were pruned
+        stream_events = self.watch(wsgi, token, headers={'Last-Event-ID': str(stopping_id - 1)})
+        assert [(event['id'], event['event']) for event in stream_events] == [(stopped_id, 'reset')]
+
+    def test_prune(self, app):
+        instance = self.create_instance(app)
+        self.set_state(app, Instance, instance.id, InstanceState.STOPPING)
+        self.set_state(app, Instance, instance.id, InstanceState.STOPPED)
+        newest_id = self.event_ids(app)[-1]
+
+        with settings_stub(EVENTS_RETENTION=3600):
+            EventHub(app.database.session, None).prune()
+        assert len(self.event_ids(app)) > 1
+
+        with settings_stub(EVENTS_RETENTION=0):
+            EventHub(app.database.session, None).prune()
+        # The newest is kept so streams resuming from pruned events can tell
+        assert self.event_ids(app) == [newest_id]
@@ -1,9 +1,13 @@
+import json
+import tracemalloc
 import uuid
 from unittest.mock import patch
 
+import webtest
+
 from deli_counter.http.mounts.root.routes.v1.validation_models.images import ResponseImage
 from deli_counter.test.base import DeliTestCase, fake
-from ingredients_db.models.images import Image, ImageState
+from ingredients_db.models.images import Image, ImageState, ImageVisibility
 
 
 class TestImage(DeliTestCase):
@@ -87,6 +91,87 @@ class TestImage(DeliTestCase):
             image_model = ResponseImage(image_json)
             assert image_json == image_model.to_primitive()
 
+    def export(self, wsgi, uri, token):
+        """
+        Stream an export straight from the wsgi app without keeping the body
+
+        Returns the status, number of lines and the peak memory allocated while streaming
+        """
+        request = webtest.TestRequest.blank(uri, headers={'Authorization': 'Bearer ' + token})
+        statuses = []
+        lines = 0
+
+        tracemalloc.start()
+        try:
+            app_iter = wsgi.app(request.environ, lambda status, headers, exc_info=None: statuses.append(status))
+            try:
+                for chunk in app_iter:
+                    lines += chunk.count(b"\n")
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return statuses[0], lines, peak
+
+    def seed_images(self, app, project, region, count):
+        with app.database.session() as session:
+            session.bulk_insert_mappings(Image, [{
+                'name': fake.pystr(min_chars=3),
+                'file_name': fake.pystr(min_chars=3),
+                'project_id': project.id,
+                'region_id': region.id,
+                'visibility': ImageVisibility.PRIVATE,
+                'state': ImageState.CREATED
+            } for _ in range(count)])
+            session.commit()
+
+    def test_export(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        other_region = self.create_region(app)
+        images = [self.create_image(app, project, region=region) for _ in range(3)]
+        self.create_image(app, project, region=other_region)
+
+        # Test invalid
+        self.get(wsgi, "/v1/images/export", token=token, params={"region_id": str(uuid.uuid4())}, status=404)
+        self.get(wsgi, "/v1/images/export", token=token, params={"limit": 1}, status=400)
+
+        # Test export
+        resp = self.get(wsgi, "/v1/images/export", token=token, params={"region_id": str(region.id)})
+        assert resp.content_type == 'application/x-ndjson'
+        exported = [json.loads(line) for line in resp.body.decode().splitlines()]
+        assert exported == [ResponseImage.from_database(image).to_primitive() for image in images]
+
+        # Test fields
+        resp = self.get(wsgi, "/v1/images/export", token=token, params={"region_id": str(region.id), "fields": "id"})
+        exported = [json.loads(line) for line in resp.body.decode().splitlines()]
+        assert exported == [{'id': str(image.id)} for image in images]
+
+    def test_export_memory(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        uri = "/v1/images/export?region_id=%s" % region.id
+
+        self.seed_images(app, project, region, 500)
+        # Warm up so caches filled by the first request are not counted
+        self.export(wsgi, uri, token)
+        status, lines, small_peak = self.export(wsgi, uri, token)
+        assert status.startswith('200')
+        assert lines == 500
+
+        self.seed_images(app, project, region, 4500)
+        status, lines, large_peak = self.export(wsgi, uri, token)
+        assert status.startswith('200')
+        assert lines == 5000
+
+        # Ten times the images should not need much more memory
+        assert large_peak < small_peak * 2
+
     def test_delete(self, wsgi, app):
         project = self.create_project(app)
         token = self.create_token(app, project=project)
@@ -1,9 +1,17 @@
+import json
 import uuid
 from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
 
+from simple_settings.utils import settings_stub
+from sqlalchemy import select
+
+from deli_counter.db.tables import task_outbox
 from deli_counter.http.mounts.root.routes.v1.validation_models.instances import ResponseInstance
 from deli_counter.test.base import DeliTestCase, fake
 from ingredients_db.models.instance import Instance, InstanceState
+from ingredients_db.models.keypair import Keypair
+from ingredients_tasks.tasks.instance import delete_instance
 
 
 class TestInstance(DeliTestCase):
@@ -38,6 +46,92 @@ class TestInstance(DeliTestCase):
             # Check that it has a current task
             assert image.current_task_id is not None
 
+    def test_create_validation(self, wsgi, app):
+        project = self.create_project(app)
+        region = self.create_region(app)
+        token = self.create_token(app, project=project)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project=project, region=region)
+        instance = self.create_instance(app, project=project, region=region, image=image, network=network)
+
+        instance_data = {
+            "name": fake.pystr(min_chars=3),
+            "image_id": str(image.id),
+            "network_id": str(network.id),
+            "region_id": str(region.id)
+        }
+
+        # Test duplicate name
+        resp = self.post(wsgi, "/v1/instances", dict(instance_data, name=instance.name), token=token, status=409)
+        assert resp.json['message'] == 'An instance already exists with the requested name.'
+
+        # Test duplicate name takes priority over an invalid region
+        self.post(wsgi, "/v1/instances", dict(instance_data, name=instance.name, region_id=str(uuid.uuid4())),
+                  token=token, status=409)
+
+        # Test invalid region
+        resp = self.post(wsgi, "/v1/instances", dict(instance_data, region_id=str(uuid.uuid4())), token=token,
+                         status=404)
+        assert resp.json['message'] == 'A region with the requested id does not exist.'
+
+        # Test invalid image
+        resp = self.post(wsgi, "/v1/instances", dict(instance_data, image_id=str(uuid.uuid4())), token=token,
+                         status=404)
+        assert resp.json['message'] == 'An image with the requested id does not exist.'
+
+        # Test invalid network
+        resp = self.post(wsgi, "/v1/instances", dict(instance_data, network_id=str(uuid.uuid4())), token=token,
+                         status=404)
+        assert resp.json['message'] == 'A network with the requested id does not exist.'
+
+        # Test invalid zone
+        resp = self.post(wsgi, "/v1/instances", dict(instance_data, zone_id=str(uuid.uuid4())), token=token,
+                         status=404)
+        assert resp.json['message'] == 'A zone with the requested id does not exist.'
+
+        # Test invalid keypair
+        self.post(wsgi, "/v1/instances", dict(instance_data, keypair_ids=[str(uuid.uuid4())]), token=token,
+                  status=404)
+
+    def test_create_batch(self, wsgi, app):
+        project = self.create_project(app)
+        region = self.create_region(app)
+        token = self.create_token(app, project=project)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project=project, region=region)
+        prefix = fake.pystr(min_chars=3)
+        existing = self.create_instance(app, project=project, region=region, image=image, network=network,
+                                        name=prefix + "-2")
+
+        batch_data = {
+            "name_template": prefix + "-{index}",
+            "count": 3,
+            "image_id": str(image.id),
+            "network_id": str(network.id),
+            "region_id": str(region.id)
+        }
+
+        with patch('ingredients_tasks.tasks.instance.create_instance.apply_async') as apply_async_mock:
+            apply_async_mock.return_value = None
+            resp = self.post(wsgi, "/v1/instances/batch", batch_data, token=token)
+
+        results = resp.json['instances']
+        assert [result['name'] for result in results] == [prefix + "-1", prefix + "-2", prefix + "-3"]
+        assert [result['created'] for result in results] == [True, False, True]
+        assert results[1]['error'] == 'An instance already exists with the requested name.'
+
+        with app.database.session() as session:
+            for result in [results[0], results[2]]:
+                resp_model = ResponseInstance(result['instance'])
+                instance = session.query(Instance).filter(Instance.id == resp_model.id).first()
+                assert instance is not None
+                assert instance.current_task_id is not None
+            assert session.query(Instance).filter(Instance.project_id == project.id).filter(
+                Instance.name == prefix + "-2").one().id == existing.id
+
+        # Test template without an index
+        self.post(wsgi, "/v1/instances/batch", dict(batch_data, name_template=prefix), token=token, status=400)
+
     def test_get(self, wsgi, app):
         project = self.create_project(app)
         token = self.create_token(app, project=project)
@@ -68,6 +162,199 @@ class TestInstance(DeliTestCase):
             instance_model = ResponseInstance(instance_json)
             assert instance_json == instance_model.to_primitive()
 
+    def test_list_keypairs(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project, region=region)
+        instances = [self.create_instance(app, project, region=region, image=image, network=network)
+                     for _ in range(2)]
+
+        with app.database.session() as session:
+            keypair = Keypair()
+            keypair.name = fake.pystr(min_chars=3)
+            keypair.public_key = 'ssh-rsa ' + fake.pystr(min_chars=32)
+            keypair.project_id = project.id
+            session.add(keypair)
+            for instance in instances:
+                instance = session.merge(instance, load=False)
+                instance.keypairs.append(keypair)
+            session.commit()
+            keypair_id = keypair.id
+
+        # Lazy loads raise in tests so this fails if the keypairs are not eagerly loaded
+        resp = self.get(wsgi, "/v1/instances", token=token)
+        assert len(resp.json['instances']) == 2
+        for instance_json in resp.json['instances']:
+            assert instance_json['keypair_ids'] == [str(keypair_id)]
+
+    def test_list_tags(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project, region=region)
+        prod_web = self.create_instance(app, project, region=region, image=image, network=network)
+        prod_db = self.create_instance(app, project, region=region, image=image, network=network)
+        dev_web = self.create_instance(app, project, region=region, image=image, network=network)
+        untagged = self.create_instance(app, project, region=region, image=image, network=network)
+        with app.database.session() as session:
+            for instance, tags in [(prod_web, {"env": "prod", "web": ""}), (prod_db, {"env": "prod"}),
+                                   (dev_web, {"env": "dev", "web": ""})]:
+                session.query(Instance).filter(Instance.id == instance.id).update({Instance.tags: tags},
+                                                                                  synchronize_session=False)
+            session.commit()
+
+        def list_ids(tags, **params):
+            resp = self.get(wsgi, "/v1/instances", token=token, params=dict(params, tags=tags))
+            return {instance_json['id'] for instance_json in resp.json['instances']}
+
+        # Test equality
+        assert list_ids("env:prod") == {str(prod_web.id), str(prod_db.id)}
+        # Test existence
+        assert list_ids("web") == {str(prod_web.id), str(dev_web.id)}
+        # Test multiple tags must all match
+        assert list_ids("env:prod,web") == {str(prod_web.id)}
+        assert list_ids("env:prod,env:dev") == set()
+        assert str(untagged.id) not in list_ids("env")
+
+        # Test filters work with the marker
+        resp = self.get(wsgi, "/v1/instances", token=token, params={"tags": "env:prod", "limit": 1})
+        assert resp.json['instances_links'][0]['rel'] == 'next'
+        marker = resp.json['instances'][0]['id']
+        assert list_ids("env:prod", marker=marker) == {str(prod_web.id), str(prod_db.id)} - {marker}
+
+        # Test missing key
+        self.get(wsgi, "/v1/instances", token=token, params={"tags": ":prod"}, status=400)
+
+    def test_list_pagination(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project, region=region)
+        instances = [self.create_instance(app, project, region=region, image=image, network=network,
+                                          name="instance-%s" % index) for index in range(3)]
+
+        def walk(sort):
+            ids = []
+            params = {"limit": 2, "sort": sort}
+            while True:
+                resp = self.get(wsgi, "/v1/instances", token=token, params=params)
+                ids.extend(instance_json['id'] for instance_json in resp.json['instances'])
+                if len(resp.json['instances_links']) == 0:
+                    return ids
+                params = parse_qs(urlparse(resp.json['instances_links'][0]['href']).query)
+
+        ids = [str(instance.id) for instance in instances]
+        assert walk("-created_at") == ids[::-1]
+        assert walk("created_at") == ids
+        assert walk("name") == ids
+        assert walk("-name") == ids[::-1]
+
+        resp = self.get(wsgi, "/v1/instances", token=token, params={"limit": 1})
+        marker = parse_qs(urlparse(resp.json['instances_links'][0]['href']).query)['marker'][0]
+
+        # Test the marker is for a different sort
+        self.get(wsgi, "/v1/instances", token=token, params={"marker": marker, "sort": "name"}, status=400)
+
+        # Test a tampered marker
+        self.get(wsgi, "/v1/instances", token=token, params={"marker": "A" + marker[1:]}, status=400)
+
+        # Test old id markers still work
+        resp = self.get(wsgi, "/v1/instances", token=token, params={"marker": ids[2]})
+        assert [instance_json['id'] for instance_json in resp.json['instances']] == ids[1::-1]
+
+    def test_list_total(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project, region=region)
+        for _ in range(3):
+            self.create_instance(app, project, region=region, image=image, network=network)
+
+        # Test the total is only given when asked for
+        resp = self.get(wsgi, "/v1/instances", token=token, params={"limit": 1})
+        assert 'instances_total' not in resp.json
+
+        # Test counting
+        resp = self.get(wsgi, "/v1/instances", token=token, params={"limit": 1, "total": True})
+        assert resp.json['instances_total'] == {'count': 3, 'exact': True}
+
+        # Test everything on the first page
+        resp = self.get(wsgi, "/v1/instances", token=token, params={"total": True})
+        assert resp.json['instances_total'] == {'count': 3, 'exact': True}
+
+        # Test estimating
+        with settings_stub(PAGINATION_TOTAL_EXACT_THRESHOLD=-1):
+            resp = self.get(wsgi, "/v1/instances", token=token, params={"limit": 1, "total": True})
+        assert resp.json['instances_total']['exact'] is False
+        assert resp.json['instances_total']['count'] >= 0
+
+    def test_list_fields(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project, region=region)
+        instance = self.create_instance(app, project, region=region, image=image, network=network)
+        self.create_instance(app, project, region=region, image=image, network=network)
+
+        # Test invalid
+        self.get(wsgi, "/v1/instances", token=token, params={"fields": "id,invalid"}, status=400)
+        self.get(wsgi, "/v1/instances/%s" % instance.id, token=token, params={"fields": "invalid"}, status=400)
+
+        # Test only the requested fields are returned
+        resp = self.get(wsgi, "/v1/instances", token=token, params={"fields": "id,name,state", "limit": 1})
+        assert len(resp.json['instances']) == 1
+        assert set(resp.json['instances'][0].keys()) == {'id', 'name', 'state'}
+        assert 'fields=id%2Cname%2Cstate' in resp.json['instances_links'][0]['href']
+
+        # Test relationships
+        resp = self.get(wsgi, "/v1/instances", token=token, params={"fields": "keypair_ids"})
+        assert resp.json['instances'][0] == {'keypair_ids': []}
+
+        resp = self.get(wsgi, "/v1/instances/%s" % instance.id, token=token, params={"fields": "id,name"})
+        assert resp.json == {'id': str(instance.id), 'name': instance.name}
+
+    def test_export(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project, region=region)
+        tagged = self.create_instance(app, project, region=region, image=image, network=network)
+        self.create_instance(app, project, region=region, image=image, network=network)
+
+        with app.database.session() as session:
+            keypair = Keypair()
+            keypair.name = fake.pystr(min_chars=3)
+            keypair.public_key = 'ssh-rsa ' + fake.pystr(min_chars=32)
+            keypair.project_id = project.id
+            session.add(keypair)
+            instance = session.merge(tagged, load=False)
+            instance.tags = {"env": "prod"}
+            instance.keypairs.append(keypair)
+            session.commit()
+            keypair_id = keypair.id
+
+        # Test invalid
+        self.get(wsgi, "/v1/instances/export", token=token, params={"tags": ":prod"}, status=400)
+
+        # Test all
+        resp = self.get(wsgi, "/v1/instances/export", token=token)
+        assert resp.content_type == 'application/x-ndjson'
+        assert len(resp.body.decode().splitlines()) == 2
+
+        # Test filters are the same as list
+        resp = self.get(wsgi, "/v1/instances/export", token=token, params={"tags": "env:prod"})
+        exported = [json.loads(line) for line in resp.body.decode().splitlines()]
+        assert len(exported) == 1
+        assert exported[0]['id'] == str(tagged.id)
+        assert exported[0]['keypair_ids'] == [str(keypair_id)]
+
     def test_delete(self, wsgi, app):
         project = self.create_project(app)
         token = self.create_token(app, project=project)
@@ -87,3 +374,64 @@ class TestInstance(DeliTestCase):
         with app.database.session() as session:
             image = session.query(Instance).filter(Instance.id == instance.id).first()
             assert image.state == InstanceState.DELETING
+
+    def test_batch_stop(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project, region=region)
+        active = self.create_instance(app, project, region=region, image=image, network=network)
+        stopped = self.create_instance(app, project, region=region, image=image, network=network)
+        with app.database.session() as session:
+            session.query(Instance).filter(Instance.id == stopped.id).update({Instance.state: InstanceState.STOPPED})
+            session.commit()
+        missing_id = uuid.uuid4()
+
+        with patch('ingredients_tasks.tasks.instance.stop_instance.apply_async') as apply_async_mock:
+            apply_async_mock.return_value = None
+            resp = self.put(wsgi, "/v1/instances/batch/action/stop",
+                            {"instance_ids": [str(active.id), str(stopped.id), str(missing_id)]}, token=token,
+                            status=202)
+
+        results = {result['instance_id']: result for result in resp.json['instances']}
+        assert results[str(active.id)]['accepted'] is True
+        assert results[str(stopped.id)]['accepted'] is False
+        assert results[str(missing_id)]['accepted'] is False
+
+        with app.database.session() as session:
+            instance = session.query(Instance).filter(Instance.id == active.id).first()
+            assert instance.state == InstanceState.STOPPING
+            assert instance.current_task_id is not None
+            instance = session.query(Instance).filter(Instance.id == stopped.id).first()
+            assert instance.state == InstanceState.STOPPED
+
+        # Test selecting by both ids and tags
+        self.put(wsgi, "/v1/instances/batch/action/stop", {"instance_ids": [str(active.id)], "tags": {"a": "b"}},
+                 token=token, status=400)
+
+    def test_batch_delete(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project, region=region)
+        instance = self.create_instance(app, project, region=region, image=image, network=network)
+        tag = fake.pystr(min_chars=3)
+        with app.database.session() as session:
+            session.query(Instance).filter(Instance.id == instance.id).update({Instance.tags: {"batch": tag}},
+                                                                              synchronize_session=False)
+            session.commit()
+
+        with patch('ingredients_tasks.tasks.instance.delete_instance.apply_async') as apply_async_mock:
+            apply_async_mock.return_value = None
+            resp = self.post(wsgi, "/v1/instances/batch/delete", {"tags": {"batch": tag}}, token=token, status=202)
+
+        assert resp.json['instances'] == [{'instance_id': str(instance.id), 'accepted': True, 'error': None}]
+        with app.database.session() as session:
+            instance = session.query(Instance).filter(Instance.id == instance.id).first()
+            assert instance.state == InstanceState.DELETING
+            # The task message is waiting in the outbox
+            messages = session.execute(select([task_outbox]).where(
+                task_outbox.c.body.contains(str(instance.id)))).fetchall()
+            assert [message.task_name for message in messages] == [delete_instance.name]
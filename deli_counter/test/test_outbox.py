@@ -0,0 +1,119 @@
+from unittest.mock import patch
+
+import pytest
+from kombu.utils import json as kombu_json
+from sqlalchemy import event, func, select
+
+from deli_counter.db.tables import task_outbox
+from deli_counter.tasks.outbox import OutboxRelay, create_task
+from deli_counter.test.base import DeliTestCase
+from ingredients_tasks.tasks.instance import delete_instance
+
+
+class TestOutbox(DeliTestCase):
+    def outbox_count(self, app):
+        with app.database.session() as session:
+            return session.execute(select([func.count()]).select_from(task_outbox)).scalar()
+
+    def delete_instances(self, wsgi, app, count):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        region = self.create_region(app)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project, region=region)
+        instances = [self.create_instance(app, project, region=region, image=image, network=network)
+                     for _ in range(count)]
+
+        with patch('ingredients_tasks.tasks.instance.delete_instance.apply_async') as apply_async_mock:
+            for instance in instances:
+                self.delete(wsgi, "/v1/instances/%s" % instance.id, token=token, status=204)
+            # Nothing is published while handling the request
+            apply_async_mock.assert_not_called()
+
+        return instances
+
+    def test_create_task(self, wsgi, app):
+        instance, = self.delete_instances(wsgi, app, 1)
+
+        with app.database.session() as session:
+            message = session.execute(select([task_outbox])).fetchone()
+
+        assert message.task_name == delete_instance.name
+        body = kombu_json.loads(message.body)
+        assert body['kwargs']['instance_id'] == str(instance.id)
+        assert body['kwargs']['delete_backing'] is True
+
+    def test_create_task_rollback(self, app):
+        instance = self.create_instance(app)
+
+        with app.database.session() as session:
+            instance = session.merge(instance, load=False)
+            create_task(session, instance, delete_instance, instance_id=instance.id)
+            session.rollback()
+
+        assert self.outbox_count(app) == 0
+
+    def test_create_task_batch(self, app):
+        instances = [self.create_instance(app) for _ in range(3)]
+
+        inserts = []
+
+        def count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO %s" % task_outbox.name):
+                inserts.append(statement)
+
+        event.listen(app.database.engine, 'before_cursor_execute', count_inserts)
+        try:
+            with app.database.session() as session:
+                for instance in instances:
+                    instance = session.merge(instance, load=False)
+                    create_task(session, instance, delete_instance, instance_id=instance.id)
+                session.commit()
+        finally:
+            event.remove(app.database.engine, 'before_cursor_execute', count_inserts)
+
+        # Every message of the transaction is written by one statement
+        assert len(inserts) == 1
+        assert self.outbox_count(app) == 3
+
+    def test_relay(self, wsgi, app):
+        self.delete_instances(wsgi, app, 3)
+        published = []
+        relay = OutboxRelay(app.database.session, publish=published.extend)
+
+        # Batches are published oldest first
+        assert relay.relay_batch() == 2
+        assert relay.relay_batch() == 1
+        assert relay.relay_batch() == 0
+
+        assert [message.task_name for message in published] == [delete_instance.name] * 3
+        assert [message.id for message in published] == sorted(message.id for message in published)
+        assert self.outbox_count(app) == 0
+
+    def test_relay_skip_locked(self, wsgi, app):
+        self.delete_instances(wsgi, app, 2)
+        published = []
+        relay = OutboxRelay(app.database.session, publish=published.extend)
+
+        with app.database.session() as session:
+            # Another relay is publishing the oldest message
+            locked = session.execute(
+                select([task_outbox]).order_by(task_outbox.c.id).limit(1).with_for_update()).fetchone()
+
+            assert relay.relay_batch() == 1
+            assert published[0].id != locked.id
+
+        assert self.outbox_count(app) == 1
+
+    def test_relay_publish_error(self, wsgi, app):
+        self.delete_instances(wsgi, app, 1)
+
+        def publish(messages):
+            raise ConnectionError()
+
+        relay = OutboxRelay(app.database.session, publish=publish)
+        with pytest.raises(ConnectionError):
+            relay.relay_batch()
+
+        # The message is kept to be published again
+        assert self.outbox_count(app) == 1
@@ -0,0 +1,104 @@
+import uuid
+from collections import namedtuple
+from unittest.mock import patch
+
+import pytest
+from amqp.exceptions import ConnectionError as AMQPConnectionError
+from celery import Celery
+from kombu import Connection
+from kombu.transport import memory
+from kombu.utils import json as kombu_json
+
+from deli_counter.tasks.publisher import Publisher, PublisherBusy
+from deli_counter.test.base import DeliTestCase
+
+Message = namedtuple('Message', ['id', 'task_name', 'body'])
+
+
+class TestPublisher(DeliTestCase):
+    @pytest.fixture
+    def celery_app(self, app):
+        # The in-memory transport stands in for rabbitmq
+        celery_app = Celery('deli_counter_test', broker='memory://', set_as_current=False)
+        celery_app.conf.task_default_queue = 'deli_counter_test_' + uuid.uuid4().hex
+
+        @celery_app.task(name='deli_counter.test.add')
+        def add(x, y):
+            return x + y
+
+        return celery_app
+
+    def message(self, message_id, task_name='deli_counter.test.add', **kwargs):
+        body = kombu_json.dumps({'args': None, 'kwargs': kwargs, 'options': {'task_id': str(uuid.uuid4())}})
+        return Message(message_id, task_name, body)
+
+    def consume(self, celery_app, count):
+        received = []
+        with Connection('memory://') as connection:
+            queue = connection.SimpleQueue(celery_app.conf.task_default_queue)
+            for _ in range(count):
+                message = queue.get(timeout=1)
+                received.append(message)
+                message.ack()
+            queue.close()
+        return received
+
+    def test_publish(self, celery_app):
+        publisher = Publisher(celery_app, Connection('memory://'))
+        messages = [self.message(i, x=i, y=1) for i in range(3)]
+
+        publisher.publish(messages)
+
+        received = self.consume(celery_app, 3)
+        assert [message.headers['task'] for message in received] == ['deli_counter.test.add'] * 3
+        assert [message.headers['id'] for message in received] == [
+            kombu_json.loads(message.body)['options']['task_id'] for message in messages]
+        assert [message.payload[1] for message in received] == [{'x': i, 'y': 1} for i in range(3)]
+
+        stats = publisher.stats()
+        assert stats['published'] == 3
+        assert stats['failed'] == 0
+        assert stats['in_flight'] == 0
+        assert stats['latency_max'] >= stats['latency_mean'] > 0
+
+    def test_publish_unknown_task(self, celery_app):
+        publisher = Publisher(celery_app, Connection('memory://'))
+
+        # Unknown tasks are dropped instead of blocking the messages after them
+        publisher.publish([self.message(1, task_name='deli_counter.test.unknown'), self.message(2, x=1, y=1)])
+
+        received = self.consume(celery_app, 1)
+        assert received[0].headers['task'] == 'deli_counter.test.add'
+
+    def test_reconnect(self, celery_app):
+        publisher = Publisher(celery_app, Connection('memory://'))
+        put = memory.Channel._put
+        calls = []
+
+        def flaky_put(channel, *args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise AMQPConnectionError("Connection lost")
+            return put(channel, *args, **kwargs)
+
+        with patch.object(memory.Channel, '_put', flaky_put):
+            publisher.publish([self.message(1, x=1, y=1)])
+
+        assert len(self.consume(celery_app, 1)) == 1
+        assert publisher.stats()['reconnects'] == 1
+        assert publisher.stats()['published'] == 1
+
+    def test_busy(self, celery_app):
+        publisher = Publisher(celery_app, Connection('memory://'))
+
+        # Every connection is in use by a slow publish
+        connection = publisher._pool.acquire()
+        try:
+            with pytest.raises(PublisherBusy):
+                publisher.publish([self.message(1, x=1, y=1)])
+        finally:
+            connection.release()
+
+        assert publisher.stats()['in_flight'] == 0
+        publisher.publish([self.message(2, x=1, y=1)])
+        assert publisher.stats()['published'] == 1
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from schematics import Model
+from schematics.types import ModelType, StringType
+
+from deli_counter.http.mounts.root.routes.v1.validation_models.images import ResponseImage
+from deli_counter.http.mounts.root.routes.v1.validation_models.instances import ResponseInstance
+from deli_counter.http.mounts.root.routes.v1.validation_models.keypairs import ResponseKeypair
+from deli_counter.http.mounts.root.routes.v1.validation_models.network_ports import ResponseNetworkPort
+from deli_counter.http.mounts.root.routes.v1.validation_models.networks import ResponseNetwork
+from deli_counter.http.mounts.root.routes.v1.validation_models.projects import ResponseProject
+from deli_counter.http.mounts.root.routes.v1.validation_models.regions import ResponseRegion
+from deli_counter.http.mounts.root.routes.v1.validation_models.zones import ResponseZone
+from deli_counter.http.serializers import SERIALIZERS, Serializer
+from deli_counter.test.base import DeliTestCase, fake
+from ingredients_db.models.images import Image
+from ingredients_db.models.instance import Instance
+from ingredients_db.models.keypair import Keypair
+from ingredients_db.models.network import Network
+from ingredients_db.models.network_port import NetworkPort
+from ingredients_db.models.project import Project
+from ingredients_db.models.region import Region
+from ingredients_db.models.zones import Zone
+
+
+class TestSerializers(DeliTestCase):
+    def assert_golden(self, response_cls, db_object):
+        # The json the schematics response model gives is the golden output
+        golden = json.dumps(response_cls.from_database(db_object).to_native())
+        assert json.dumps(SERIALIZERS[response_cls].dump(db_object)) == golden
+
+    def test_golden(self, app):
+        project = self.create_project(app)
+        region = self.create_region(app)
+        zone = self.create_zone(app, region=region)
+        network = self.create_network(app, region=region)
+        image = self.create_image(app, project, region=region)
+        instance = self.create_instance(app, project, region=region, zone=zone, image=image, network=network)
+
+        with app.database.session() as session:
+            keypair = Keypair()
+            keypair.name = fake.pystr(min_chars=3)
+            keypair.public_key = 'ssh-rsa ' + fake.pystr(min_chars=32)
+            keypair.project_id = project.id
+            session.add(keypair)
+
+            instance = session.merge(instance, load=False)
+            instance.tags = {'env': 'prod', 'team': fake.pystr(min_chars=3)}
+            instance.keypairs.append(keypair)
+            session.commit()
+
+            self.assert_golden(ResponseInstance, session.query(Instance).filter(Instance.id == instance.id).one())
+            self.assert_golden(ResponseKeypair, session.query(Keypair).filter(Keypair.id == keypair.id).one())
+            self.assert_golden(ResponseNetworkPort, session.query(NetworkPort).filter(
+                NetworkPort.id == instance.network_port_id).one())
+            self.assert_golden(ResponseImage, session.query(Image).filter(Image.id == image.id).one())
+            self.assert_golden(ResponseNetwork, session.query(Network).filter(Network.id == network.id).one())
+            self.assert_golden(ResponseProject, session.query(Project).filter(Project.id == project.id).one())
+            self.assert_golden(ResponseRegion, session.query(Region).filter(Region.id == region.id).one())
+            self.assert_golden(ResponseZone, session.query(Zone).filter(Zone.id == zone.id).one())
+
+    def test_golden_no_zone(self, app):
+        project = self.create_project(app)
+        instance = self.create_instance(app, project)
+
+        with app.database.session() as session:
+            session.query(Instance).filter(Instance.id == instance.id).update({Instance.zone_id: None})
+            session.commit()
+
+            self.assert_golden(ResponseInstance, session.query(Instance).filter(Instance.id == instance.id).one())
+
+    def test_request_fields(self, app):
+        project = self.create_project(app)
+
+        with app.database.session() as session:
+            project = session.query(Project).filter(Project.id == project.id).one()
+            data = SERIALIZERS[ResponseProject].dump(project, ['name', 'id'])
+
+            assert list(data.keys()) == ['name', 'id']
+            assert data == {'name': project.name, 'id': str(project.id)}
+
+    def test_invalid(self):
+        class ResponseNested(Model):
+            nested = ModelType(ResponseProject)
+
+        class ResponseName(Model):
+            name = StringType()
+
+        with pytest.raises(TypeError):
+            Serializer(ResponseNested)
+
+        with pytest.raises(TypeError):
+            Serializer(ResponseName, invalid=lambda db_object: None)
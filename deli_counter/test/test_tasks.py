@@ -0,0 +1,154 @@
+import threading
+import time
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import arrow
+
+from deli_counter.http.mounts.root.routes.v1.validation_models.task import TaskModel
+from deli_counter.tasks import outbox
+from deli_counter.test.base import DeliTestCase
+from ingredients_db.models.instance import Instance
+from ingredients_db.models.task import Task
+from ingredients_tasks.tasks.instance import start_instance, stop_instance
+from ingredients_tasks.tasks.network import create_network
+
+
+class TestTasks(DeliTestCase):
+    def create_task(self, wsgi, app, project, token):
+        instance = self.create_instance(app, project=project)
+        with patch('ingredients_tasks.tasks.instance.delete_instance.apply_async'):
+            self.delete(wsgi, "/v1/instances/%s" % instance.id, token=token, status=204)
+
+        with app.database.session() as session:
+            return session.query(Instance).filter(Instance.id == instance.id).one().current_task_id
+
+    def create_entity_task(self, app, entity, celery_task, **kwargs):
+        with app.database.session() as session:
+            entity = session.merge(entity, load=False)
+            task = outbox.create_task(session, entity, celery_task, **kwargs)
+            session.commit()
+            return task.id
+
+    def stop_task(self, app, task_id, delay=0):
+        time.sleep(delay)
+        with app.database.session() as session:
+            task = session.query(Task).filter(Task.id == task_id).one()
+            task.stopped_at = arrow.now()
+            session.commit()
+
+    def test_get(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        task_id = self.create_task(wsgi, app, project, token)
+
+        resp = self.get(wsgi, "/v1/tasks/%s" % task_id, token=token)
+        resp_model = TaskModel(resp.json)
+        assert resp.json == resp_model.to_primitive()
+        assert resp_model.id == task_id
+        assert resp_model.stopped_at is None
+
+        self.get(wsgi, "/v1/tasks/%s" % project.id, token=token, status=404)
+
+    def test_list(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        task_ids = [self.create_task(wsgi, app, project, token) for _ in range(3)]
+
+        resp = self.get(wsgi, "/v1/tasks", token=token, params={'limit': 2})
+        params = parse_qs(urlparse(resp.json['tasks_links'][0]['href']).query)
+        resp_next = self.get(wsgi, "/v1/tasks", token=token, params=params)
+
+        # Newest first
+        assert [task['id'] for task in resp.json['tasks'] + resp_next.json['tasks']] == [
+            str(task_id) for task_id in reversed(task_ids)]
+
+    def test_project_scope(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        task_id = self.create_task(wsgi, app, project, token)
+
+        other_project = self.create_project(app)
+        other_token = self.create_token(app, project=other_project)
+        self.create_task(wsgi, app, other_project, other_token)
+
+        # Tasks of other projects' resources do not exist as far as the project can tell
+        self.get(wsgi, "/v1/tasks/%s" % task_id, token=other_token, status=404)
+        resp = self.get(wsgi, "/v1/tasks", token=other_token)
+        assert str(task_id) not in [task['id'] for task in resp.json['tasks']]
+        assert len(resp.json['tasks']) == 1
+
+        unscoped_token = self.create_token(app)
+        self.get(wsgi, "/v1/tasks/%s" % task_id, token=unscoped_token, status=403)
+        self.get(wsgi, "/v1/tasks", token=unscoped_token, status=403)
+
+    def test_replaced_task(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        instance = self.create_instance(app, project=project)
+        stop_task_id = self.create_entity_task(app, instance, stop_instance, instance_id=instance.id)
+        start_task_id = self.create_entity_task(app, instance, start_instance, instance_id=instance.id)
+
+        # The instance moved on to another task but the first one is still the project's
+        resp = self.get(wsgi, "/v1/tasks/%s" % stop_task_id, token=token)
+        assert resp.json['name'] == stop_instance.name
+        resp = self.get(wsgi, "/v1/tasks", token=token)
+        assert [task['id'] for task in resp.json['tasks']] == [str(start_task_id), str(stop_task_id)]
+
+    def test_global_task(self, wsgi, app):
+        network = self.create_network(app)
+        task_id = self.create_entity_task(app, network, create_network, network_id=network.id)
+        admin_token = self.create_token(app, roles=["admin"])
+
+        resp = self.get(wsgi, "/v1/tasks/%s" % task_id, token=admin_token)
+        assert resp.json['name'] == create_network.name
+        resp = self.get(wsgi, "/v1/tasks", token=admin_token, params={'type': 'global'})
+        assert str(task_id) in [task['id'] for task in resp.json['tasks']]
+
+        # Only for the global roles
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        self.get(wsgi, "/v1/tasks/%s" % task_id, token=token, status=403)
+        self.get(wsgi, "/v1/tasks", token=token, params={'type': 'global'}, status=403)
+        resp = self.get(wsgi, "/v1/tasks", token=token)
+        assert len(resp.json['tasks']) == 0
+
+    def test_get_wait(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        task_id = self.create_task(wsgi, app, project, token)
+
+        stopper = threading.Thread(target=self.stop_task, args=(app, task_id, 0.5))
+        stopper.start()
+        started = time.monotonic()
+        resp = self.get(wsgi, "/v1/tasks/%s" % task_id, token=token, params={'wait': '5s'})
+        stopper.join()
+
+        # Returned as soon as the task stopped instead of when the wait ran out
+        assert resp.json['stopped_at'] is not None
+        assert time.monotonic() - started < 4
+
+    def test_get_wait_stopped(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        task_id = self.create_task(wsgi, app, project, token)
+        self.stop_task(app, task_id)
+
+        started = time.monotonic()
+        resp = self.get(wsgi, "/v1/tasks/%s" % task_id, token=token, params={'wait': '5s'})
+
+        assert resp.json['stopped_at'] is not None
+        assert time.monotonic() - started < 4
+
+    def test_get_wait_timeout(self, wsgi, app):
+        project = self.create_project(app)
+        token = self.create_token(app, project=project)
+        task_id = self.create_task(wsgi, app, project, token)
+
+        started = time.monotonic()
+        resp = self.get(wsgi, "/v1/tasks/%s" % task_id, token=token, params={'wait': 1})
+
+        assert resp.json['stopped_at'] is None
+        assert time.monotonic() - started >= 1
+
+        self.get(wsgi, "/v1/tasks/%s" % task_id, token=token, params={'wait': 'soon'}, status=400)
@@ -0,0 +1,31 @@
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def load_class(class_string: str, base_cls):
+    """
+    Import a class from a string in the format of 'my.module:MyClass'
+    and make sure it is a subclass of base_cls.
+    """
+    if ':' not in class_string:
+        raise ValueError("'%s' does not contain a module and class. "
+                         "Must be in the following format: 'my.module:MyClass'" % class_string)
+
+    module_name, class_name, *_ = class_string.split(":")
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        logger.exception("Could not import module: " + module_name)
+        raise
+    try:
+        klass = getattr(module, class_name)
+    except AttributeError:
+        logger.exception("Could not get module class: " + class_name)
+        raise
+
+    if not issubclass(klass, base_cls):
+        raise ValueError("'%s' is not a subclass of '%s.%s'" % (class_string, base_cls.__module__, base_cls.__name__))
+
+    return klass